@@ -0,0 +1,97 @@
+"""Gerador de carga HTTP assíncrono usado pelos benchmarks.
+
+Cada cliente virtual repete requisições em sequência até o fim da duração;
+``concorrencia`` clientes rodam ao mesmo tempo. As latências são agrupadas
+pelo nome da rota para o cálculo de percentis.
+"""
+import asyncio
+import random
+import time
+
+import aiohttp
+
+
+def percentil(valores_ordenados, p):
+    """Percentil ``p`` (0-100) por interpolação linear de uma lista ordenada."""
+    if not valores_ordenados:
+        return None
+    posicao = (len(valores_ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    fracao = posicao - inferior
+    return valores_ordenados[inferior] + (valores_ordenados[superior] - valores_ordenados[inferior]) * fracao
+
+
+def resumir(latencias, erros, duracao):
+    """Vazão e percentis (em ms) de uma rota."""
+    latencias = sorted(latencias)
+    return {
+        'requisicoes': len(latencias),
+        'erros': erros,
+        'vazao_rps': round(len(latencias) / duracao, 1) if duracao else 0.0,
+        'p50_ms': _ms(percentil(latencias, 50)),
+        'p95_ms': _ms(percentil(latencias, 95)),
+        'p99_ms': _ms(percentil(latencias, 99)),
+        'max_ms': _ms(latencias[-1] if latencias else None),
+    }
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 2)
+
+
+async def _cliente(sessao, url_base, cenario, fim, latencias, erros):
+    while time.monotonic() < fim:
+        nome, metodo, caminho, corpo = cenario()
+        inicio = time.perf_counter()
+        try:
+            async with sessao.request(metodo, url_base + caminho, json=corpo) as resposta:
+                await resposta.read()
+                ok = resposta.status < 500
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            ok = False
+        decorrido = time.perf_counter() - inicio
+        if ok:
+            latencias.setdefault(nome, []).append(decorrido)
+        else:
+            erros[nome] = erros.get(nome, 0) + 1
+
+
+async def executar(url_base, cenario, concorrencia=50, duracao=10.0, timeout=30.0, cabecalhos=None):
+    """Dispara ``cenario`` com ``concorrencia`` clientes por ``duracao`` segundos.
+
+    ``cenario()`` devolve ``(nome, metodo, caminho, corpo_json)`` a cada
+    chamada; ``cabecalhos`` vão em todas as requisições. Retorna um dict
+    ``nome -> resumo`` (ver ``resumir``).
+    """
+    latencias, erros = {}, {}
+    conector = aiohttp.TCPConnector(limit=concorrencia)
+    async with aiohttp.ClientSession(connector=conector, headers=cabecalhos,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as sessao:
+        inicio = time.monotonic()
+        fim = inicio + duracao
+        await asyncio.gather(*(
+            _cliente(sessao, url_base, cenario, fim, latencias, erros) for _ in range(concorrencia)
+        ))
+        decorrido = time.monotonic() - inicio
+    nomes = set(latencias) | set(erros)
+    return {nome: resumir(latencias.get(nome, []), erros.get(nome, 0), decorrido) for nome in sorted(nomes)}
+
+
+def leitura_por_id(ids):
+    """Cenário simples: GET /alunos/<id> com ids sorteados."""
+    def cenario():
+        return 'GET /alunos/<id>', 'GET', f'/alunos/{random.choice(ids)}', None
+    return cenario
+
+
+def imprimir(titulo, resultado):
+    print(f"\n{titulo}")
+    print(f"{'rota':<28}{'req':>8}{'erros':>7}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for nome, r in resultado.items():
+        print(f"{nome:<28}{r['requisicoes']:>8}{r['erros']:>7}{r['vazao_rps']:>10}"
+              f"{_fmt(r['p50_ms']):>9}{_fmt(r['p95_ms']):>9}{_fmt(r['p99_ms']):>9}")
+
+
+def _fmt(valor):
+    return '-' if valor is None else f'{valor:.1f}'
@@ -0,0 +1,86 @@
+"""Mede GET /alunos/export: vazão, tempo até o primeiro byte e memória da API.
+
+Baixa a tabela inteira em cada formato, com e sem gzip, e compara com o
+GET /alunos (array JSON). Com ``--pid`` (processo da API na mesma máquina)
+amostra o RSS do processo durante cada download, para mostrar que a
+memória não cresce com o número de linhas::
+
+    python benchmarks/popular.py --recriar --alunos 1000000
+    python benchmarks/exportacao.py --url http://127.0.0.1:5000 --pid $(pgrep -f app.py)
+"""
+import argparse
+import threading
+import time
+import urllib.request
+
+CASOS = [
+    ('GET /alunos (JSON)', '/alunos', False),
+    ('export csv', '/alunos/export?format=csv', False),
+    ('export ndjson', '/alunos/export?format=ndjson', False),
+    ('export csv gzip', '/alunos/export?format=csv', True),
+    ('export ndjson gzip', '/alunos/export?format=ndjson', True),
+]
+
+
+def rss_kb(pid):
+    with open(f'/proc/{pid}/status') as status:
+        for linha in status:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1])
+
+
+class Amostrador(threading.Thread):
+    """Guarda o maior RSS de ``pid`` enquanto estiver rodando."""
+
+    def __init__(self, pid, intervalo=0.05):
+        super().__init__(daemon=True)
+        self.pid, self.intervalo = pid, intervalo
+        self.pico = rss_kb(pid)
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, rss_kb(self.pid))
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        return self.pico
+
+
+def baixar(url, gzip):
+    pedido = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip'} if gzip else {})
+    inicio = time.perf_counter()
+    primeiro, total = None, 0
+    with urllib.request.urlopen(pedido) as resposta:
+        while True:
+            bloco = resposta.read(1 << 16)
+            if primeiro is None:
+                primeiro = time.perf_counter() - inicio
+            if not bloco:
+                break
+            total += len(bloco)
+    return total, primeiro, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--pid', type=int, help='processo da API, para medir o RSS')
+    parser.add_argument('--filtros', default='', help='query string extra, ex.: id_turma=1,2,3')
+    args = parser.parse_args()
+
+    print(f"{'caso':<22}{'MB':>9}{'1º byte ms':>12}{'total s':>9}{'MB/s':>8}{'RSS pico MB':>13}")
+    for nome, caminho, gzip in CASOS:
+        if args.filtros:
+            caminho += ('&' if '?' in caminho else '?') + args.filtros
+        amostrador = Amostrador(args.pid) if args.pid else None
+        if amostrador:
+            amostrador.start()
+        total, primeiro, duracao = baixar(args.url + caminho, gzip)
+        pico = f'{amostrador.parar() / 1024:.1f}' if amostrador else '-'
+        print(f'{nome:<22}{total / 1e6:>9.1f}{primeiro * 1000:>12.0f}{duracao:>9.2f}{total / 1e6 / duracao:>8.1f}{pico:>13}')
+
+
+if __name__ == '__main__':
+    main()
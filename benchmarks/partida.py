@@ -0,0 +1,84 @@
+"""Compara a partida da API com a documentação via flasgger e pré-gerada.
+
+Para cada modo de ``API_DOCS``, importa ``flask-app/app.py`` em processos
+novos e mede o tempo de importação, a memória residente depois dela, os
+módulos carregados e o tempo de ``/apispec.json`` (primeira requisição e
+média das seguintes)::
+
+    python benchmarks/partida.py --repeticoes 10
+
+A especificação do modo static é gerada antes, num arquivo temporário. Não
+precisa de banco: nada aqui abre conexão.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+FLASK_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask-app')
+
+MEDIR = r'''
+import json, sys, time
+
+inicio = time.perf_counter()
+import app
+importacao = time.perf_counter() - inicio
+
+with open('/proc/self/status') as status:
+    rss = next(int(linha.split()[1]) for linha in status if linha.startswith('VmRSS:'))
+
+cliente = app.app.test_client()
+inicio = time.perf_counter()
+assert cliente.get('/apispec.json').status_code == 200
+primeira = time.perf_counter() - inicio
+inicio = time.perf_counter()
+for _ in range(REQUISICOES):
+    cliente.get('/apispec.json')
+seguintes = (time.perf_counter() - inicio) / REQUISICOES
+
+print(json.dumps({
+    'importacao_ms': importacao * 1000, 'rss_mb': rss / 1024, 'modulos': len(sys.modules),
+    'flasgger': 'flasgger' in sys.modules, 'spec_primeira_ms': primeira * 1000, 'spec_ms': seguintes * 1000,
+}))
+'''
+
+
+def medir(modo, arquivo_spec, requisicoes):
+    ambiente = dict(os.environ, API_DOCS=modo, API_SPEC_FILE=arquivo_spec)
+    saida = subprocess.run(
+        [sys.executable, '-c', MEDIR.replace('REQUISICOES', str(requisicoes))],
+        cwd=FLASK_APP, env=ambiente, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(saida.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=10, help='processos por modo')
+    parser.add_argument('--requisicoes', type=int, default=50, help='GET /apispec.json por processo')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo_spec = os.path.join(pasta, 'apispec.json')
+        subprocess.run([sys.executable, 'documentacao.py', '--saida', arquivo_spec],
+                       cwd=FLASK_APP, check=True, stdout=subprocess.DEVNULL)
+
+        print(f"{args.repeticoes} processos por modo, medianas\n")
+        print(f"{'modo':<10}{'import ms':>11}{'RSS MB':>9}{'módulos':>9}{'flasgger':>10}{'1º spec ms':>12}{'spec ms':>9}")
+        for modo in ('swagger', 'static'):
+            # Um processo descartado antes, para medir com o cache de disco quente
+            medir(modo, arquivo_spec, 1)
+            rodadas = [medir(modo, arquivo_spec, args.requisicoes) for _ in range(args.repeticoes)]
+
+            def mediana(chave):
+                return statistics.median(r[chave] for r in rodadas)
+
+            print(f"{modo:<10}{mediana('importacao_ms'):>11.0f}{mediana('rss_mb'):>9.1f}{mediana('modulos'):>9.0f}"
+                  f"{'sim' if rodadas[0]['flasgger'] else 'não':>10}{mediana('spec_primeira_ms'):>12.2f}{mediana('spec_ms'):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
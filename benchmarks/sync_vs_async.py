@@ -0,0 +1,46 @@
+"""Compara a API síncrona (app.py) com a edição asyncio (app_async.py).
+
+As duas precisam estar rodando e apontando para o mesmo banco, por exemplo::
+
+    cd flask-app
+    flask --app app run --port 5000 --with-threads
+    hypercorn app_async:app --bind 127.0.0.1:5001
+
+    python benchmarks/sync_vs_async.py --concorrencia 50 200 1000
+
+Para cada nível de concorrência, dispara GET /alunos/<id> contra as duas e
+imprime vazão e percentis de latência. Só essa rota é medida: app_async.py
+cobre apenas o CRUD básico de app.py (ver a docstring dele).
+
+As requisições levam ``X-Cache-Bypass: 1``, para a API síncrona ir ao banco
+como a asyncio em vez de responder do cache em memória. Com o cache ligado
+ela mediria o cache, não o modelo de concorrência. Sem réplicas configuradas
+(``DATABASE_REPLICAS``), as duas leem do mesmo primário.
+"""
+import argparse
+import asyncio
+
+import carga
+
+# GET /alunos/<id> de app.py lê do banco, sem passar pelo cache
+SEM_CACHE = {'X-Cache-Bypass': '1'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sync', default='http://127.0.0.1:5000', help='URL da API síncrona')
+    parser.add_argument('--async', dest='assincrona', default='http://127.0.0.1:5001', help='URL da API asyncio')
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--duracao', type=float, default=10.0, help='segundos por rodada')
+    parser.add_argument('--ids', type=int, default=1000, help='sorteia ids entre 1 e este valor')
+    args = parser.parse_args()
+
+    cenario = carga.leitura_por_id(list(range(1, args.ids + 1)))
+    for concorrencia in args.concorrencia:
+        for nome, url in (('sync', args.sync), ('async', args.assincrona)):
+            resultado = asyncio.run(carga.executar(url, cenario, concorrencia, args.duracao, cabecalhos=SEM_CACHE))
+            carga.imprimir(f'{nome} — {concorrencia} clientes', resultado)
+
+
+if __name__ == '__main__':
+    main()
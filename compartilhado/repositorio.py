@@ -0,0 +1,279 @@
+"""Acesso a dados de uma tabela: colunas tipadas, SQL pronto e linhas compactas.
+
+Cada tabela é descrita uma vez com ``Tabela``: nome, chave e as colunas com
+o tipo Python de cada uma. Daí saem o SQL de leitura e escrita e a classe
+de registro, uma ``namedtuple``: a linha fica numa tupla, sem um ``dict``
+por linha, continua indexável como as tuplas do cursor e tem ``_asdict()``
+para quando for preciso montar JSON.
+
+``Repositorio`` executa esse SQL numa conexão recebida de quem chama (o
+pool do flask-app, ``conectar()`` do crud_alunos, ...); ele não abre nem
+confirma transações. As leituras vêm em duas formas: ``listar`` devolve
+uma lista e ``iterar`` percorre a tabela com um cursor do lado do servidor,
+entregando registros aos poucos com memória constante. ``consultar`` e
+``lotes`` fazem o mesmo para um SELECT qualquer (filtros, colunas
+escolhidas), com registros montados a partir das colunas do resultado.
+
+Este módulo é o pacote ``escola-repositorio`` (compartilhado/), instalado
+nas imagens do flask-app e do python-app e, para desenvolvimento, com
+``pip install -e compartilhado`` a partir da raiz do repositório.
+"""
+import collections
+import datetime
+import decimal
+import functools
+import itertools
+import re
+
+NOME_SQL = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Cursores do lado do servidor abertos por iterar(), um nome por chamada
+_cursores = itertools.count(1)
+
+
+class ValorInvalido(ValueError):
+    """Um valor não pôde ser convertido para o tipo da coluna."""
+
+
+Coluna = collections.namedtuple('Coluna', 'nome tipo')
+
+
+def _data(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    return datetime.date.fromisoformat(valor)
+
+
+def _texto(valor):
+    # Objetos e listas do JSON não viram texto com cara de Python ("{'a': 1}")
+    if isinstance(valor, (dict, list, tuple, set, bytes)):
+        raise TypeError(valor)
+    return str(valor)
+
+
+def _inteiro(valor):
+    if isinstance(valor, bool) or (isinstance(valor, float) and not valor.is_integer()):
+        raise ValueError(valor)
+    return int(valor)
+
+
+# Conversão de valores recebidos (JSON, formulário, CSV) para o tipo da coluna
+CONVERSORES = {
+    int: _inteiro,
+    float: float,
+    decimal.Decimal: lambda valor: decimal.Decimal(str(valor)),
+    str: _texto,
+    bool: bool,
+    datetime.date: _data,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _registro_anonimo(nomes):
+    return collections.namedtuple('Linha', nomes, rename=True)
+
+
+def registro_do_resultado(cursor):
+    """Classe de registro (``namedtuple``) com as colunas do último resultado de ``cursor``."""
+    return _registro_anonimo(tuple(coluna[0] for coluna in cursor.description))
+
+
+def _executar(cur, consulta, params):
+    cur.execute(consulta, params)
+
+
+def registros(cursor, registro):
+    """Todas as linhas restantes de ``cursor`` como instâncias de ``registro``."""
+    return list(map(registro._make, cursor.fetchall()))
+
+
+def iterar_registros(cursor, registro, tamanho=2000):
+    """As linhas de ``cursor`` como ``registro``, buscadas ``tamanho`` de cada vez."""
+    while True:
+        linhas = cursor.fetchmany(tamanho)
+        if not linhas:
+            return
+        yield from map(registro._make, linhas)
+
+
+class Tabela:
+    """Descrição de uma tabela: chave, colunas com tipo e o SQL derivado delas.
+
+    ``colunas`` é uma sequência de ``(nome, tipo)`` na ordem da tabela,
+    incluindo a chave. ``registro`` dá nome à classe das linhas.
+    """
+
+    def __init__(self, nome, chave, colunas, registro=None):
+        self.colunas = tuple(Coluna(*coluna) for coluna in colunas)
+        self.nomes = tuple(coluna.nome for coluna in self.colunas)
+        for identificador in (nome,) + self.nomes:
+            if not NOME_SQL.match(identificador):
+                raise ValueError(f'Nome inválido para SQL: {identificador!r}')
+        if chave not in self.nomes:
+            raise ValueError(f'A chave {chave!r} não está entre as colunas de {nome}')
+        for coluna in self.colunas:
+            if coluna.tipo not in CONVERSORES:
+                raise ValueError(f'Tipo sem conversão na coluna {coluna.nome}: {coluna.tipo!r}')
+        self.nome = nome
+        self.chave = chave
+        self.editaveis = tuple(nome_coluna for nome_coluna in self.nomes if nome_coluna != chave)
+        self.tipos = dict(self.colunas)
+        self.Registro = collections.namedtuple(registro or nome, self.nomes)
+
+        lista = ', '.join(self.nomes)
+        # LIMIT NULL é o mesmo que sem limite
+        self.sql_listar = f'SELECT {lista} FROM {nome} ORDER BY {chave} LIMIT %s'
+        self.sql_listar_depois = f'SELECT {lista} FROM {nome} WHERE {chave} > %s ORDER BY {chave} LIMIT %s'
+        self.sql_iterar = f'SELECT {lista} FROM {nome} ORDER BY {chave}'
+        self.sql_obter = f'SELECT {lista} FROM {nome} WHERE {chave} = %s'
+        self.sql_obter_json = f'SELECT row_to_json(t)::text FROM {nome} t WHERE {chave} = %s'
+        self.sql_excluir = f'DELETE FROM {nome} WHERE {chave} = %s RETURNING {chave}'
+
+    def converter(self, dados, colunas=None):
+        """Valores de ``dados`` convertidos ao tipo de cada coluna.
+
+        Só entram as ``colunas`` pedidas (padrão: todas) que estiverem em
+        ``dados``; ``None`` passa direto. Retorna um ``dict`` na ordem da
+        tabela ou lança ``ValorInvalido``.
+        """
+        convertidos = {}
+        for nome in colunas or self.nomes:
+            if nome not in dados:
+                continue
+            valor = dados[nome]
+            if valor is not None:
+                tipo = self.tipos[nome]
+                try:
+                    valor = CONVERSORES[tipo](valor)
+                except (TypeError, ValueError, decimal.InvalidOperation):
+                    raise ValorInvalido(f'O campo "{nome}" deve ser do tipo {tipo.__name__}') from None
+            convertidos[nome] = valor
+        return convertidos
+
+    @functools.lru_cache(maxsize=None)
+    def sql_inserir(self, colunas):
+        """INSERT de ``colunas`` (tupla) que devolve a chave gerada."""
+        return (f'INSERT INTO {self.nome} ({", ".join(colunas)}) '
+                f'VALUES ({", ".join(["%s"] * len(colunas))}) RETURNING {self.chave}')
+
+    @functools.lru_cache(maxsize=None)
+    def sql_atualizar(self, colunas):
+        """UPDATE só de ``colunas`` (tupla); não casa com a linha (nem a reescreve) se nada mudar.
+
+        Parâmetros: os valores, a chave e os valores de novo.
+        """
+        atribuicoes = ', '.join(f'{coluna} = %s' for coluna in colunas)
+        diferente = ' OR '.join(f'{coluna} IS DISTINCT FROM %s' for coluna in colunas)
+        return f'UPDATE {self.nome} SET {atribuicoes} WHERE {self.chave} = %s AND ({diferente}) RETURNING {self.chave}'
+
+
+class Repositorio:
+    """CRUD de uma ``Tabela`` sobre uma conexão psycopg2 recebida a cada chamada.
+
+    ``executar(cursor, sql, params)`` substitui o ``cursor.execute`` em tudo
+    que não usa cursor com nome (``iterar``, ``lotes``); o flask-app passa
+    por ali os seus comandos preparados.
+    """
+
+    def __init__(self, tabela, tamanho_lote=2000, executar=None):
+        self.tabela = tabela
+        self.tamanho_lote = tamanho_lote
+        self.executar = executar or _executar
+
+    def obter(self, conn, chave):
+        """O registro com essa chave, ou ``None``."""
+        with conn.cursor() as cur:
+            self.executar(cur, self.tabela.sql_obter, (chave,))
+            linha = cur.fetchone()
+        return None if linha is None else self.tabela.Registro._make(linha)
+
+    def obter_json(self, conn, chave):
+        """A linha com essa chave já em JSON, montado pelo banco (``row_to_json``), ou ``None``."""
+        with conn.cursor() as cur:
+            self.executar(cur, self.tabela.sql_obter_json, (chave,))
+            linha = cur.fetchone()
+        return None if linha is None else linha[0]
+
+    def listar(self, conn, depois=None, limite=None):
+        """Registros em ordem de chave, numa lista.
+
+        ``depois`` pula até a chave informada (paginação por keyset) e
+        ``limite`` corta o resultado; sem limite, a tabela inteira vem para
+        a memória, e ``iterar`` costuma ser a melhor escolha.
+        """
+        with conn.cursor() as cur:
+            if depois is None:
+                self.executar(cur, self.tabela.sql_listar, (limite,))
+            else:
+                self.executar(cur, self.tabela.sql_listar_depois, (depois, limite))
+            return registros(cur, self.tabela.Registro)
+
+    def iterar(self, conn, tamanho=None):
+        """Percorre a tabela em ordem de chave, ``tamanho`` linhas por ida ao banco.
+
+        Usa um cursor com nome (do lado do servidor), que vive dentro da
+        transação de ``conn``; em autocommit ele é aberto ``WITH HOLD``.
+        """
+        tamanho = tamanho or self.tamanho_lote
+        cur = conn.cursor(name=f'iterar_{self.tabela.nome.lower()}_{next(_cursores)}', withhold=conn.autocommit)
+        try:
+            cur.itersize = tamanho
+            cur.execute(self.tabela.sql_iterar)
+            yield from iterar_registros(cur, self.tabela.Registro, tamanho)
+        finally:
+            cur.close()
+
+    def consultar(self, conn, consulta, params=None):
+        """Registros de um SELECT qualquer, com as colunas do resultado (``registro_do_resultado``)."""
+        with conn.cursor() as cur:
+            self.executar(cur, consulta, params)
+            return registros(cur, registro_do_resultado(cur))
+
+    def lotes(self, conn, consulta, params=None, tamanho=None):
+        """Como ``consultar``, mas em listas de até ``tamanho`` registros lidas de um cursor com nome.
+
+        O SQL já vai ao banco na primeira chamada de ``next()``, que é onde
+        aparecem os erros da consulta.
+        """
+        tamanho = tamanho or self.tamanho_lote
+        cur = conn.cursor(name=f'lotes_{self.tabela.nome.lower()}_{next(_cursores)}', withhold=conn.autocommit)
+        try:
+            cur.itersize = tamanho
+            cur.execute(consulta, params)
+            linhas = cur.fetchmany(tamanho)
+            # Num cursor com nome, as colunas só são conhecidas depois da primeira busca
+            registro = registro_do_resultado(cur) if linhas else None
+            while linhas:
+                yield list(map(registro._make, linhas))
+                linhas = cur.fetchmany(tamanho)
+        finally:
+            cur.close()
+
+    def inserir(self, conn, dados):
+        """Insere as colunas presentes em ``dados`` (convertidas ao tipo de cada uma); retorna a chave."""
+        valores = self.tabela.converter(dados)
+        with conn.cursor() as cur:
+            self.executar(cur, self.tabela.sql_inserir(tuple(valores)), tuple(valores.values()))
+            return cur.fetchone()[0]
+
+    def atualizar(self, conn, chave, dados):
+        """Altera só as colunas presentes em ``dados``.
+
+        Retorna ``True`` se alguma mudou; ``False`` se a linha não existe ou
+        já tinha esses valores, caso em que nada é escrito.
+        """
+        valores = self.tabela.converter(dados, self.tabela.editaveis)
+        if not valores:
+            return False
+        lista = list(valores.values())
+        with conn.cursor() as cur:
+            self.executar(cur, self.tabela.sql_atualizar(tuple(valores)), lista + [chave] + lista)
+            return cur.fetchone() is not None
+
+    def excluir(self, conn, chave):
+        """Remove a linha; retorna ``False`` se ela não existir."""
+        with conn.cursor() as cur:
+            self.executar(cur, self.tabela.sql_excluir, (chave,))
+            return cur.fetchone() is not None
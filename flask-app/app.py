@@ -1,62 +1,201 @@
-from flask import Flask, request, jsonify
+import itertools
+import os
+import re
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context, url_for
 import psycopg2
 import psycopg2.extras
-from flasgger import Swagger, swag_from
+
+from busca import BUSCA_MAXIMA, BUSCA_PADRAO, BUSCAR_ALUNOS, BUSCAR_ALUNOS_APROXIMADA, ler_busca, parametros_aproximada, parametros_busca, trigramas_disponiveis
+from cache import cache_alunos
+from consultas import ConsultaAlunos, ParametroInvalido, atualizacao_parcial
+from consultas_lentas import monitor
+from database import AdmissionRejected, admission_stats, get_db_connection, get_router, parse_lsn, pool_stats, release_db_connection, replica_stats, wal_lsn
+from documentacao import registrar_documentacao, swag_from
+from exportacao import FORMATOS, comando_copy, iniciar, transmitir_copy
+from importacao import ALUNO, COLUNAS_ALUNO, TURMAS_EXISTENTES, ErroImportacao, formato_do_upload, ler_registros, separar_turmas_inexistentes, separar_validos, turmas_do_lote, validar_aluno, validar_alteracoes
+from metricas import exportar, instrumentar, medir, registrar_linhas
+from preparadas import comandos
+from presencas import GRAVAR_CHAMADA, ErroChamada, ler_chamada, ler_data
+from relatorios import FREQUENCIA_TURMAS, PAGAMENTOS_ALUNOS, atualizar_resumos, frescor, ler_mes
+from repositorio import Repositorio, ValorInvalido
+from serializacao import NO_BANCO, colunas, linha_json, linhas_json, objeto_json, resposta_json
 
 app = Flask(__name__)
 
-# Configuração do Swagger
-swagger_config = {
-    "headers": [],
-    "specs": [
-        {
-            "endpoint": "apispec",
-            "route": "/apispec.json",
-            "rule_filter": lambda rule: True,
-            "model_filter": lambda tag: True,
-        }
-    ],
-    "static_url_path": "/flasgger_static",
-    "swagger_ui": True,
-    "specs_route": "/docs/"
-}
+# Paginação de GET /alunos
+PAGINA_PADRAO = 100
+PAGINA_MAXIMA = 1000
+BLOCO_STREAMING = 2000
+
+# Cadastro em lote: limite de alunos por requisição e linhas por INSERT
+LOTE_MAXIMO = 10000
+LOTE_PAGINA = 1000
+# Corpo recusado antes de ser lido (bem acima de LOTE_MAXIMO alunos completos)
+LOTE_BYTES_MAXIMO = 16 * 1024 * 1024
+
+# Consultas quentes, preparadas uma vez por conexão do pool
+GRAVAR_CHAMADA_TURMA = comandos.registrar('gravar_chamada', GRAVAR_CHAMADA)
+BUSCAR_ALUNOS_NOME = comandos.registrar('buscar_alunos', BUSCAR_ALUNOS)
 
-swagger_template = {
-    "info": {
-        "title": "API de Gerenciamento Escolar",
-        "description": "API para gerenciamento de alunos e recursos escolares",
-        "contact": {
-            "name": "Equipe de Desenvolvimento",
-            "email": "dev@escola.com"
-        },
-        "version": "1.0.0"
-    },
-    "schemes": ["http", "https"],
+# CRUD e leituras de Aluno passam pelo repositório, com o SQL da descrição da
+# tabela (importacao.ALUNO). Registrado aqui, esse SQL é reconhecido pelo
+# texto em comandos.executar_sql e executado como comando preparado.
+comandos.registrar('aluno_por_id', ALUNO.sql_obter)
+comandos.registrar('aluno_por_id_json', ALUNO.sql_obter_json)
+comandos.registrar('inserir_aluno', ALUNO.sql_inserir(COLUNAS_ALUNO))
+comandos.registrar('atualizar_aluno', ALUNO.sql_atualizar(COLUNAS_ALUNO))
+comandos.registrar('excluir_aluno', ALUNO.sql_excluir)
+repositorio_alunos = Repositorio(ALUNO, executar=comandos.executar_sql)
+
+# Documentação: flasgger em desenvolvimento, especificação pré-gerada em
+# produção (API_DOCS=static, ver documentacao.py)
+swagger = registrar_documentacao(app)
+
+# Cronometragem por etapa em todas as rotas (Server-Timing e /metrics)
+instrumentar(app)
+
+# statement_timeout por rota, só onde o padrão das conexões do pool
+# (DB_STATEMENT_TIMEOUT) não serve
+TEMPO_LIMITE_CONSULTA = {
+    'buscar_alunos': '2s',        # autocompletar: melhor falhar rápido que prender a conexão
+    'exportar_alunos': '10min',   # o COPY dura enquanto o cliente estiver baixando
 }
 
-swagger = Swagger(app, config=swagger_config, template=swagger_template)
+# Banco saturado: recusa na hora, em vez de enfileirar até tudo estourar o tempo
+@app.errorhandler(AdmissionRejected)
+def _sobrecarga(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(max(1, round(e.retry_after)))
+    return response, 503
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            host="aula2003",  # Nome do container Docker PostgreSQL
-            database="escola",
-            user="postgres",
-            password="postgres"
-        )
-        return conn
-    except psycopg2.Error as e:
-        print(f"Erro ao conectar ao banco de dados: {e}")
-        return None
+# Leitura das próprias escritas com réplicas: depois de uma escrita o cliente
+# recebe a posição do WAL do primário e, durante a janela, suas leituras só
+# vão para réplicas que já a aplicaram
+COOKIE_LSN = 'escola_lsn'
+JANELA_LEITURA_PROPRIA = int(os.environ.get('DB_READ_YOUR_WRITES_WINDOW', '60'))
+LSN_VALIDO = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+
+def _guardar_lsn(conn):
+    """Com réplicas, anota a posição do WAL logo depois do commit, na própria conexão da escrita."""
+    if get_router() is not None:
+        g.lsn_escrita = wal_lsn(conn)
+
+def _confirmar(conn):
+    conn.commit()
+    _guardar_lsn(conn)
+
+def _recusado_pelo_banco(e):
+    """Escrita recusada por uma restrição ou por um valor (IntegrityError, DataError): erro do cliente."""
+    codigo = 409 if isinstance(e, psycopg2.errors.UniqueViolation) else 400
+    return jsonify({'error': f'Dados recusados pelo banco: {e.diag.message_primary or e}'}), codigo
+
+@app.after_request
+def _marcar_escrita(response):
+    lsn = g.get('lsn_escrita')
+    if lsn and response.status_code < 400:
+        response.set_cookie(COOKIE_LSN, lsn, max_age=JANELA_LEITURA_PROPRIA, httponly=True, samesite='Lax')
+    return response
+
+def _conexao_leitura():
+    """Conexão para uma rota só de leitura: réplica em dia ou, na falta, o primário."""
+    lsn = request.cookies.get(COOKIE_LSN, '')
+    conn = get_db_connection(read_only=True, min_lsn=parse_lsn(lsn) if LSN_VALIDO.match(lsn) else None)
+    limite = TEMPO_LIMITE_CONSULTA.get(request.endpoint)
+    if conn and limite:
+        # Vale só para a transação corrente; a conexão volta ao pool com o padrão
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT set_config('statement_timeout', %s, true)", (limite,))
+        except psycopg2.Error as e:
+            print(f"Erro ao configurar a conexão: {e}")
+            release_db_connection(conn)
+            return None
+    return conn
 
 @app.route('/alunos', methods=['GET'])
 @swag_from({
     'tags': ['Alunos'],
     'summary': 'Retorna a lista de todos os alunos',
-    'description': 'Endpoint para obter todos os alunos cadastrados no sistema',
+    'description': 'Endpoint para obter todos os alunos cadastrados no sistema. '
+                   'Sem "limit", "after" ou "cursor", a lista completa é transmitida em blocos; com eles '
+                   'a resposta é paginada por keyset e o link da próxima página vem no cabeçalho Link. '
+                   'Filtros, projeção e ordenação valem nos dois modos.',
+    'parameters': [
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'minimum': 1,
+            'maximum': 1000,
+            'default': 100,
+            'description': 'Quantidade máxima de alunos na página'
+        },
+        {
+            'name': 'after',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Retorna apenas alunos com id_aluno maior que este valor (cursor da página, só com a ordenação padrão)'
+        },
+        {
+            'name': 'cursor',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Cursor opaco da próxima página quando "order_by" é usado (vem no cabeçalho Link); '
+                           'só vale com o mesmo "order_by" com que foi gerado'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Colunas a retornar, separadas por vírgula (id_aluno e a coluna de order_by sempre vêm)'
+        },
+        {
+            'name': 'id_turma',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Filtra pela turma; aceita vários IDs separados por vírgula'
+        },
+        {
+            'name': 'data_nascimento_min',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': 'Nascidos a partir desta data (inclusive)'
+        },
+        {
+            'name': 'data_nascimento_max',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': 'Nascidos até esta data (inclusive)'
+        },
+        {
+            'name': 'order_by',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['id_aluno', '-id_aluno', 'nome_completo', '-nome_completo', 'data_nascimento', '-data_nascimento'],
+            'default': 'id_aluno',
+            'required': False,
+            'description': 'Ordenação; prefixo "-" para ordem decrescente'
+        }
+    ],
     'responses': {
         200: {
             'description': 'Lista de alunos recuperada com sucesso',
+            'headers': {
+                'Link': {
+                    'type': 'string',
+                    'description': 'Link para a próxima página (rel="next"), presente apenas no modo paginado quando há mais alunos'
+                }
+            },
             'schema': {
                 'type': 'array',
                 'items': {
@@ -88,6 +227,18 @@ def get_db_connection():
                 ]
             }
         },
+        400: {
+            'description': 'Parâmetros de paginação, filtro, projeção ou ordenação inválidos',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            },
+            'examples': {
+                'application/json': {'error': 'O parâmetro "limit" deve estar entre 1 e 1000'}
+            }
+        },
         500: {
             'description': 'Erro ao conectar ao banco de dados',
             'schema': {
@@ -103,65 +254,158 @@ def get_db_connection():
     }
 })
 def listar_alunos():
-    conn = get_db_connection()
+    paginado = any(parametro in request.args for parametro in ('limit', 'after', 'cursor'))
+    try:
+        limit = _inteiro_estrito(request.args.get('limit', str(PAGINA_PADRAO)))
+    except ValueError:
+        return jsonify({'error': 'O parâmetro "limit" deve ser inteiro'}), 400
+    if paginado and not 1 <= limit <= PAGINA_MAXIMA:
+        return jsonify({'error': f'O parâmetro "limit" deve estar entre 1 e {PAGINA_MAXIMA}'}), 400
+    try:
+        consulta = ConsultaAlunos(request.args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    with medir('conexao'):
+        conn = _conexao_leitura()
     if not conn:
         return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
-    
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+    if not paginado:
+        return _transmitir_alunos(conn, consulta)
+
     try:
-        cur.execute('SELECT * FROM Aluno;')
-        alunos = cur.fetchall()
-        result = [dict(aluno) for aluno in alunos]  # Converte os dados para dict
+        # Keyset: busca um registro a mais só para saber se existe próxima página
+        with medir('consulta'):
+            alunos = repositorio_alunos.consultar(conn, *consulta.sql(limit + 1, NO_BANCO))
+        registrar_linhas(len(alunos))
+        with medir('serializacao'):
+            if NO_BANCO:
+                corpo = '[' + ','.join(aluno[0] for aluno in alunos[:limit]) + ']'
+            else:
+                corpo = linhas_json(consulta.campos, alunos[:limit])
     except psycopg2.Error as e:
         return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
     finally:
-        cur.close()
-        conn.close()
-    
-    return jsonify(result), 200
+        release_db_connection(conn)
 
-@app.route('/alunos', methods=['POST'])
+    response = resposta_json(corpo)
+    if len(alunos) > limit:
+        parametros = {chave: valor for chave, valor in request.args.items() if chave not in ('after', 'cursor')}
+        parametros.update(consulta.proxima_pagina(alunos[limit - 1], NO_BANCO), limit=limit)
+        proxima = url_for('listar_alunos', _external=True, **parametros)
+        response.headers['Link'] = f'<{proxima}>; rel="next"'
+    return response
+
+def _inteiro_estrito(valor):
+    # Ao contrário de int(), não aceita espaços nem sinais: '  5' e '+5' são inválidos
+    if not valor.isdigit():
+        raise ValueError(valor)
+    return int(valor)
+
+# Parâmetro inteiro opcional da query string: None se ausente
+def _filtro_inteiro(nome):
+    valor = request.args.get(nome)
+    if valor is None:
+        return None
+    try:
+        return _inteiro_estrito(valor)
+    except ValueError:
+        raise ParametroInvalido(f'O parâmetro "{nome}" deve ser inteiro')
+
+def _transmitir_alunos(conn, consulta):
+    """Envia todos os alunos como um array JSON, lendo em blocos de um cursor no servidor.
+
+    Aqui o JSON é sempre montado no banco (``row_to_json``), independente de
+    ``SERIALIZACAO_JSON``: na tabela inteira a aplicação só concatena o texto.
+    """
+    lotes = repositorio_alunos.lotes(conn, *consulta.sql(json_no_banco=True), tamanho=BLOCO_STREAMING)
+    try:
+        # O primeiro lote é lido já, para um erro na consulta ainda virar 500
+        with medir('consulta'):
+            alunos = next(lotes, None)
+    except psycopg2.Error as e:
+        release_db_connection(conn)
+        return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
+
+    def gerar(alunos):
+        try:
+            yield b'['
+            separador = b''
+            while alunos:
+                registrar_linhas(len(alunos))
+                with medir('serializacao'):
+                    bloco = ','.join(aluno[0] for aluno in alunos).encode('utf-8')
+                yield separador + bloco
+                separador = b','
+                with medir('consulta'):
+                    alunos = next(lotes, None)
+            yield b']'
+        finally:
+            # Executa mesmo se o cliente desconectar no meio da resposta
+            lotes.close()
+            release_db_connection(conn)
+
+    return Response(stream_with_context(gerar(alunos)), status=200, mimetype='application/json')
+
+@app.route('/alunos/search', methods=['GET'])
 @swag_from({
     'tags': ['Alunos'],
-    'summary': 'Cadastra um novo aluno',
-    'description': 'Endpoint para cadastrar um novo aluno no sistema',
+    'summary': 'Busca alunos pelo nome',
+    'description': 'Endpoint de busca e autocompletar pelo nome do aluno ou do responsável, sem diferenciar acentos '
+                   'nem maiúsculas. Primeiro vêm os alunos cujo nome começa com o texto digitado ("prefixo"), depois '
+                   'os que têm palavras começando com cada termo ("palavras"), ordenados por relevância. Se nada for '
+                   'encontrado e o banco tiver a extensão pg_trgm, retorna nomes parecidos ("aproximada").',
     'parameters': [
         {
-            'name': 'body',
-            'in': 'body',
+            'name': 'q',
+            'in': 'query',
+            'type': 'string',
             'required': True,
-            'description': 'Dados do aluno a ser cadastrado',
-            'schema': {
-                'type': 'object',
-                'required': ['nome_completo'],
-                'properties': {
-                    'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
-                    'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
-                    'id_turma': {'type': 'integer', 'description': 'ID da turma do aluno'},
-                    'nome_responsavel': {'type': 'string', 'description': 'Nome do responsável pelo aluno'},
-                    'telefone_responsavel': {'type': 'string', 'description': 'Telefone do responsável'},
-                    'email_responsavel': {'type': 'string', 'description': 'Email do responsável'},
-                    'informacoes_adicionais': {'type': 'string', 'description': 'Informações adicionais sobre o aluno'}
-                }
-            }
+            'description': 'Texto digitado (parte do nome)'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': f'Máximo de resultados (1 a {BUSCA_MAXIMA}, padrão {BUSCA_PADRAO})'
         }
     ],
     'responses': {
-        201: {
-            'description': 'Aluno cadastrado com sucesso',
+        200: {
+            'description': 'Alunos encontrados, do mais ao menos relevante',
             'schema': {
                 'type': 'object',
                 'properties': {
-                    'message': {'type': 'string'},
-                    'id_aluno': {'type': 'integer'}
+                    'q': {'type': 'string'},
+                    'alunos': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id_aluno': {'type': 'integer'},
+                                'nome_completo': {'type': 'string'},
+                                'nome_responsavel': {'type': 'string'},
+                                'id_turma': {'type': 'integer'},
+                                'correspondencia': {'type': 'string', 'enum': ['prefixo', 'palavras', 'aproximada']}
+                            }
+                        }
+                    }
                 }
             },
             'examples': {
-                'application/json': {'message': 'Aluno cadastrado com sucesso!', 'id_aluno': 1}
+                'application/json': {
+                    'q': 'joao sil',
+                    'alunos': [
+                        {'id_aluno': 1, 'nome_completo': 'João da Silva', 'nome_responsavel': 'Maria da Silva',
+                         'id_turma': 1, 'correspondencia': 'palavras'}
+                    ]
+                }
             }
         },
         400: {
-            'description': 'Dados inválidos',
+            'description': 'Parâmetro inválido',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -169,11 +413,11 @@ def listar_alunos():
                 }
             },
             'examples': {
-                'application/json': {'error': 'O campo "nome_completo" é obrigatório'}
+                'application/json': {'error': 'Informe o texto da busca no parâmetro "q"'}
             }
         },
         500: {
-            'description': 'Erro ao conectar ao banco de dados ou inserir dados',
+            'description': 'Erro ao conectar ao banco de dados ou consultar os dados',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -183,88 +427,111 @@ def listar_alunos():
         }
     }
 })
-def cadastrar_aluno():
-    novo_aluno = request.json
-    
-    # Validação básica
-    if not novo_aluno or not novo_aluno.get('nome_completo'):
-        return jsonify({'error': 'O campo "nome_completo" é obrigatório'}), 400
-    
-    conn = get_db_connection()
+def buscar_alunos():
+    try:
+        texto, termos = ler_busca(request.args.get('q'))
+        limit = _filtro_inteiro('limit')
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    if limit is None:
+        limit = BUSCA_PADRAO
+    elif not 1 <= limit <= BUSCA_MAXIMA:
+        return jsonify({'error': f'O parâmetro "limit" deve estar entre 1 e {BUSCA_MAXIMA}'}), 400
+
+    with medir('conexao'):
+        conn = _conexao_leitura()
     if not conn:
         return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
 
     cur = conn.cursor()
     try:
-        cur.execute(
-            '''INSERT INTO Aluno (nome_completo, data_nascimento, id_turma, nome_responsavel, telefone_responsavel, email_responsavel, informacoes_adicionais)
-               VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id_aluno''',
-            (novo_aluno.get('nome_completo'),
-             novo_aluno.get('data_nascimento'),
-             novo_aluno.get('id_turma'),
-             novo_aluno.get('nome_responsavel'),
-             novo_aluno.get('telefone_responsavel'),
-             novo_aluno.get('email_responsavel'),
-             novo_aluno.get('informacoes_adicionais'))
-        )
-        aluno_id = cur.fetchone()[0]
-        conn.commit()
+        with medir('consulta'):
+            comandos.executar(cur, BUSCAR_ALUNOS_NOME, parametros_busca(texto, termos, limit))
+            alunos = cur.fetchall()
+            if not alunos and trigramas_disponiveis(cur):
+                cur.execute(BUSCAR_ALUNOS_APROXIMADA, parametros_aproximada(texto, limit))
+                alunos = cur.fetchall()
+            nomes = colunas(cur)
+        registrar_linhas(len(alunos))
     except psycopg2.Error as e:
-        return jsonify({'error': f'Erro ao inserir dados: {e}'}), 500
+        return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
     finally:
         cur.close()
-        conn.close()
-    
-    return jsonify({'message': 'Aluno cadastrado com sucesso!', 'id_aluno': aluno_id}), 201
+        release_db_connection(conn)
 
-@app.route('/alunos/<int:id>', methods=['PUT'])
+    with medir('serializacao'):
+        corpo = objeto_json({'q': texto}, alunos=linhas_json(nomes, alunos))
+    return resposta_json(corpo)
+
+@app.route('/alunos/export', methods=['GET'])
 @swag_from({
     'tags': ['Alunos'],
-    'summary': 'Atualiza os dados de um aluno',
-    'description': 'Endpoint para atualizar os dados de um aluno existente',
+    'summary': 'Exporta os alunos em CSV ou NDJSON',
+    'description': 'Endpoint para exportar a lista de alunos inteira, com os mesmos filtros, campos e ordenação de '
+                   'GET /alunos. O arquivo é gerado pelo COPY do PostgreSQL e transmitido à medida que sai do banco, '
+                   'sem carregar a tabela na memória. Com "Accept-Encoding: gzip" a resposta vem comprimida.',
+    'produces': ['text/csv', 'application/x-ndjson'],
     'parameters': [
         {
-            'name': 'id',
-            'in': 'path',
-            'type': 'integer',
-            'required': True,
-            'description': 'ID do aluno a ser atualizado'
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(FORMATOS),
+            'required': False,
+            'description': 'Formato do arquivo (padrão: csv, com cabeçalho)'
         },
         {
-            'name': 'body',
-            'in': 'body',
-            'required': True,
-            'description': 'Novos dados do aluno',
-            'schema': {
-                'type': 'object',
-                'properties': {
-                    'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
-                    'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
-                    'id_turma': {'type': 'integer', 'description': 'ID da turma do aluno'},
-                    'nome_responsavel': {'type': 'string', 'description': 'Nome do responsável pelo aluno'},
-                    'telefone_responsavel': {'type': 'string', 'description': 'Telefone do responsável'},
-                    'email_responsavel': {'type': 'string', 'description': 'Email do responsável'},
-                    'informacoes_adicionais': {'type': 'string', 'description': 'Informações adicionais sobre o aluno'}
-                }
-            }
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Colunas separadas por vírgula (id_aluno sempre incluído)'
+        },
+        {
+            'name': 'id_turma',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Filtra por uma ou mais turmas (ex.: 1,2,3)'
+        },
+        {
+            'name': 'data_nascimento_min',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': 'Nascidos a partir desta data (AAAA-MM-DD)'
+        },
+        {
+            'name': 'data_nascimento_max',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': 'Nascidos até esta data (AAAA-MM-DD)'
+        },
+        {
+            'name': 'order_by',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Coluna de ordenação: id_aluno (padrão), nome_completo ou data_nascimento; prefixo "-" para decrescente'
         }
     ],
     'responses': {
         200: {
-            'description': 'Aluno atualizado com sucesso',
-            'schema': {
-                'type': 'object',
-                'properties': {
-                    'message': {'type': 'string'},
-                    'id_aluno': {'type': 'integer'}
-                }
+            'description': 'Arquivo com os alunos, transmitido aos poucos',
+            'headers': {
+                'Content-Disposition': {'type': 'string', 'description': 'attachment; filename="alunos.csv"'},
+                'Content-Encoding': {'type': 'string', 'description': 'gzip, quando o cliente aceita'}
             },
             'examples': {
-                'application/json': {'message': 'Aluno atualizado com sucesso!', 'id_aluno': 1}
+                'text/csv': 'id_aluno,nome_completo,data_nascimento\n1,João da Silva,2010-05-15\n',
+                'application/x-ndjson': '{"id_aluno":1,"nome_completo":"João da Silva","data_nascimento":"2010-05-15"}\n'
             }
         },
-        404: {
-            'description': 'Aluno não encontrado',
+        400: {
+            'description': 'Formato ou filtro inválido',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -272,11 +539,11 @@ def cadastrar_aluno():
                 }
             },
             'examples': {
-                'application/json': {'error': 'Aluno não encontrado'}
+                'application/json': {'error': 'O parâmetro "format" deve ser csv ou ndjson'}
             }
         },
         500: {
-            'description': 'Erro ao conectar ao banco de dados ou atualizar dados',
+            'description': 'Erro ao conectar ao banco de dados ou exportar os dados',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -286,57 +553,71 @@ def cadastrar_aluno():
         }
     }
 })
-def atualizar_aluno(id):
-    dados_atualizados = request.json
+def exportar_alunos():
+    formato = request.args.get('format', 'csv')
+    if formato not in FORMATOS:
+        return jsonify({'error': f'O parâmetro "format" deve ser {" ou ".join(FORMATOS)}'}), 400
+    try:
+        consulta = ConsultaAlunos(request.args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    comprimir = request.accept_encodings['gzip'] > 0
 
-    conn = get_db_connection()
+    with medir('conexao'):
+        conn = _conexao_leitura()
     if not conn:
         return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
 
-    cur = conn.cursor()
+    def terminar(conn, linhas):
+        if linhas is not None:
+            registrar_linhas(linhas)
+        release_db_connection(conn)
+
+    with conn.cursor() as cur:
+        comando = comando_copy(cur, *consulta.sql(), formato)
     try:
-        cur.execute(
-            '''UPDATE Aluno
-               SET nome_completo = %s, data_nascimento = %s, id_turma = %s, nome_responsavel = %s, telefone_responsavel = %s, email_responsavel = %s, informacoes_adicionais = %s
-               WHERE id_aluno = %s RETURNING id_aluno''',
-            (dados_atualizados.get('nome_completo'),
-             dados_atualizados.get('data_nascimento'),
-             dados_atualizados.get('id_turma'),
-             dados_atualizados.get('nome_responsavel'),
-             dados_atualizados.get('telefone_responsavel'),
-             dados_atualizados.get('email_responsavel'),
-             dados_atualizados.get('informacoes_adicionais'),
-             id)
-        )
-        conn.commit()
-        aluno_id = cur.fetchone()
-        if not aluno_id:
-            return jsonify({'error': 'Aluno não encontrado'}), 404
+        with medir('consulta'):
+            blocos = iniciar(transmitir_copy(conn, comando, comprimir, terminar))
     except psycopg2.Error as e:
-        return jsonify({'error': f'Erro ao atualizar dados: {e}'}), 500
-    finally:
-        cur.close()
-        conn.close()
-    
-    return jsonify({'message': 'Aluno atualizado com sucesso!', 'id_aluno': id}), 200
+        return jsonify({'error': f'Erro ao exportar dados: {e}'}), 500
 
-@app.route('/alunos/<int:id>', methods=['DELETE'])
+    mimetype, extensao = FORMATOS[formato]
+    response = Response(stream_with_context(blocos), status=200, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="alunos.{extensao}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if comprimir:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.route('/alunos', methods=['POST'])
 @swag_from({
     'tags': ['Alunos'],
-    'summary': 'Remove um aluno',
-    'description': 'Endpoint para excluir um aluno do sistema',
+    'summary': 'Cadastra um novo aluno',
+    'description': 'Endpoint para cadastrar um novo aluno no sistema',
     'parameters': [
         {
-            'name': 'id',
-            'in': 'path',
-            'type': 'integer',
+            'name': 'body',
+            'in': 'body',
             'required': True,
-            'description': 'ID do aluno a ser excluído'
+            'description': 'Dados do aluno a ser cadastrado',
+            'schema': {
+                'type': 'object',
+                'required': ['nome_completo', 'data_nascimento'],
+                'properties': {
+                    'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
+                    'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
+                    'id_turma': {'type': 'integer', 'description': 'ID da turma do aluno'},
+                    'nome_responsavel': {'type': 'string', 'description': 'Nome do responsável pelo aluno'},
+                    'telefone_responsavel': {'type': 'string', 'description': 'Telefone do responsável'},
+                    'email_responsavel': {'type': 'string', 'description': 'Email do responsável'},
+                    'informacoes_adicionais': {'type': 'string', 'description': 'Informações adicionais sobre o aluno'}
+                }
+            }
         }
     ],
     'responses': {
-        200: {
-            'description': 'Aluno excluído com sucesso',
+        201: {
+            'description': 'Aluno cadastrado com sucesso',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -345,11 +626,11 @@ def atualizar_aluno(id):
                 }
             },
             'examples': {
-                'application/json': {'message': 'Aluno excluído com sucesso!', 'id_aluno': 1}
+                'application/json': {'message': 'Aluno cadastrado com sucesso!', 'id_aluno': 1}
             }
         },
-        404: {
-            'description': 'Aluno não encontrado',
+        400: {
+            'description': 'Dados inválidos',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -357,11 +638,11 @@ def atualizar_aluno(id):
                 }
             },
             'examples': {
-                'application/json': {'error': 'Aluno não encontrado'}
+                'application/json': {'error': 'O campo "nome_completo" é obrigatório'}
             }
         },
         500: {
-            'description': 'Erro ao conectar ao banco de dados ou excluir dados',
+            'description': 'Erro ao conectar ao banco de dados ou inserir dados',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -371,67 +652,260 @@ def atualizar_aluno(id):
         }
     }
 })
-def excluir_aluno(id):
-    conn = get_db_connection()
+def cadastrar_aluno():
+    novo_aluno = request.json
+    
+    # Campos obrigatórios e tipo de cada valor
+    erro = validar_aluno(novo_aluno)
+    if erro:
+        return jsonify({'error': erro}), 400
+    
+    with medir('conexao'):
+        conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
 
-    cur = conn.cursor()
     try:
-        cur.execute('DELETE FROM Aluno WHERE id_aluno = %s RETURNING id_aluno', (id,))
-        conn.commit()
-        aluno_id = cur.fetchone()
-        if not aluno_id:
-            return jsonify({'error': 'Aluno não encontrado'}), 404
+        with medir('consulta'):
+            # Sempre todas as colunas, para ser o mesmo INSERT preparado
+            aluno_id = repositorio_alunos.inserir(conn, {coluna: novo_aluno.get(coluna) for coluna in COLUNAS_ALUNO})
+            _confirmar(conn)
+    except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+        return _recusado_pelo_banco(e)
     except psycopg2.Error as e:
-        return jsonify({'error': f'Erro ao excluir dados: {e}'}), 500
+        return jsonify({'error': f'Erro ao inserir dados: {e}'}), 500
     finally:
-        cur.close()
-        conn.close()
+        release_db_connection(conn)
     
-    return jsonify({'message': 'Aluno excluído com sucesso!', 'id_aluno': id}), 200
+    return jsonify({'message': 'Aluno cadastrado com sucesso!', 'id_aluno': aluno_id}), 201
 
-# Rota para obter um aluno específico por ID
-@app.route('/alunos/<int:id>', methods=['GET'])
+@app.route('/alunos/bulk', methods=['POST'])
 @swag_from({
     'tags': ['Alunos'],
-    'summary': 'Retorna um aluno específico',
-    'description': 'Endpoint para obter os detalhes de um aluno específico pelo ID',
+    'summary': 'Cadastra vários alunos de uma vez',
+    'description': 'Endpoint para importar matrículas em lote. Aceita um array JSON, NDJSON (um aluno por linha) '
+                   'ou CSV com cabeçalho, no corpo da requisição ou como arquivo no campo "arquivo". '
+                   'Cada linha é validada como no cadastro individual (campos obrigatórios, tipo de cada valor e '
+                   'turma existente); as válidas são gravadas numa única transação e as inválidas são devolvidas '
+                   'em "errors".',
+    'consumes': ['application/json', 'application/x-ndjson', 'text/csv', 'multipart/form-data'],
     'parameters': [
         {
-            'name': 'id',
-            'in': 'path',
-            'type': 'integer',
-            'required': True,
-            'description': 'ID do aluno a ser consultado'
+            'name': 'body',
+            'in': 'body',
+            'required': False,
+            'description': 'Lista de alunos (mesmos campos do cadastro individual)',
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'required': ['nome_completo', 'data_nascimento'],
+                    'properties': {
+                        'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
+                        'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
+                        'id_turma': {'type': 'integer', 'description': 'ID da turma do aluno'},
+                        'nome_responsavel': {'type': 'string', 'description': 'Nome do responsável pelo aluno'},
+                        'telefone_responsavel': {'type': 'string', 'description': 'Telefone do responsável'},
+                        'email_responsavel': {'type': 'string', 'description': 'Email do responsável'},
+                        'informacoes_adicionais': {'type': 'string', 'description': 'Informações adicionais sobre o aluno'}
+                    }
+                }
+            }
+        },
+        {
+            'name': 'arquivo',
+            'in': 'formData',
+            'type': 'file',
+            'required': False,
+            'description': 'Arquivo .json, .ndjson ou .csv com os alunos'
         }
     ],
     'responses': {
-        200: {
-            'description': 'Aluno encontrado com sucesso',
+        201: {
+            'description': 'Alunos válidos cadastrados com sucesso',
             'schema': {
                 'type': 'object',
                 'properties': {
-                    'id_aluno': {'type': 'integer', 'description': 'ID único do aluno'},
-                    'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
-                    'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
+                    'message': {'type': 'string'},
+                    'cadastrados': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'linha': {'type': 'integer'},
+                                'id_aluno': {'type': 'integer'}
+                            }
+                        }
+                    },
+                    'errors': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'linha': {'type': 'integer'},
+                                'error': {'type': 'string'}
+                            }
+                        }
+                    }
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'message': '2 alunos cadastrados com sucesso!',
+                    'cadastrados': [{'linha': 1, 'id_aluno': 10}, {'linha': 3, 'id_aluno': 11}],
+                    'errors': [{'linha': 2, 'error': 'O campo "nome_completo" é obrigatório'}]
+                }
+            }
+        },
+        400: {
+            'description': 'Conteúdo ilegível ou nenhum aluno válido',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'},
+                    'errors': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }
+        },
+        413: {
+            'description': 'Lote maior que o permitido',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados ou inserir dados; nenhum aluno é gravado',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def cadastrar_alunos_em_lote():
+    # Os limites são conferidos antes de converter qualquer linha
+    if (request.content_length or 0) > LOTE_BYTES_MAXIMO:
+        return jsonify({'error': f'O lote pode ter no máximo {LOTE_BYTES_MAXIMO // (1024 * 1024)} MB'}), 413
+    arquivo = request.files.get('arquivo')
+    try:
+        if arquivo:
+            texto = arquivo.read().decode('utf-8-sig')
+            formato = formato_do_upload(arquivo.mimetype, arquivo.filename)
+        else:
+            texto = request.get_data().decode('utf-8-sig')
+            formato = formato_do_upload(request.mimetype)
+        registros = list(itertools.islice(ler_registros(texto, formato), LOTE_MAXIMO + 1))
+    except UnicodeDecodeError:
+        return jsonify({'error': 'O conteúdo deve estar codificado em UTF-8'}), 400
+    except ErroImportacao as e:
+        return jsonify({'error': str(e)}), 400
+
+    if len(registros) > LOTE_MAXIMO:
+        return jsonify({'error': f'O lote pode ter no máximo {LOTE_MAXIMO} alunos'}), 413
+    linhas, valores, erros = separar_validos(registros)
+    if not valores:
+        return jsonify({'error': 'Nenhum aluno válido para cadastrar', 'errors': erros}), 400
+
+    with medir('conexao'):
+        conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    cur = conn.cursor()
+    try:
+        with medir('consulta'):
+            turmas = turmas_do_lote(valores)
+            if turmas:
+                cur.execute(TURMAS_EXISTENTES, (turmas,))
+                linhas, valores, sem_turma = separar_turmas_inexistentes(linhas, valores, {t for t, in cur.fetchall()})
+                erros = sorted(erros + sem_turma, key=lambda erro: erro['linha'])
+        if not valores:
+            return jsonify({'error': 'Nenhum aluno válido para cadastrar', 'errors': erros}), 400
+
+        # INSERTs de várias linhas, todos na mesma transação
+        with medir('consulta'):
+            ids = psycopg2.extras.execute_values(
+                cur,
+                f"INSERT INTO Aluno ({', '.join(COLUNAS_ALUNO)}) VALUES %s RETURNING id_aluno",
+                valores,
+                page_size=LOTE_PAGINA,
+                fetch=True
+            )
+            _confirmar(conn)
+    except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+        # Ex.: turma excluída depois da verificação, texto maior que a coluna
+        return _recusado_pelo_banco(e)
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao inserir dados: {e}'}), 500
+    finally:
+        cur.close()
+        release_db_connection(conn)
+
+    cadastrados = [{'linha': linha, 'id_aluno': id_aluno} for linha, (id_aluno,) in zip(linhas, ids)]
+    return jsonify({
+        'message': f'{len(cadastrados)} alunos cadastrados com sucesso!',
+        'cadastrados': cadastrados,
+        'errors': erros
+    }), 201
+
+@app.route('/alunos/<int:id>', methods=['PUT'])
+@swag_from({
+    'tags': ['Alunos'],
+    'summary': 'Atualiza os dados de um aluno',
+    'description': 'Endpoint para atualizar os dados de um aluno existente',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID do aluno a ser atualizado'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'description': 'Novos dados do aluno; os campos omitidos ficam nulos',
+            'schema': {
+                'type': 'object',
+                'required': ['nome_completo', 'data_nascimento'],
+                'properties': {
+                    'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
+                    'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
                     'id_turma': {'type': 'integer', 'description': 'ID da turma do aluno'},
                     'nome_responsavel': {'type': 'string', 'description': 'Nome do responsável pelo aluno'},
                     'telefone_responsavel': {'type': 'string', 'description': 'Telefone do responsável'},
                     'email_responsavel': {'type': 'string', 'description': 'Email do responsável'},
                     'informacoes_adicionais': {'type': 'string', 'description': 'Informações adicionais sobre o aluno'}
                 }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Aluno atualizado com sucesso',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'id_aluno': {'type': 'integer'}
+                }
             },
             'examples': {
-                'application/json': {
-                    'id_aluno': 1,
-                    'nome_completo': 'João da Silva',
-                    'data_nascimento': '2010-05-15',
-                    'id_turma': 3,
-                    'nome_responsavel': 'Maria da Silva',
-                    'telefone_responsavel': '(11) 98765-4321',
-                    'email_responsavel': 'maria@exemplo.com',
-                    'informacoes_adicionais': 'Alergia a amendoim'
+                'application/json': {'message': 'Aluno atualizado com sucesso!', 'id_aluno': 1}
+            }
+        },
+        400: {
+            'description': 'Campo obrigatório ausente, valor inválido ou recusado pelo banco (ex.: turma inexistente)',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
                 }
             }
         },
@@ -448,7 +922,7 @@ def excluir_aluno(id):
             }
         },
         500: {
-            'description': 'Erro ao conectar ao banco de dados',
+            'description': 'Erro ao conectar ao banco de dados ou atualizar dados',
             'schema': {
                 'type': 'object',
                 'properties': {
@@ -458,25 +932,1084 @@ def excluir_aluno(id):
         }
     }
 })
-def obter_aluno(id):
-    conn = get_db_connection()
+def atualizar_aluno(id):
+    dados_atualizados = request.json
+    erro = validar_aluno(dados_atualizados)
+    if erro:
+        return jsonify({'error': erro}), 400
+
+    with medir('conexao'):
+        conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
-    
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
     try:
-        cur.execute('SELECT * FROM Aluno WHERE id_aluno = %s;', (id,))
-        aluno = cur.fetchone()
-        if not aluno:
-            return jsonify({'error': 'Aluno não encontrado'}), 404
-        result = dict(aluno)
+        with medir('consulta'):
+            # Substitui o aluno inteiro: coluna ausente do corpo fica nula
+            alterado = repositorio_alunos.atualizar(
+                conn, id, {coluna: dados_atualizados.get(coluna) for coluna in COLUNAS_ALUNO})
+            if alterado:
+                _confirmar(conn)
+            elif repositorio_alunos.obter(conn, id) is None:
+                return jsonify({'error': 'Aluno não encontrado'}), 404
+    except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+        return _recusado_pelo_banco(e)
     except psycopg2.Error as e:
-        return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
+        return jsonify({'error': f'Erro ao atualizar dados: {e}'}), 500
     finally:
-        cur.close()
-        conn.close()
+        release_db_connection(conn)
     
-    return jsonify(result), 200
+    if alterado:
+        cache_alunos.invalidar(id)
+    return jsonify({'message': 'Aluno atualizado com sucesso!', 'id_aluno': id}), 200
+
+@app.route('/alunos/<int:id>', methods=['PATCH'])
+@swag_from({
+    'tags': ['Alunos'],
+    'summary': 'Atualiza parte dos dados de um aluno',
+    'description': 'Endpoint para alterar apenas os campos enviados; os demais ficam como estão. '
+                   'Se os valores enviados forem iguais aos gravados, nada é escrito no banco. '
+                   'Retorna o aluno como ficou, na mesma ida ao banco.',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID do aluno a ser atualizado'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'description': 'Campos a alterar (ao menos um)',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
+                    'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
+                    'id_turma': {'type': 'integer', 'description': 'ID da turma do aluno (null para remover)'},
+                    'nome_responsavel': {'type': 'string', 'description': 'Nome do responsável pelo aluno'},
+                    'telefone_responsavel': {'type': 'string', 'description': 'Telefone do responsável'},
+                    'email_responsavel': {'type': 'string', 'description': 'Email do responsável'},
+                    'informacoes_adicionais': {'type': 'string', 'description': 'Informações adicionais sobre o aluno'}
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Aluno atualizado, ou sem alterações se os valores já eram os enviados',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'alterado': {'type': 'boolean', 'description': 'Se alguma coluna foi de fato alterada'},
+                    'aluno': {'type': 'object', 'description': 'O aluno depois da atualização'}
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'message': 'Aluno atualizado com sucesso!',
+                    'alterado': True,
+                    'aluno': {
+                        'id_aluno': 1,
+                        'nome_completo': 'João Silva',
+                        'data_nascimento': '2010-05-15',
+                        'id_turma': 3,
+                        'nome_responsavel': 'Maria Silva',
+                        'telefone_responsavel': '(11) 98765-4321',
+                        'email_responsavel': 'maria.silva@email.com',
+                        'informacoes_adicionais': 'Alergia a amendoim'
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Corpo vazio, campo desconhecido, valor inválido ou recusado pelo banco (ex.: turma inexistente)',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            },
+            'examples': {
+                'application/json': {'error': 'Campos desconhecidos: idade'}
+            }
+        },
+        404: {
+            'description': 'Aluno não encontrado',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados ou atualizar dados',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def atualizar_aluno_parcial(id):
+    alteracoes = request.get_json(silent=True)
+    erro = validar_alteracoes(alteracoes)
+    if erro:
+        return jsonify({'error': erro}), 400
+    try:
+        alteracoes = ALUNO.converter(alteracoes, COLUNAS_ALUNO)
+    except ValorInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    with medir('conexao'):
+        conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    try:
+        with medir('consulta'):
+            linhas = repositorio_alunos.consultar(conn, *atualizacao_parcial(id, alteracoes))
+            _confirmar(conn)
+    except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+        return _recusado_pelo_banco(e)
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao atualizar dados: {e}'}), 500
+    finally:
+        release_db_connection(conn)
+
+    if not linhas:
+        return jsonify({'error': 'Aluno não encontrado'}), 404
+    linha = linhas[0]
+    alterado = linha.alterado
+    if alterado:
+        cache_alunos.invalidar(id)
+    with medir('serializacao'):
+        corpo = objeto_json({
+            'message': 'Aluno atualizado com sucesso!' if alterado else 'Nenhuma alteração: os valores enviados já estavam gravados.',
+            'alterado': alterado,
+        }, aluno=linha_json(linha._fields[1:], linha[1:]))
+    return resposta_json(corpo)
+
+@app.route('/alunos/<int:id>', methods=['DELETE'])
+@swag_from({
+    'tags': ['Alunos'],
+    'summary': 'Remove um aluno',
+    'description': 'Endpoint para excluir um aluno do sistema',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID do aluno a ser excluído'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Aluno excluído com sucesso',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'id_aluno': {'type': 'integer'}
+                }
+            },
+            'examples': {
+                'application/json': {'message': 'Aluno excluído com sucesso!', 'id_aluno': 1}
+            }
+        },
+        404: {
+            'description': 'Aluno não encontrado',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            },
+            'examples': {
+                'application/json': {'error': 'Aluno não encontrado'}
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados ou excluir dados',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def excluir_aluno(id):
+    with medir('conexao'):
+        conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    try:
+        with medir('consulta'):
+            removido = repositorio_alunos.excluir(conn, id)
+            _confirmar(conn)
+        if not removido:
+            return jsonify({'error': 'Aluno não encontrado'}), 404
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao excluir dados: {e}'}), 500
+    finally:
+        release_db_connection(conn)
+    
+    cache_alunos.invalidar(id)
+    return jsonify({'message': 'Aluno excluído com sucesso!', 'id_aluno': id}), 200
+
+# Rota para obter um aluno específico por ID
+@app.route('/alunos/<int:id>', methods=['GET'])
+@swag_from({
+    'tags': ['Alunos'],
+    'summary': 'Retorna um aluno específico',
+    'description': 'Endpoint para obter os detalhes de um aluno específico pelo ID',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID do aluno a ser consultado'
+        },
+        {
+            'name': 'X-Cache-Bypass',
+            'in': 'header',
+            'type': 'string',
+            'enum': ['1'],
+            'required': False,
+            'description': 'Com o valor 1 (ou com Cache-Control: no-cache), consulta o banco sem passar pelo cache'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Aluno encontrado com sucesso',
+            'headers': {
+                'X-Cache': {
+                    'type': 'string',
+                    'description': 'HIT se veio do cache, MISS se foi buscado no banco, BYPASS se o cache foi ignorado'
+                }
+            },
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'id_aluno': {'type': 'integer', 'description': 'ID único do aluno'},
+                    'nome_completo': {'type': 'string', 'description': 'Nome completo do aluno'},
+                    'data_nascimento': {'type': 'string', 'format': 'date', 'description': 'Data de nascimento do aluno'},
+                    'id_turma': {'type': 'integer', 'description': 'ID da turma do aluno'},
+                    'nome_responsavel': {'type': 'string', 'description': 'Nome do responsável pelo aluno'},
+                    'telefone_responsavel': {'type': 'string', 'description': 'Telefone do responsável'},
+                    'email_responsavel': {'type': 'string', 'description': 'Email do responsável'},
+                    'informacoes_adicionais': {'type': 'string', 'description': 'Informações adicionais sobre o aluno'}
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'id_aluno': 1,
+                    'nome_completo': 'João da Silva',
+                    'data_nascimento': '2010-05-15',
+                    'id_turma': 3,
+                    'nome_responsavel': 'Maria da Silva',
+                    'telefone_responsavel': '(11) 98765-4321',
+                    'email_responsavel': 'maria@exemplo.com',
+                    'informacoes_adicionais': 'Alergia a amendoim'
+                }
+            }
+        },
+        404: {
+            'description': 'Aluno não encontrado',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            },
+            'examples': {
+                'application/json': {'error': 'Aluno não encontrado'}
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def obter_aluno(id):
+    ignorar_cache = (request.headers.get('X-Cache-Bypass') == '1'
+                     or 'no-cache' in request.headers.get('Cache-Control', ''))
+    try:
+        if ignorar_cache:
+            result, acertou = _carregar_aluno(id, leitura=True), False
+        else:
+            result, acertou = cache_alunos.obter(id, lambda: _carregar_aluno(id))
+    except ConnectionError:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
+
+    if not result:
+        return jsonify({'error': 'Aluno não encontrado'}), 404
+
+    response = resposta_json(result)
+    response.headers['X-Cache'] = 'BYPASS' if ignorar_cache else ('HIT' if acertou else 'MISS')
+    return response, 200
+
+def _carregar_aluno(id, leitura=False):
+    """Busca o aluno no banco já serializado em JSON; retorna ``None`` se ele não existir.
+
+    Só a leitura sem cache (``leitura=True``) pode ir para uma réplica: um
+    valor atrasado lido ali ficaria no cache por todo o TTL.
+    """
+    with medir('conexao'):
+        conn = _conexao_leitura() if leitura else get_db_connection()
+    if not conn:
+        raise ConnectionError('Falha ao conectar ao banco de dados')
+
+    try:
+        with medir('consulta'):
+            if NO_BANCO:
+                aluno = repositorio_alunos.obter_json(conn, id)
+            else:
+                aluno = repositorio_alunos.obter(conn, id)
+        registrar_linhas(0 if aluno is None else 1)
+        if aluno is None:
+            return None
+        with medir('serializacao'):
+            return aluno.encode('utf-8') if NO_BANCO else linha_json(aluno._fields, aluno)
+    finally:
+        release_db_connection(conn)
+
+# Rota para registrar a chamada diária de uma turma
+@app.route('/turmas/<int:id_turma>/presencas/<data>', methods=['PUT'])
+@swag_from({
+    'tags': ['Presenças'],
+    'summary': 'Registra a chamada de uma turma num dia',
+    'description': 'Endpoint para o professor enviar a presença de todos os alunos da turma de uma vez. '
+                   'A chamada inteira é gravada num único comando; reenviar a chamada do mesmo dia '
+                   'sobrescreve as presenças anteriores. Alunos que não pertencem à turma são ignorados '
+                   'e listados em "fora_da_turma".',
+    'parameters': [
+        {
+            'name': 'id_turma',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID da turma'
+        },
+        {
+            'name': 'data',
+            'in': 'path',
+            'type': 'string',
+            'format': 'date',
+            'required': True,
+            'description': 'Dia da chamada (AAAA-MM-DD)'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'description': 'Presença de cada aluno, pelo id',
+            'schema': {
+                'type': 'object',
+                'required': ['presencas'],
+                'properties': {
+                    'presencas': {
+                        'type': 'object',
+                        'additionalProperties': {'type': 'boolean'},
+                        'description': 'Mapa id_aluno -> true (presente) ou false (ausente)'
+                    }
+                },
+                'example': {'presencas': {'1': True, '2': False, '3': True}}
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Chamada gravada',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'inseridas': {'type': 'integer', 'description': 'Presenças novas'},
+                    'atualizadas': {'type': 'integer', 'description': 'Presenças que mudaram em relação ao envio anterior'},
+                    'inalteradas': {'type': 'integer', 'description': 'Presenças reenviadas com o mesmo valor'},
+                    'fora_da_turma': {'type': 'array', 'items': {'type': 'integer'}, 'description': 'Alunos ignorados por não pertencerem à turma'}
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'message': 'Chamada registrada com sucesso!',
+                    'inseridas': 2,
+                    'atualizadas': 1,
+                    'inalteradas': 0,
+                    'fora_da_turma': []
+                }
+            }
+        },
+        400: {
+            'description': 'Data ou corpo inválidos',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            },
+            'examples': {
+                'application/json': {'error': 'A presença do aluno 2 deve ser true ou false'}
+            }
+        },
+        404: {
+            'description': 'Turma não encontrada',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados ou gravar a chamada',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def registrar_chamada(id_turma, data):
+    try:
+        dia = ler_data(data)
+        ids, presencas = ler_chamada(request.get_json(silent=True))
+    except ErroChamada as e:
+        return jsonify({'error': str(e)}), 400
+
+    with medir('conexao'):
+        conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    cur = conn.cursor()
+    try:
+        with medir('consulta'):
+            comandos.executar(cur, GRAVAR_CHAMADA_TURMA, (ids, presencas, id_turma, dia, id_turma))
+            turma_existe, inseridas, atualizadas, da_turma, fora_da_turma = cur.fetchone()
+            _confirmar(conn)
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao gravar a chamada: {e}'}), 500
+    finally:
+        cur.close()
+        release_db_connection(conn)
+
+    if not turma_existe:
+        return jsonify({'error': 'Turma não encontrada'}), 404
+    return jsonify({
+        'message': 'Chamada registrada com sucesso!',
+        'inseridas': inseridas,
+        'atualizadas': atualizadas,
+        'inalteradas': da_turma - inseridas - atualizadas,
+        'fora_da_turma': fora_da_turma
+    }), 200
+
+@app.route('/relatorios/frequencia', methods=['GET'])
+@swag_from({
+    'tags': ['Relatórios'],
+    'summary': 'Frequência das turmas em um mês',
+    'description': 'Endpoint que retorna, por turma, os dias letivos, os registros de presença e a taxa de presença do mês. '
+                   'Os números vêm de uma tabela de resumo atualizada incrementalmente; o campo "atualizacao" informa '
+                   'quando ela foi recalculada pela última vez e quantos períodos do mês ainda aguardam recálculo.',
+    'parameters': [
+        {
+            'name': 'mes',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Mês do relatório (AAAA-MM); padrão: mês atual'
+        },
+        {
+            'name': 'id_turma',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Restringe o relatório a uma turma'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Frequência por turma',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'mes': {'type': 'string', 'format': 'date'},
+                    'turmas': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id_turma': {'type': 'integer'},
+                                'nome_turma': {'type': 'string'},
+                                'dias_letivos': {'type': 'integer', 'description': 'Dias com chamada registrada'},
+                                'registros': {'type': 'integer', 'description': 'Presenças e faltas registradas'},
+                                'presencas': {'type': 'integer'},
+                                'taxa_presenca': {'type': 'number', 'description': 'presencas / registros'}
+                            }
+                        }
+                    },
+                    'atualizacao': {
+                        'type': 'object',
+                        'properties': {
+                            'ultima_atualizacao': {'type': 'string', 'format': 'date-time'},
+                            'periodos_pendentes': {'type': 'integer', 'description': 'Turmas do mês com alterações ainda não recalculadas'},
+                            'atualizado': {'type': 'boolean'}
+                        }
+                    }
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'mes': '2024-03-01',
+                    'turmas': [
+                        {'id_turma': 1, 'nome_turma': 'Maternal I', 'dias_letivos': 21, 'registros': 420,
+                         'presencas': 389, 'taxa_presenca': 0.9262}
+                    ],
+                    'atualizacao': {'ultima_atualizacao': '2024-03-22T08:15:02', 'periodos_pendentes': 0, 'atualizado': True}
+                }
+            }
+        },
+        400: {
+            'description': 'Parâmetro inválido',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            },
+            'examples': {
+                'application/json': {'error': 'O parâmetro "mes" deve estar no formato AAAA-MM'}
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados ou consultar o relatório',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def relatorio_frequencia():
+    try:
+        mes = ler_mes(request.args.get('mes'))
+        id_turma = _filtro_inteiro('id_turma')
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    with medir('conexao'):
+        conn = _conexao_leitura()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    cur = conn.cursor()
+    try:
+        with medir('consulta'):
+            cur.execute(FREQUENCIA_TURMAS, {'mes': mes, 'id_turma': id_turma})
+            turmas = cur.fetchall()
+            nomes = colunas(cur)
+            atualizacao = frescor(cur, 'presenca', mes, id_turma)
+        registrar_linhas(len(turmas))
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao consultar o relatório: {e}'}), 500
+    finally:
+        cur.close()
+        release_db_connection(conn)
+
+    with medir('serializacao'):
+        corpo = objeto_json({'mes': mes, 'atualizacao': atualizacao}, turmas=linhas_json(nomes, turmas))
+    return resposta_json(corpo)
+
+@app.route('/relatorios/pagamentos', methods=['GET'])
+@swag_from({
+    'tags': ['Relatórios'],
+    'summary': 'Pagamentos dos alunos em um mês',
+    'description': 'Endpoint que retorna, por aluno, a quantidade de pagamentos, o valor total e o valor pendente do mês, '
+                   'paginado por id_aluno. Os números vêm de uma tabela de resumo atualizada incrementalmente; '
+                   'o campo "atualizacao" informa o frescor dos dados e o cabeçalho Link aponta para a próxima página.',
+    'parameters': [
+        {
+            'name': 'mes',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Mês do relatório (AAAA-MM); padrão: mês atual'
+        },
+        {
+            'name': 'id_turma',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Somente alunos desta turma'
+        },
+        {
+            'name': 'id_aluno',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Somente este aluno'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': f'Alunos por página (1 a {PAGINA_MAXIMA}, padrão {PAGINA_PADRAO})'
+        },
+        {
+            'name': 'after',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Retorna alunos com id maior que este (cursor da página anterior)'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Pagamentos por aluno',
+            'headers': {
+                'Link': {'type': 'string', 'description': 'URL da próxima página (rel="next"), quando houver'}
+            },
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'mes': {'type': 'string', 'format': 'date'},
+                    'alunos': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id_aluno': {'type': 'integer'},
+                                'nome_completo': {'type': 'string'},
+                                'id_turma': {'type': 'integer'},
+                                'pagamentos': {'type': 'integer'},
+                                'valor_total': {'type': 'number'},
+                                'valor_pendente': {'type': 'number'}
+                            }
+                        }
+                    },
+                    'atualizacao': {
+                        'type': 'object',
+                        'properties': {
+                            'ultima_atualizacao': {'type': 'string', 'format': 'date-time'},
+                            'periodos_pendentes': {'type': 'integer', 'description': 'Alunos do mês com alterações ainda não recalculadas'},
+                            'atualizado': {'type': 'boolean'}
+                        }
+                    }
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'mes': '2024-03-01',
+                    'alunos': [
+                        {'id_aluno': 1, 'nome_completo': 'João da Silva', 'id_turma': 1, 'pagamentos': 1,
+                         'valor_total': 450.0, 'valor_pendente': 0.0}
+                    ],
+                    'atualizacao': {'ultima_atualizacao': '2024-03-22T08:15:02', 'periodos_pendentes': 3, 'atualizado': False}
+                }
+            }
+        },
+        400: {
+            'description': 'Parâmetro inválido',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados ou consultar o relatório',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def relatorio_pagamentos():
+    try:
+        mes = ler_mes(request.args.get('mes'))
+        filtros = {nome: _filtro_inteiro(nome) for nome in ('id_turma', 'id_aluno')}
+        limit = _filtro_inteiro('limit')
+        after = _filtro_inteiro('after') or 0
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    if limit is None:
+        limit = PAGINA_PADRAO
+    elif not 1 <= limit <= PAGINA_MAXIMA:
+        return jsonify({'error': f'O parâmetro "limit" deve estar entre 1 e {PAGINA_MAXIMA}'}), 400
+
+    with medir('conexao'):
+        conn = _conexao_leitura()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    cur = conn.cursor()
+    try:
+        with medir('consulta'):
+            cur.execute(PAGAMENTOS_ALUNOS, dict(filtros, mes=mes, after=after, limit=limit + 1))
+            alunos = cur.fetchall()
+            nomes = colunas(cur)
+            atualizacao = frescor(cur, 'pagamento', mes, filtros['id_aluno'])
+        registrar_linhas(len(alunos))
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao consultar o relatório: {e}'}), 500
+    finally:
+        cur.close()
+        release_db_connection(conn)
+
+    with medir('serializacao'):
+        corpo = objeto_json({'mes': mes, 'atualizacao': atualizacao}, alunos=linhas_json(nomes, alunos[:limit]))
+    response = resposta_json(corpo)
+    if len(alunos) > limit:
+        parametros = dict(request.args.items(), after=alunos[limit - 1][0], limit=limit)
+        response.headers['Link'] = f'<{url_for("relatorio_pagamentos", _external=True, **parametros)}>; rel="next"'
+    return response
+
+@app.route('/relatorios/atualizar', methods=['POST'])
+@swag_from({
+    'tags': ['Relatórios'],
+    'summary': 'Recalcula os períodos pendentes dos relatórios',
+    'description': 'Endpoint que recalcula agora, nas tabelas de resumo, os meses afetados por escritas desde a última '
+                   'atualização. Normalmente isso é feito em segundo plano por "python relatorios.py --intervalo N"; '
+                   'o custo é proporcional ao que mudou, não ao histórico.',
+    'responses': {
+        200: {
+            'description': 'Períodos recalculados por relatório',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'periodos': {
+                        'type': 'object',
+                        'additionalProperties': {'type': 'integer'}
+                    }
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'message': 'Relatórios atualizados com sucesso!',
+                    'periodos': {'presenca': 12, 'pagamento': 3}
+                }
+            }
+        },
+        500: {
+            'description': 'Erro ao conectar ao banco de dados ou recalcular os resumos',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def atualizar_relatorios():
+    with medir('conexao'):
+        conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    try:
+        with medir('consulta'):
+            periodos = atualizar_resumos(conn)
+            _guardar_lsn(conn)
+    except psycopg2.Error as e:
+        return jsonify({'error': f'Erro ao atualizar os relatórios: {e}'}), 500
+    finally:
+        release_db_connection(conn)
+
+    return jsonify({'message': 'Relatórios atualizados com sucesso!', 'periodos': periodos}), 200
+
+# Rota com as estatísticas do pool de conexões
+@app.route('/status/pool', methods=['GET'])
+@swag_from({
+    'tags': ['Status'],
+    'summary': 'Retorna as estatísticas do pool de conexões',
+    'description': 'Endpoint para acompanhar o uso do pool de conexões com o banco de dados deste processo',
+    'responses': {
+        200: {
+            'description': 'Estatísticas do pool',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'min': {'type': 'integer', 'description': 'Tamanho mínimo do pool'},
+                    'max': {'type': 'integer', 'description': 'Tamanho máximo do pool'},
+                    'in_use': {'type': 'integer', 'description': 'Conexões emprestadas no momento'},
+                    'idle': {'type': 'integer', 'description': 'Conexões ociosas no pool'},
+                    'checkouts': {'type': 'integer', 'description': 'Total de empréstimos atendidos'},
+                    'timeouts': {'type': 'integer', 'description': 'Empréstimos que esgotaram o tempo de espera'},
+                    'created': {'type': 'integer', 'description': 'Conexões abertas desde o início'},
+                    'discarded': {'type': 'integer', 'description': 'Conexões descartadas por falha ou fechamento'},
+                    'waits': {'type': 'integer', 'description': 'Empréstimos que precisaram esperar'},
+                    'wait_time_total': {'type': 'number', 'description': 'Tempo total de espera (s)'},
+                    'wait_time_avg': {'type': 'number', 'description': 'Tempo médio de espera (s)'},
+                    'wait_time_max': {'type': 'number', 'description': 'Maior tempo de espera (s)'}
+                }
+            }
+        }
+    }
+})
+def status_pool():
+    return jsonify(pool_stats()), 200
+
+# Rota com as estatísticas do cache de alunos
+@app.route('/status/cache', methods=['GET'])
+@swag_from({
+    'tags': ['Status'],
+    'summary': 'Retorna as estatísticas do cache de alunos',
+    'description': 'Endpoint para acompanhar a eficiência do cache usado por GET /alunos/{id} neste processo. '
+                   'Com vários workers do gunicorn o cache fica desligado (CACHE_BACKEND=nenhum) e tudo conta como miss.',
+    'responses': {
+        200: {
+            'description': 'Estatísticas do cache',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'hits': {'type': 'integer', 'description': 'Consultas atendidas pelo cache'},
+                    'misses': {'type': 'integer', 'description': 'Consultas que precisaram ir ao banco'},
+                    'evictions': {'type': 'integer', 'description': 'Itens descartados por falta de espaço'},
+                    'expirations': {'type': 'integer', 'description': 'Itens descartados por expiração'},
+                    'size': {'type': 'integer', 'description': 'Itens no cache'},
+                    'maxsize': {'type': 'integer', 'description': 'Limite de itens'},
+                    'ttl': {'type': 'number', 'description': 'Validade de cada item (s)'}
+                }
+            }
+        }
+    }
+})
+def status_cache():
+    return jsonify(cache_alunos.stats()), 200
+
+# Rota com os contadores do controle de admissão
+@app.route('/status/admissao', methods=['GET'])
+@swag_from({
+    'tags': ['Status'],
+    'summary': 'Retorna os contadores do controle de admissão',
+    'description': 'Endpoint para acompanhar o trabalho simultâneo no banco deste processo: quantas requisições '
+                   'esperaram na fila e quantas foram recusadas com 503 porque a fila estava cheia ou a espera esgotou',
+    'responses': {
+        200: {
+            'description': 'Contadores do controle de admissão',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'limit': {'type': 'integer', 'description': 'Conexões simultâneas permitidas (DB_ADMISSION_LIMIT)'},
+                    'max_queue': {'type': 'integer', 'description': 'Lugares na fila de espera (DB_ADMISSION_QUEUE)'},
+                    'in_flight': {'type': 'integer', 'description': 'Requisições usando o banco agora'},
+                    'waiting': {'type': 'integer', 'description': 'Requisições na fila agora'},
+                    'admitted': {'type': 'integer', 'description': 'Total de requisições admitidas'},
+                    'queued': {'type': 'integer', 'description': 'Requisições que precisaram esperar na fila'},
+                    'shed_queue_full': {'type': 'integer', 'description': 'Recusadas porque a fila estava cheia'},
+                    'shed_timeout': {'type': 'integer', 'description': 'Recusadas porque a espera esgotou (DB_ADMISSION_TIMEOUT)'},
+                    'wait_time_total': {'type': 'number', 'description': 'Tempo total de espera na fila das admitidas (s)'},
+                    'wait_time_max': {'type': 'number', 'description': 'Maior espera na fila de uma admitida (s)'}
+                }
+            }
+        }
+    }
+})
+def status_admissao():
+    return jsonify(admission_stats()), 200
+
+# Rota com as consultas lentas e os planos capturados
+@app.route('/status/consultas-lentas', methods=['GET'])
+@swag_from({
+    'tags': ['Status'],
+    'summary': 'Retorna as últimas consultas lentas e os planos capturados',
+    'description': 'Endpoint com as consultas que passaram de DB_SLOW_QUERY_MS neste processo (SQL e parâmetros '
+                   'redigidos, rota, duração e linhas) e os planos EXPLAIN (ANALYZE, BUFFERS) capturados em segundo '
+                   'plano para as mais lentas, por consulta',
+    'responses': {
+        200: {
+            'description': 'Consultas lentas e planos',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'stats': {
+                        'type': 'object',
+                        'properties': {
+                            'slow': {'type': 'integer', 'description': 'Comandos acima do limite'},
+                            'sampled': {'type': 'integer', 'description': 'Comandos registrados por amostragem'},
+                            'explained': {'type': 'integer', 'description': 'Planos capturados'},
+                            'explain_skipped': {'type': 'integer', 'description': 'Planos descartados com a fila cheia'},
+                            'explain_errors': {'type': 'integer', 'description': 'Falhas ao capturar um plano'},
+                            'threshold_ms': {'type': 'number', 'description': 'Limite de duração (DB_SLOW_QUERY_MS)'},
+                            'sample': {'type': 'number', 'description': 'Fração amostrada abaixo do limite (DB_SLOW_QUERY_SAMPLE)'}
+                        }
+                    },
+                    'consultas': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'rota': {'type': 'string'},
+                                'consulta': {'type': 'string', 'description': 'Identificador da consulta'},
+                                'sql': {'type': 'string'},
+                                'parametros': {'description': 'Tipo (e tamanho) de cada parâmetro'},
+                                'duracao_ms': {'type': 'number'},
+                                'linhas': {'type': 'integer'},
+                                'erro': {'type': 'string'}
+                            }
+                        }
+                    },
+                    'planos': {
+                        'type': 'object',
+                        'additionalProperties': {'type': 'string'},
+                        'description': 'Plano mais recente por identificador de consulta'
+                    }
+                }
+            }
+        }
+    }
+})
+def status_consultas_lentas():
+    return jsonify(dict(monitor.recentes(), stats=monitor.stats())), 200
+
+# Rota com o estado do roteamento de leituras para as réplicas
+@app.route('/status/replicas', methods=['GET'])
+@swag_from({
+    'tags': ['Status'],
+    'summary': 'Retorna o estado do roteamento de leituras para as réplicas',
+    'description': 'Endpoint para acompanhar, neste processo, quantas leituras foram para as réplicas e quantas '
+                   'voltaram ao primário, e o último atraso medido em cada réplica. '
+                   'Vazio se DATABASE_REPLICAS não estiver configurado.',
+    'responses': {
+        200: {
+            'description': 'Estatísticas do roteamento',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'replica_reads': {'type': 'integer', 'description': 'Leituras atendidas por uma réplica'},
+                    'primary_reads': {'type': 'integer', 'description': 'Leituras atendidas pelo primário'},
+                    'fallbacks': {'type': 'integer', 'description': 'Leituras que voltaram ao primário por falta de réplica elegível'},
+                    'replicas': {
+                        'type': 'object',
+                        'additionalProperties': {
+                            'type': 'object',
+                            'properties': {
+                                'reads': {'type': 'integer', 'description': 'Leituras atendidas'},
+                                'lag': {'type': 'number', 'description': 'Último atraso medido (s); nulo se desconhecido'},
+                                'lag_exceeded': {'type': 'integer', 'description': 'Vezes em que foi pulada pelo atraso'},
+                                'behind_client': {'type': 'integer', 'description': 'Vezes em que foi pulada por não ter a última escrita do cliente'},
+                                'errors': {'type': 'integer', 'description': 'Falhas de conexão'},
+                                'down': {'type': 'boolean', 'description': 'Fora do rodízio após uma falha'},
+                                'pool_in_use': {'type': 'integer', 'description': 'Conexões emprestadas no momento'},
+                                'pool_idle': {'type': 'integer', 'description': 'Conexões ociosas no pool'},
+                                'pool_timeouts': {'type': 'integer', 'description': 'Empréstimos que esgotaram o tempo de espera'}
+                            }
+                        }
+                    }
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'replica_reads': 9120, 'primary_reads': 35, 'fallbacks': 35,
+                    'replicas': {
+                        'replica1:5432': {'reads': 9120, 'lag': 0.0, 'lag_exceeded': 12, 'behind_client': 23,
+                                          'errors': 0, 'down': False, 'pool_in_use': 2, 'pool_idle': 6, 'pool_timeouts': 0}
+                    }
+                }
+            }
+        }
+    }
+})
+def status_replicas():
+    return jsonify(replica_stats()), 200
+
+# Rota com os contadores dos prepared statements
+@app.route('/status/preparadas', methods=['GET'])
+@swag_from({
+    'tags': ['Status'],
+    'summary': 'Retorna os contadores dos prepared statements',
+    'description': 'Endpoint para acompanhar, por comando, quantas vezes as consultas quentes foram executadas '
+                   'e preparadas nas conexões deste processo',
+    'responses': {
+        200: {
+            'description': 'Contadores por comando',
+            'schema': {
+                'type': 'object',
+                'additionalProperties': {
+                    'type': 'object',
+                    'properties': {
+                        'executions': {'type': 'integer', 'description': 'Execuções do comando'},
+                        'prepares': {'type': 'integer', 'description': 'Vezes em que foi preparado (uma por conexão)'},
+                        'reprepares': {'type': 'integer', 'description': 'Preparos repetidos porque a sessão os perdeu'}
+                    }
+                }
+            },
+            'examples': {
+                'application/json': {
+                    'aluno_por_id': {'executions': 1520, 'prepares': 4, 'reprepares': 0}
+                }
+            }
+        }
+    }
+})
+def status_preparadas():
+    return jsonify(comandos.stats()), 200
+
+# Rota com as métricas no formato do Prometheus
+@app.route('/metrics', methods=['GET'])
+@swag_from({
+    'tags': ['Status'],
+    'summary': 'Retorna as métricas da API no formato do Prometheus',
+    'description': 'Histogramas de latência total e por etapa (conexao, consulta, serializacao) e de linhas lidas '
+                   'por rota, além dos contadores do pool de conexões, do controle de admissão, das réplicas, das '
+                   'consultas lentas, do cache e dos prepared statements deste processo',
+    'produces': ['text/plain'],
+    'responses': {
+        200: {
+            'description': 'Métricas no formato de exposição de texto do Prometheus',
+            'schema': {'type': 'string'}
+        }
+    }
+})
+def metrics():
+    roteamento = replica_stats()
+    replicas = roteamento.pop('replicas', {})
+    texto = exportar([
+        ('escola_db_pool', 'Estatística do pool de conexões com o banco.', pool_stats()),
+        ('escola_db_admission', 'Contador do controle de admissão ao banco.', admission_stats()),
+        ('escola_slow_queries', 'Contador do registro de consultas lentas.', monitor.stats()),
+        ('escola_db_reads', 'Leituras roteadas para réplicas ou para o primário.', roteamento),
+        # Na ordem de DATABASE_REPLICAS: nomes de host não servem como nome de métrica
+        ('escola_db_replica', 'Estatística de cada réplica de leitura.', {
+            f'{posicao}_{chave}': valor for posicao, valores in enumerate(replicas.values()) for chave, valor in valores.items()
+        }),
+        ('escola_cache_alunos', 'Estatística do cache de alunos.', cache_alunos.stats()),
+        ('escola_prepared', 'Contador de prepared statements por comando.', {
+            f'{nome}_{chave}': valor for nome, valores in comandos.stats().items() for chave, valor in valores.items()
+        }),
+    ])
+    return Response(texto, mimetype='text/plain; version=0.0.4')
 
 # Rota principal para verificar se a API está funcionando
 @app.route('/')
@@ -510,4 +2043,5 @@ def index():
     })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Só para desenvolvimento; em produção: gunicorn -c gunicorn.conf.py app:app
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG') == '1')
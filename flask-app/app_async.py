@@ -0,0 +1,298 @@
+"""Edição asyncio da API de alunos.
+
+O CRUD básico de alunos de ``app.py`` com handlers assíncronos (Quart) e o
+driver asyncpg com seu próprio pool de conexões, de modo que um único
+processo atende milhares de conexões simultâneas sem prender uma thread por
+consulta. Para rodar::
+
+    hypercorn app_async:app --bind 0.0.0.0:5001
+
+Só estas rotas respondem como em ``app.py`` (mesmos corpos, datas em ISO
+8601, validação e códigos de status):
+
+- ``GET /alunos``: lista completa ou paginada (``limit``, ``after``,
+  ``cursor``), com ``fields`` e ``order_by``; os parâmetros passam pela
+  mesma ``ConsultaAlunos``;
+- ``POST /alunos``, ``GET``, ``PUT`` e ``DELETE /alunos/<id>``, com os
+  valores convertidos por ``converter_aluno``.
+
+Ficaram de fora: ``PATCH``, os filtros da listagem (recusados com 400),
+busca, importação em lote, exportação, chamada, relatórios e as rotas de
+status. Também não há o cache de ``GET /alunos/<id>``, réplicas
+de leitura nem controle de admissão. Comparações de desempenho entre as duas
+devem se limitar às rotas acima e desligar o cache do lado síncrono (ver
+``benchmarks/sync_vs_async.py``).
+"""
+import asyncio
+import os
+
+import asyncpg
+from quart import Quart, jsonify, request, url_for
+
+from consultas import ConsultaAlunos, ParametroInvalido
+from importacao import COLUNAS_ALUNO, converter_aluno
+from repositorio import ValorInvalido
+from serializacao import dumps, linhas_json
+
+app = Quart(__name__)
+
+# Paginação de GET /alunos (mesmos limites de app.py)
+PAGINA_PADRAO = 100
+PAGINA_MAXIMA = 1000
+BLOCO_STREAMING = 2000
+
+# Filtros de GET /alunos que só app.py implementa
+FILTROS_SEM_SUPORTE = ('id_turma', 'data_nascimento_min', 'data_nascimento_max')
+
+# O valor do "cursor" vem como texto; no asyncpg ele precisa do cast para o tipo da coluna
+TIPOS_SQL = {'nome_completo': 'text', 'data_nascimento': 'date'}
+
+INSERIR_ALUNO = (f"INSERT INTO Aluno ({', '.join(COLUNAS_ALUNO)}) "
+                 f"VALUES ({', '.join(f'${n}' for n in range(1, len(COLUNAS_ALUNO) + 1))}) RETURNING id_aluno")
+SUBSTITUIR_ALUNO = (f"UPDATE Aluno SET {', '.join(f'{coluna} = ${n}' for n, coluna in enumerate(COLUNAS_ALUNO, 1))} "
+                    f"WHERE id_aluno = ${len(COLUNAS_ALUNO) + 1} RETURNING id_aluno")
+
+pool = None
+
+
+@app.before_serving
+async def abrir_pool():
+    global pool
+    pool = await asyncpg.create_pool(
+        host=os.environ.get('DATABASE_HOST', 'aula2003'),
+        database=os.environ.get('DATABASE_NAME', 'escola'),
+        user=os.environ.get('DATABASE_USER', 'postgres'),
+        password=os.environ.get('DATABASE_PASSWORD', 'postgres'),
+        min_size=int(os.environ.get('DB_POOL_MIN', '1')),
+        max_size=int(os.environ.get('DB_POOL_MAX', '10')),
+        timeout=float(os.environ.get('DATABASE_CONNECT_TIMEOUT', '5')),
+    )
+
+
+@app.after_serving
+async def fechar_pool():
+    await pool.close()
+
+
+async def _conexao():
+    """Empresta uma conexão do pool; retorna ``None`` se o banco estiver indisponível."""
+    try:
+        return await pool.acquire(timeout=float(os.environ.get('DB_POOL_TIMEOUT', '5')))
+    except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as e:
+        print(f"Erro ao conectar ao banco de dados: {e}")
+        return None
+
+
+def _resposta_json(obj, status=200):
+    """Como ``jsonify``, mas com as datas em ISO 8601, iguais às de ``app.py``."""
+    return app.response_class(dumps(obj), status=status, mimetype='application/json')
+
+
+def _recusado_pelo_banco(e):
+    """Como em ``app.py``: restrição violada ou valor recusado é erro do cliente."""
+    codigo = 409 if isinstance(e, asyncpg.UniqueViolationError) else 400
+    return jsonify({'error': f'Dados recusados pelo banco: {e}'}), codigo
+
+
+def _inteiro_estrito(valor):
+    if not valor.isdigit():
+        raise ValueError(valor)
+    return int(valor)
+
+
+def _sql_listagem(consulta, limit=None):
+    """``(consulta, parâmetros)`` de ``ConsultaAlunos`` com os marcadores do asyncpg (``$n``).
+
+    Mesmo SQL de ``ConsultaAlunos.sql``, sem os filtros. Os nomes de coluna
+    já foram conferidos contra as listas de consultas.py.
+    """
+    params = []
+    where = ''
+    if consulta.apos is not None:
+        operador = '<' if consulta.descendente else '>'
+        valor, id_aluno = consulta.apos
+        if consulta.ordem == 'id_aluno':
+            params.append(valor)
+            where = f' WHERE id_aluno {operador} $1'
+        else:
+            params.extend([valor, id_aluno])
+            where = f' WHERE ({consulta.ordem}, id_aluno) {operador} ($1::text::{TIPOS_SQL[consulta.ordem]}, $2)'
+    direcao = ' DESC' if consulta.descendente else ''
+    ordem = [consulta.ordem] if consulta.ordem == 'id_aluno' else [consulta.ordem, 'id_aluno']
+    texto = (f"SELECT {', '.join(consulta.campos)} FROM Aluno{where} "
+             f"ORDER BY {', '.join(coluna + direcao for coluna in ordem)}")
+    if limit is not None:
+        params.append(limit)
+        texto += f' LIMIT ${len(params)}'
+    return texto, params
+
+
+@app.route('/alunos', methods=['GET'])
+async def listar_alunos():
+    paginado = any(parametro in request.args for parametro in ('limit', 'after', 'cursor'))
+    try:
+        limit = _inteiro_estrito(request.args.get('limit', str(PAGINA_PADRAO)))
+    except ValueError:
+        return jsonify({'error': 'O parâmetro "limit" deve ser inteiro'}), 400
+    if paginado and not 1 <= limit <= PAGINA_MAXIMA:
+        return jsonify({'error': f'O parâmetro "limit" deve estar entre 1 e {PAGINA_MAXIMA}'}), 400
+    filtros = [filtro for filtro in FILTROS_SEM_SUPORTE if filtro in request.args]
+    if filtros:
+        return jsonify({'error': f'Filtros não suportados por esta edição da API: {", ".join(filtros)}'}), 400
+    try:
+        consulta = ConsultaAlunos(request.args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = await _conexao()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    if not paginado:
+        return await _transmitir_alunos(conn, consulta)
+
+    try:
+        # Keyset: busca um registro a mais só para saber se existe próxima página
+        texto, params = _sql_listagem(consulta, limit + 1)
+        alunos = await conn.fetch(texto, *params)
+    except asyncpg.PostgresError as e:
+        return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
+    finally:
+        await pool.release(conn)
+
+    response = app.response_class(linhas_json(consulta.campos, alunos[:limit]), mimetype='application/json')
+    if len(alunos) > limit:
+        parametros = {chave: valor for chave, valor in request.args.items() if chave not in ('after', 'cursor')}
+        parametros.update(consulta.proxima_pagina(alunos[limit - 1]), limit=limit)
+        response.headers['Link'] = f'<{url_for("listar_alunos", _external=True, **parametros)}>; rel="next"'
+    return response
+
+
+async def _transmitir_alunos(conn, consulta):
+    """Envia todos os alunos como um array JSON, lendo em blocos de um cursor no servidor."""
+    transacao = conn.transaction(readonly=True)
+    try:
+        await transacao.start()
+        texto, params = _sql_listagem(consulta)
+        cursor = await conn.cursor(texto, *params)
+    except asyncpg.PostgresError as e:
+        await pool.release(conn)
+        return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
+
+    async def gerar():
+        try:
+            yield b'['
+            separador = b''
+            while True:
+                alunos = await cursor.fetch(BLOCO_STREAMING)
+                if not alunos:
+                    break
+                yield separador + linhas_json(consulta.campos, alunos)[1:-1]
+                separador = b','
+            yield b']'
+        finally:
+            await transacao.rollback()
+            await pool.release(conn)
+
+    return gerar(), 200, {'Content-Type': 'application/json'}
+
+
+@app.route('/alunos', methods=['POST'])
+async def cadastrar_aluno():
+    novo_aluno = await request.get_json(silent=True)
+
+    # Campos obrigatórios e tipo de cada valor, como em app.py
+    try:
+        valores = converter_aluno(novo_aluno)
+    except ValorInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = await _conexao()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    try:
+        aluno_id = await conn.fetchval(INSERIR_ALUNO, *valores)
+    except (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError) as e:
+        return _recusado_pelo_banco(e)
+    except asyncpg.PostgresError as e:
+        return jsonify({'error': f'Erro ao inserir dados: {e}'}), 500
+    finally:
+        await pool.release(conn)
+
+    return jsonify({'message': 'Aluno cadastrado com sucesso!', 'id_aluno': aluno_id}), 201
+
+
+@app.route('/alunos/<int:id>', methods=['PUT'])
+async def atualizar_aluno(id):
+    dados_atualizados = await request.get_json(silent=True)
+    try:
+        valores = converter_aluno(dados_atualizados)
+    except ValorInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = await _conexao()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    try:
+        aluno_id = await conn.fetchval(SUBSTITUIR_ALUNO, *valores, id)
+        if not aluno_id:
+            return jsonify({'error': 'Aluno não encontrado'}), 404
+    except (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError) as e:
+        return _recusado_pelo_banco(e)
+    except asyncpg.PostgresError as e:
+        return jsonify({'error': f'Erro ao atualizar dados: {e}'}), 500
+    finally:
+        await pool.release(conn)
+
+    return jsonify({'message': 'Aluno atualizado com sucesso!', 'id_aluno': id}), 200
+
+
+@app.route('/alunos/<int:id>', methods=['DELETE'])
+async def excluir_aluno(id):
+    conn = await _conexao()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    try:
+        aluno_id = await conn.fetchval('DELETE FROM Aluno WHERE id_aluno = $1 RETURNING id_aluno', id)
+        if not aluno_id:
+            return jsonify({'error': 'Aluno não encontrado'}), 404
+    except asyncpg.PostgresError as e:
+        return jsonify({'error': f'Erro ao excluir dados: {e}'}), 500
+    finally:
+        await pool.release(conn)
+
+    return jsonify({'message': 'Aluno excluído com sucesso!', 'id_aluno': id}), 200
+
+
+@app.route('/alunos/<int:id>', methods=['GET'])
+async def obter_aluno(id):
+    conn = await _conexao()
+    if not conn:
+        return jsonify({'error': 'Falha ao conectar ao banco de dados'}), 500
+
+    try:
+        aluno = await conn.fetchrow('SELECT * FROM Aluno WHERE id_aluno = $1;', id)
+        if not aluno:
+            return jsonify({'error': 'Aluno não encontrado'}), 404
+        result = dict(aluno)
+    except asyncpg.PostgresError as e:
+        return jsonify({'error': f'Erro ao consultar dados: {e}'}), 500
+    finally:
+        await pool.release(conn)
+
+    return _resposta_json(result)
+
+
+@app.route('/')
+async def index():
+    return jsonify({
+        'status': 'online',
+        'message': 'API de Gerenciamento Escolar está funcionando corretamente'
+    })
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5001)
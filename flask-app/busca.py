@@ -0,0 +1,98 @@
+"""Busca de alunos por nome para ``GET /alunos/search``.
+
+Usa as funções e os índices das migrações 0005 e 0006. A busca tem três
+níveis, do mais barato ao mais caro, e cada um só roda se o anterior não
+encheu a página:
+
+1. ``prefixo``: o nome do aluno começa com o texto digitado (autocompletar),
+   por intervalo no índice B-tree, já em ordem de nome;
+2. ``palavras``: cada termo começa alguma palavra do nome do aluno ou do
+   responsável (índice GIN de texto completo), ordenado por ``ts_rank``;
+3. ``aproximada``: só quando nada foi encontrado e a extensão ``pg_trgm``
+   existe no banco, nomes parecidos com o texto (erros de digitação).
+
+Acentos e maiúsculas são ignorados em todos eles.
+"""
+import re
+
+from consultas import ParametroInvalido
+
+BUSCA_PADRAO = 10
+BUSCA_MAXIMA = 50
+TEXTO_MAXIMO = 100
+
+# Quantos acertos por palavra são ordenados por relevância. Termos muito
+# comuns ("silva") casam com boa parte da tabela; ordenar todos custaria
+# mais que a própria busca.
+CANDIDATOS = 200
+
+# Parâmetros: texto, texto, limite, termos, texto, texto, limite, limite.
+# O Append do UNION ALL só executa o segundo ramo se o primeiro não
+# preencher o LIMIT.
+BUSCAR_ALUNOS = '''
+    (SELECT a.id_aluno, a.nome_completo, a.nome_responsavel, a.id_turma, 'prefixo' AS correspondencia
+     FROM Aluno a
+     WHERE normalizar_nome(a.nome_completo) COLLATE "C" >= normalizar_nome(%s)
+       AND normalizar_nome(a.nome_completo) COLLATE "C" < normalizar_nome(%s) || chr(1114111)
+     ORDER BY normalizar_nome(a.nome_completo) COLLATE "C", a.id_aluno
+     LIMIT %s)
+    UNION ALL
+    (SELECT c.id_aluno, c.nome_completo, c.nome_responsavel, c.id_turma, 'palavras'
+     FROM (SELECT a.*, ts_rank(vetor_busca_aluno(a.nome_completo, a.nome_responsavel), q.consulta) AS relevancia
+           FROM (SELECT to_tsquery('simple', normalizar_nome(%s)) AS consulta) q, Aluno a
+           WHERE vetor_busca_aluno(a.nome_completo, a.nome_responsavel) @@ q.consulta
+             AND NOT (normalizar_nome(a.nome_completo) COLLATE "C" >= normalizar_nome(%s)
+                      AND normalizar_nome(a.nome_completo) COLLATE "C" < normalizar_nome(%s) || chr(1114111))
+           LIMIT ''' + str(CANDIDATOS) + ''') c
+     ORDER BY c.relevancia DESC, c.nome_completo, c.id_aluno
+     LIMIT %s)
+    LIMIT %s'''
+
+# Usa os operadores do pg_trgm; por causa do "%" não vira comando preparado.
+# Parâmetros: texto, texto, limite.
+BUSCAR_ALUNOS_APROXIMADA = '''
+    SELECT id_aluno, nome_completo, nome_responsavel, id_turma, 'aproximada' AS correspondencia
+    FROM Aluno
+    WHERE normalizar_nome(%s) <%% normalizar_nome(nome_completo)
+    ORDER BY word_similarity(normalizar_nome(%s), normalizar_nome(nome_completo)) DESC, id_aluno
+    LIMIT %s'''
+
+TEM_TRIGRAMAS = "SELECT to_regproc('word_similarity') IS NOT NULL"
+
+
+def ler_busca(texto):
+    """Valida ``q`` e devolve ``(texto, termos)``.
+
+    ``termos`` é a consulta de texto completo: cada palavra vira um prefixo
+    (``ana:* & silv:*``). Só letras e dígitos entram nela, então nada do que
+    o usuário digita é interpretado como operador.
+    """
+    texto = ' '.join((texto or '').split())
+    if not texto:
+        raise ParametroInvalido('Informe o texto da busca no parâmetro "q"')
+    if len(texto) > TEXTO_MAXIMO:
+        raise ParametroInvalido(f'O parâmetro "q" aceita no máximo {TEXTO_MAXIMO} caracteres')
+    palavras = re.findall(r'[^\W_]+', texto)
+    if not palavras:
+        raise ParametroInvalido('O parâmetro "q" deve conter letras ou números')
+    return texto, ' & '.join(f'{palavra}:*' for palavra in palavras)
+
+
+def parametros_busca(texto, termos, limit):
+    return (texto, texto, limit, termos, texto, texto, limit, limit)
+
+
+def parametros_aproximada(texto, limit):
+    return (texto, texto, limit)
+
+
+_trigramas = None
+
+
+def trigramas_disponiveis(cur):
+    """Se o banco tem o pg_trgm (consultado uma vez por processo)."""
+    global _trigramas
+    if _trigramas is None:
+        cur.execute(TEM_TRIGRAMAS)
+        _trigramas = cur.fetchone()[0]
+    return _trigramas
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache em memória do processo, com expiração (TTL) e limite de itens.
+
+    Quando o limite é atingido, o item usado há mais tempo é descartado.
+    Qualquer outro backend (por exemplo, um servidor compartilhado) só precisa
+    oferecer os mesmos métodos ``get``, ``set``, ``delete``, ``clear`` e
+    ``stats``.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._itens = OrderedDict()   # chave -> (valor, instante de expiração)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, chave):
+        """Retorna o valor guardado em ``chave`` ou ``None``."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self._stats['misses'] += 1
+                return None
+            valor, expira_em = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._itens.move_to_end(chave)
+            self._stats['hits'] += 1
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maxsize:
+                self._itens.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'size': len(self._itens), 'maxsize': self.maxsize, 'ttl': self.ttl})
+        return stats
+
+
+class SemCache:
+    """Backend que não guarda nada: toda leitura vai ao banco.
+
+    É o padrão com vários processos (ver ``gunicorn.conf.py``): a
+    invalidação de ``LRUCache`` só alcança o processo que fez a escrita, e
+    os outros continuariam servindo o valor velho até o TTL.
+    """
+
+    def __init__(self):
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, chave, valor, ttl=None):
+        pass
+
+    def delete(self, chave):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        with self._lock:
+            misses = self._misses
+        return {'hits': 0, 'misses': misses, 'evictions': 0, 'expirations': 0, 'size': 0, 'maxsize': 0, 'ttl': 0}
+
+
+class ReadThroughCache:
+    """Leitura através do cache: busca no backend e, na falta, no carregador.
+
+    ``invalidar`` deve ser chamado depois que uma escrita for confirmada.
+    Uma leitura que começou antes de uma invalidação não grava seu resultado,
+    para não recolocar no cache um valor que acabou de ficar velho.
+    """
+
+    def __init__(self, backend, prefixo=''):
+        self.backend = backend
+        self.prefixo = prefixo
+        self._versao = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, carregar):
+        """Retorna ``(valor, acertou)``; ``carregar()`` só é chamado na falta.
+
+        Resultados ``None`` (registro inexistente) não são guardados.
+        """
+        chave = self.prefixo + str(chave)
+        valor = self.backend.get(chave)
+        if valor is not None:
+            return valor, True
+
+        versao = self._versao
+        valor = carregar()
+        if valor is not None:
+            with self._lock:
+                if versao == self._versao:
+                    self.backend.set(chave, valor)
+        return valor, False
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._versao += 1
+            self.backend.delete(self.prefixo + str(chave))
+
+    def stats(self):
+        return self.backend.stats()
+
+
+def criar_backend():
+    """Cria o backend definido por ``CACHE_BACKEND``: 'memoria' ou 'nenhum'."""
+    nome = os.environ.get('CACHE_BACKEND', 'memoria')
+    if nome == 'nenhum':
+        return SemCache()
+    if nome == 'memoria':
+        return LRUCache(
+            maxsize=int(os.environ.get('CACHE_ALUNOS_TAMANHO', '10000')),
+            ttl=float(os.environ.get('CACHE_ALUNOS_TTL', '60')),
+        )
+    raise ValueError(f"Backend de cache desconhecido: {nome!r}")
+
+
+cache_alunos = ReadThroughCache(criar_backend(), prefixo='aluno:')
@@ -0,0 +1,64 @@
+"""Fixtures dos testes que precisam de um Postgres.
+
+Esses testes só rodam com ``TEST_DATABASE_URL`` apontando para um banco
+descartável; sem ela, são pulados. ``banco`` cria um schema temporário por
+módulo de teste, com o esquema de init.sql e, se o módulo definir:
+
+- ``DADOS_TESTE``: SQL que popula as tabelas;
+- ``MIGRAR_TESTE = True``: as migrações aplicadas depois dos dados.
+"""
+import os
+
+import psycopg2
+import pytest
+
+INIT_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'init.sql')
+
+
+@pytest.fixture(scope='session')
+def dsn():
+    dsn = os.environ.get('TEST_DATABASE_URL')
+    if not dsn:
+        pytest.skip('TEST_DATABASE_URL não definido')
+    return dsn
+
+
+@pytest.fixture
+def conn(dsn):
+    """Conexão direta com o banco de teste, sem schema próprio."""
+    conn = psycopg2.connect(dsn)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope='module')
+def banco(request, dsn):
+    """Conexão em autocommit com o search_path num schema temporário do módulo."""
+    from migrar import migrar
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    schema = f'teste_{request.module.__name__}_{os.getpid()}'
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA {schema}; SET search_path TO {schema};')
+        with open(INIT_SQL, encoding='utf-8') as arquivo:
+            cur.execute(arquivo.read())
+        dados = getattr(request.module, 'DADOS_TESTE', None)
+        if dados:
+            cur.execute(dados)
+    if getattr(request.module, 'MIGRAR_TESTE', False):
+        migrar(conn, saida=lambda _: None)
+    with conn.cursor() as cur:
+        cur.execute("SELECT string_agg(format('%%I.%%I', schemaname, tablename), ', ') FROM pg_tables WHERE schemaname = %s",
+                    (schema,))
+        cur.execute('ANALYZE ' + cur.fetchone()[0])
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'DROP SCHEMA {schema} CASCADE')
+        conn.close()
@@ -0,0 +1,189 @@
+"""Montagem da consulta de GET /alunos a partir dos parâmetros da requisição.
+
+Projeção (``fields``), filtros (``id_turma``, ``data_nascimento_min``,
+``data_nascimento_max``), ordenação (``order_by``) e paginação por keyset
+(``after`` / ``cursor``) viram SQL parametrizado. Nomes de colunas só entram
+na consulta se estiverem nas listas abaixo; valores sempre vão como
+parâmetros. Os índices de flask-app/init.sql cobrem cada combinação.
+
+Também monta a atualização parcial de ``PATCH /alunos/<id>``.
+"""
+import base64
+import datetime
+import functools
+import json
+
+from psycopg2 import sql
+
+from importacao import ALUNO, COLUNAS_ALUNO
+
+COLUNAS = ALUNO.nomes
+
+# Só colunas NOT NULL: a comparação de tuplas do keyset não funciona com NULL
+ORDENAVEIS = ('id_aluno', 'nome_completo', 'data_nascimento')
+
+
+class ParametroInvalido(ValueError):
+    """Parâmetro de consulta ausente do whitelist ou com valor inválido."""
+
+
+def _inteiros(texto, nome):
+    try:
+        valores = [int(parte) for parte in texto.split(',')]
+    except ValueError:
+        raise ParametroInvalido(f'O parâmetro "{nome}" deve conter inteiros separados por vírgula')
+    return valores
+
+
+def _data(texto, nome):
+    try:
+        return datetime.date.fromisoformat(texto)
+    except ValueError:
+        raise ParametroInvalido(f'O parâmetro "{nome}" deve ser uma data no formato AAAA-MM-DD')
+
+
+def codificar_cursor(ordem, valor, id_aluno):
+    """Token da próxima página: a ordenação (``order_by``, com o "-") e a última linha."""
+    if isinstance(valor, datetime.date):
+        valor = valor.isoformat()
+    bruto = json.dumps([ordem, valor, id_aluno], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token, ordem):
+    """``(valor, id_aluno)`` do token; ele precisa ter sido gerado com a mesma ``ordem``."""
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        ordem_token, valor, id_aluno = json.loads(bruto)
+        if not isinstance(id_aluno, int) or not isinstance(valor, str) or not isinstance(ordem_token, str):
+            raise ValueError(token)
+    except (ValueError, TypeError):
+        raise ParametroInvalido('O parâmetro "cursor" é inválido')
+    if ordem_token != ordem:
+        # A posição só vale na ordenação em que foi gerada
+        raise ParametroInvalido(f'O "cursor" foi gerado com order_by={ordem_token}; use o mesmo "order_by" do link')
+    return valor, id_aluno
+
+
+class ConsultaAlunos:
+    """Consulta de alunos descrita pelos parâmetros de ``GET /alunos``."""
+
+    def __init__(self, args):
+        campos = args.get('fields')
+        if campos:
+            pedidos = [campo.strip() for campo in campos.split(',') if campo.strip()]
+            desconhecidos = [campo for campo in pedidos if campo not in COLUNAS]
+            if desconhecidos:
+                raise ParametroInvalido(f'Campos desconhecidos em "fields": {", ".join(desconhecidos)}')
+        else:
+            pedidos = list(COLUNAS)
+
+        ordem = self.order_by = args.get('order_by', 'id_aluno')
+        self.descendente = ordem.startswith('-')
+        self.ordem = ordem.lstrip('-')
+        if self.ordem not in ORDENAVEIS:
+            raise ParametroInvalido(f'"order_by" deve ser um destes: {", ".join(ORDENAVEIS)} (com "-" para ordem decrescente)')
+
+        # id_aluno e a coluna de ordenação sempre vêm na resposta: formam o cursor da próxima página
+        obrigatorios = ['id_aluno'] + ([self.ordem] if self.ordem != 'id_aluno' else [])
+        self.campos = obrigatorios + [campo for campo in pedidos if campo not in obrigatorios]
+
+        self.filtros = []
+        if args.get('id_turma'):
+            self.filtros.append((sql.SQL('id_turma = ANY(%s)'), _inteiros(args['id_turma'], 'id_turma')))
+        if args.get('data_nascimento_min'):
+            self.filtros.append((sql.SQL('data_nascimento >= %s'), _data(args['data_nascimento_min'], 'data_nascimento_min')))
+        if args.get('data_nascimento_max'):
+            self.filtros.append((sql.SQL('data_nascimento <= %s'), _data(args['data_nascimento_max'], 'data_nascimento_max')))
+
+        self.apos = None
+        if 'cursor' in args:
+            self.apos = decodificar_cursor(args['cursor'], self.order_by)
+        elif 'after' in args:
+            if self.ordem != 'id_aluno':
+                raise ParametroInvalido('Com "order_by", use o parâmetro "cursor" do link da próxima página em vez de "after"')
+            after = args['after']
+            if not after.isdigit():
+                raise ParametroInvalido('O parâmetro "after" deve ser inteiro')
+            self.apos = (int(after), None)
+
+    def _where(self):
+        condicoes = [condicao for condicao, _ in self.filtros]
+        params = [valor for _, valor in self.filtros]
+        if self.apos is not None:
+            operador = sql.SQL('<' if self.descendente else '>')
+            valor, id_aluno = self.apos
+            if self.ordem == 'id_aluno':
+                condicoes.append(sql.SQL('id_aluno {} %s').format(operador))
+                params.append(valor)
+            else:
+                condicoes.append(sql.SQL('({}, id_aluno) {} (%s, %s)').format(sql.Identifier(self.ordem), operador))
+                params.extend([valor, id_aluno])
+        if not condicoes:
+            return sql.SQL(''), params
+        return sql.SQL(' WHERE ') + sql.SQL(' AND ').join(condicoes), params
+
+    def _order_by(self, prefixo=None):
+        direcao = sql.SQL(' DESC' if self.descendente else '')
+        colunas = [self.ordem] if self.ordem == 'id_aluno' else [self.ordem, 'id_aluno']
+        return sql.SQL(' ORDER BY ') + sql.SQL(', ').join(
+            sql.Identifier(*([prefixo, coluna] if prefixo else [coluna])) + direcao for coluna in colunas
+        )
+
+    def sql(self, limit=None, json_no_banco=False):
+        """Retorna ``(consulta, parâmetros)``.
+
+        Com ``json_no_banco``, cada linha vem como ``(json_text, id_aluno,
+        valor_da_ordem)``; senão, como uma tupla na ordem de ``self.campos``.
+        """
+        where, params = self._where()
+        interna = sql.SQL('SELECT {} FROM Aluno{}').format(
+            sql.SQL(', ').join(map(sql.Identifier, self.campos)), where
+        )
+        if json_no_banco:
+            consulta = sql.SQL('SELECT row_to_json(t)::text, t.id_aluno, {} FROM ({}) t{}').format(
+                sql.Identifier('t', self.ordem), interna, self._order_by('t')
+            )
+        else:
+            consulta = interna + self._order_by()
+        if limit is not None:
+            consulta += sql.SQL(' LIMIT %s')
+            params.append(limit)
+        return consulta, params
+
+    def proxima_pagina(self, linha, json_no_banco=False):
+        """Parâmetros de paginação para continuar depois de ``linha``."""
+        if json_no_banco:
+            id_aluno, valor = linha[1], linha[2]
+        else:
+            id_aluno, valor = linha[0], linha[self.campos.index(self.ordem)]
+        if self.ordem == 'id_aluno':
+            return {'after': id_aluno}
+        return {'cursor': codificar_cursor(self.order_by, valor, id_aluno)}
+
+
+@functools.lru_cache(maxsize=None)
+def _sql_atualizacao_parcial(colunas):
+    atribuicoes = sql.SQL(', ').join(sql.SQL('{} = %s').format(sql.Identifier(coluna)) for coluna in colunas)
+    diferente = sql.SQL(' OR ').join(sql.SQL('{} IS DISTINCT FROM %s').format(sql.Identifier(coluna)) for coluna in colunas)
+    # Se nada mudou o UPDATE não casa com nenhuma linha (e não cria uma nova
+    # versão dela); o segundo SELECT devolve então a linha como está.
+    return sql.SQL('''
+        WITH atualizado AS (
+            UPDATE Aluno SET {} WHERE id_aluno = %s AND ({}) RETURNING *
+        )
+        SELECT true AS alterado, * FROM atualizado
+        UNION ALL
+        SELECT false, * FROM Aluno WHERE id_aluno = %s AND NOT EXISTS (SELECT 1 FROM atualizado)''').format(atribuicoes, diferente)
+
+
+def atualizacao_parcial(id_aluno, dados):
+    """Retorna ``(consulta, parâmetros)`` que atualiza só as colunas presentes em ``dados``.
+
+    A consulta devolve ``(alterado, *colunas de Aluno)``, ou nenhuma linha se
+    o aluno não existir. O SQL de cada combinação de colunas é montado uma
+    única vez.
+    """
+    colunas = tuple(coluna for coluna in COLUNAS_ALUNO if coluna in dados)
+    valores = [dados[coluna] for coluna in colunas]
+    return _sql_atualizacao_parcial(colunas), valores + [id_aluno] + valores + [id_aluno]
@@ -0,0 +1,279 @@
+"""Registro de consultas lentas do lado da aplicação, com EXPLAIN em segundo plano.
+
+As conexões do pool usam ``CursorMonitorado``, que mede cada ``execute``
+(e, em cursores com nome, as buscas que se seguem). Vai para o log (uma linha JSON por comando) tudo o que passar de
+``DB_SLOW_QUERY_MS`` e uma fração ``DB_SLOW_QUERY_SAMPLE`` do restante, com
+a rota, o SQL com os marcadores, os parâmetros redigidos (só tipo e
+tamanho), a duração e as linhas. Literais embutidos no SQL também são
+trocados por ``?``.
+
+Os comandos mais lentos (acima de ``DB_SLOW_QUERY_EXPLAIN_MS``) têm o plano
+capturado com ``EXPLAIN (ANALYZE, BUFFERS)`` por uma thread de fundo, numa
+conexão própria e em transação somente leitura, no máximo uma vez por
+consulta a cada ``DB_SLOW_QUERY_EXPLAIN_INTERVAL`` segundos. Só consultas
+sem escrita são explicadas, já que o ANALYZE executa o comando de novo.
+"""
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.sql
+from flask import has_request_context, request
+
+from preparadas import comandos
+
+# Tamanho máximo do SQL guardado em cada registro
+SQL_MAXIMO = 2000
+
+LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+LITERAL_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+EXECUTE_PREPARADO = re.compile(r'EXECUTE ([a-z_][a-z0-9_]*)')
+SO_LEITURA = re.compile(r'[\s(]*(SELECT|WITH)\b', re.IGNORECASE)
+ESCRITA = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE)\b', re.IGNORECASE)
+
+logger = logging.getLogger('escola.consultas_lentas')
+if not logger.handlers:
+    _saida = logging.StreamHandler(sys.stderr)
+    _saida.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_saida)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def redigir_parametros(params):
+    """Troca cada parâmetro pelo seu tipo (e tamanho, para textos e listas)."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {nome: _tipo(valor) for nome, valor in params.items()}
+    return [_tipo(valor) for valor in params]
+
+
+def _tipo(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, (str, bytes, list, tuple)):
+        return f'{type(valor).__name__}({len(valor)})'
+    return type(valor).__name__
+
+
+def redigir_sql(sql):
+    """Remove os literais de texto do SQL (ou de um plano)."""
+    return LITERAL_TEXTO.sub("'?'", sql)
+
+
+def impressao(sql):
+    """Identificador estável da consulta: SQL sem literais e com espaços normalizados."""
+    normalizado = ' '.join(LITERAL_NUMERO.sub('?', redigir_sql(sql)).split())
+    return hashlib.sha1(normalizado.encode('utf-8')).hexdigest()[:12]
+
+
+class MonitorConsultas:
+    """Decide o que registrar e mantém a fila de planos a capturar."""
+
+    def __init__(self, limite_ms=200.0, amostra=0.0, explain_ms=500.0, intervalo_explain=300.0,
+                 sorteio=random.random, registrar=logger.info):
+        self.limite = limite_ms / 1000
+        self.amostra = amostra
+        self.explain = explain_ms / 1000
+        self.intervalo_explain = intervalo_explain
+        self._sorteio = sorteio
+        self._registrar = registrar
+        self._lock = threading.Lock()
+        self._recentes = collections.deque(maxlen=50)
+        self._planos = collections.OrderedDict()    # impressão -> plano mais recente
+        self._explicado_em = {}                     # impressão -> instante do último EXPLAIN
+        self._fila = queue.Queue(maxsize=8)
+        self._thread = None
+        self._stats = {'slow': 0, 'sampled': 0, 'explained': 0, 'explain_skipped': 0, 'explain_errors': 0}
+
+    def observar(self, sql, params, duracao, linhas, erro=None):
+        lenta = duracao >= self.limite
+        if not lenta and not (self.amostra and self._sorteio() < self.amostra):
+            return
+        if isinstance(sql, bytes):
+            sql = sql.decode('utf-8', 'replace')
+        preparado = EXECUTE_PREPARADO.match(sql)
+        if preparado:
+            sql = comandos.sql(preparado.group(1))
+        chave = impressao(sql)
+        registro = {
+            'evento': 'consulta_lenta' if lenta else 'consulta_amostrada',
+            'quando': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'rota': _rota(),
+            'consulta': chave,
+            'sql': ' '.join(redigir_sql(sql).split())[:SQL_MAXIMO],
+            'parametros': redigir_parametros(params),
+            'duracao_ms': round(duracao * 1000, 2),
+            'linhas': linhas,
+        }
+        if erro:
+            registro['erro'] = erro
+        with self._lock:
+            self._stats['slow' if lenta else 'sampled'] += 1
+            if lenta:
+                self._recentes.append(registro)
+        self._registrar(json.dumps(registro, ensure_ascii=False))
+        if lenta and duracao >= self.explain:
+            # Um comando cancelado (statement_timeout) não é executado de novo:
+            # fica só o plano estimado
+            self._agendar_explain(chave, sql, params, analisar=erro is None)
+
+    def _agendar_explain(self, chave, sql, params, analisar=True):
+        if not SO_LEITURA.match(sql) or ESCRITA.search(sql):
+            return
+        agora = time.monotonic()
+        with self._lock:
+            ultimo = self._explicado_em.get(chave)
+            if ultimo is not None and agora - ultimo < self.intervalo_explain:
+                return
+            self._explicado_em[chave] = agora
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._explicar, name='explain', daemon=True)
+                self._thread.start()
+        try:
+            self._fila.put_nowait((chave, sql, params, analisar))
+        except queue.Full:
+            with self._lock:
+                self._stats['explain_skipped'] += 1
+                self._explicado_em.pop(chave, None)
+
+    def _explicar(self):
+        from database import _connect
+
+        conn = None
+        while True:
+            chave, sql, params, analisar = self._fila.get()
+            try:
+                if conn is None or conn.closed:
+                    conn = _connect(options='-c statement_timeout=30s')
+                    conn.set_session(readonly=True)
+                with conn.cursor() as cur:
+                    cur.execute(('EXPLAIN (ANALYZE, BUFFERS) ' if analisar else 'EXPLAIN ') + sql, params)
+                    plano = '\n'.join(linha for linha, in cur.fetchall())
+                conn.rollback()
+            except psycopg2.Error as e:
+                with self._lock:
+                    self._stats['explain_errors'] += 1
+                self._registrar(json.dumps({'evento': 'explain_falhou', 'consulta': chave,
+                                            'erro': redigir_sql(str(e).strip())}, ensure_ascii=False))
+                if conn is not None:
+                    conn.close()
+                conn = None
+                continue
+            plano = redigir_sql(plano)
+            with self._lock:
+                self._stats['explained'] += 1
+                self._planos[chave] = plano
+                self._planos.move_to_end(chave)
+                while len(self._planos) > 20:
+                    self._planos.popitem(last=False)
+            self._registrar(json.dumps({'evento': 'plano', 'consulta': chave, 'plano': plano}, ensure_ascii=False))
+
+    def recentes(self):
+        """Últimas consultas lentas registradas e os planos capturados."""
+        with self._lock:
+            return {'consultas': list(self._recentes), 'planos': dict(self._planos)}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, threshold_ms=self.limite * 1000, sample=self.amostra)
+
+
+def _rota():
+    if not has_request_context():
+        return None
+    return f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+
+
+monitor = MonitorConsultas(
+    limite_ms=float(os.environ.get('DB_SLOW_QUERY_MS', '200')),
+    amostra=float(os.environ.get('DB_SLOW_QUERY_SAMPLE', '0.001')),
+    explain_ms=float(os.environ.get('DB_SLOW_QUERY_EXPLAIN_MS', '500')),
+    intervalo_explain=float(os.environ.get('DB_SLOW_QUERY_EXPLAIN_INTERVAL', '300')),
+)
+
+
+class CursorMonitorado(psycopg2.extensions.cursor):
+    """Cursor que mede cada ``execute`` e o entrega ao ``monitor``.
+
+    Num cursor com nome (do lado do servidor) o ``execute`` só declara o
+    cursor, e a consulta roda nas buscas. Nele a duração entregue é a do
+    ``execute`` somada às de cada ``fetch*`` e bloco da iteração, com o total
+    de linhas; o registro sai quando o cursor é fechado ou falha.
+    """
+
+    _pendente = None    # [sql, parâmetros, duração, linhas] do cursor com nome aberto
+
+    def execute(self, query, vars=None):
+        # psycopg2.sql (Composed) vira texto aqui: o monitor e o EXPLAIN trabalham com str
+        if isinstance(query, psycopg2.sql.Composable):
+            query = query.as_string(self)
+        inicio = time.perf_counter()
+        try:
+            resultado = super().execute(query, vars)
+        except psycopg2.Error as e:
+            monitor.observar(query, vars, time.perf_counter() - inicio, None, type(e).__name__)
+            raise
+        if self.name is None:
+            monitor.observar(query, vars, time.perf_counter() - inicio, self.rowcount if self.rowcount >= 0 else None)
+        else:
+            self._pendente = [query, vars, time.perf_counter() - inicio, 0]
+        return resultado
+
+    def _buscar(self, buscar, *args):
+        if self._pendente is None:
+            return buscar(*args)
+        inicio = time.perf_counter()
+        try:
+            resultado = buscar(*args)
+        except psycopg2.Error as e:
+            self._pendente[2] += time.perf_counter() - inicio
+            self._entregar(type(e).__name__)
+            raise
+        self._pendente[2] += time.perf_counter() - inicio
+        self._pendente[3] += len(resultado) if isinstance(resultado, list) else resultado is not None
+        return resultado
+
+    def fetchone(self):
+        return self._buscar(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._buscar(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._buscar(super().fetchall)
+
+    def __iter__(self):
+        if self.name is None:
+            return super().__iter__()
+        return self._iterar()
+
+    def _iterar(self):
+        # Mesmo protocolo da iteração do psycopg2: blocos de itersize linhas
+        while True:
+            linhas = self.fetchmany(self.itersize)
+            if not linhas:
+                return
+            yield from linhas
+
+    def _entregar(self, erro=None):
+        if self._pendente is not None:
+            query, vars, duracao, linhas = self._pendente
+            self._pendente = None
+            monitor.observar(query, vars, duracao, linhas, erro)
+
+    def close(self):
+        self._entregar()
+        super().close()
@@ -0,0 +1,595 @@
+import functools
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+from consultas_lentas import CursorMonitorado
+
+
+class PoolTimeoutError(psycopg2.Error):
+    """Nenhuma conexão ficou livre dentro do tempo de espera do pool."""
+
+
+class AdmissionRejected(Exception):
+    """O processo já tem trabalho demais no banco: a requisição foi recusada.
+
+    Vem do controle de admissão ou de um pool que esgotou o tempo de espera
+    por uma conexão livre; nos dois casos a API responde 503 com Retry-After.
+    """
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Banco de dados sobrecarregado ({reason}); tente novamente em {retry_after:.0f}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionControl:
+    """Controle de admissão do trabalho no banco, por processo.
+
+    No máximo ``limit`` conexões emprestadas ao mesmo tempo. As demais
+    requisições esperam numa fila de até ``max_queue`` lugares, por no
+    máximo ``timeout`` segundos. Com a fila cheia ou a espera esgotada,
+    ``acquire`` lança ``AdmissionRejected`` em vez de deixar a requisição
+    presa até todas estourarem o tempo juntas.
+    """
+
+    def __init__(self, limit=10, max_queue=20, timeout=2.0, retry_after=1.0):
+        if limit < 1 or max_queue < 0:
+            raise ValueError("Limites de admissão inválidos: limit=%r, max_queue=%r" % (limit, max_queue))
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._stats = {
+            'admitted': 0,
+            'queued': 0,
+            'shed_queue_full': 0,
+            'shed_timeout': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def acquire(self):
+        with self._cond:
+            if self._in_flight < self.limit and not self._waiting:
+                self._in_flight += 1
+                self._stats['admitted'] += 1
+                return
+            if self._waiting >= self.max_queue:
+                self._stats['shed_queue_full'] += 1
+                raise AdmissionRejected('fila cheia', self.retry_after)
+
+            start = time.monotonic()
+            deadline = start + self.timeout
+            self._waiting += 1
+            self._stats['queued'] += 1
+            try:
+                while self._in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['shed_timeout'] += 1
+                        # O aviso de uma vaga pode ter vindo para esta thread
+                        self._cond.notify()
+                        raise AdmissionRejected('espera esgotada', self.retry_after)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            elapsed = time.monotonic() - start
+            self._in_flight += 1
+            self._stats['admitted'] += 1
+            self._stats['wait_time_total'] += elapsed
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], elapsed)
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, limit=self.limit, max_queue=self.max_queue,
+                        in_flight=self._in_flight, waiting=self._waiting)
+
+
+class ConnectionPool:
+    """Pool de conexões limitado, seguro entre threads.
+
+    Mantém entre ``minconn`` e ``maxconn`` conexões abertas. ``getconn``
+    espera até ``timeout`` segundos por uma conexão livre; ``putconn`` desfaz
+    qualquer transação pendente antes de devolvê-la ao pool. Conexões que
+    ficaram ociosas por mais de ``validate_after`` segundos são testadas com
+    ``SELECT 1`` antes de serem reutilizadas.
+    """
+
+    def __init__(self, connect, minconn=1, maxconn=10, timeout=5.0, validate_after=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Limites do pool inválidos: minconn=%r, maxconn=%r" % (minconn, maxconn))
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+
+        self._cond = threading.Condition()
+        self._idle = []        # pilha de (conexão, instante em que foi devolvida)
+        self._in_use = set()
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append((self._new_connection(), time.monotonic()))
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use)
+
+    def _is_usable(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        """Retira uma conexão do pool, esperando no máximo ``timeout`` segundos."""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("O pool de conexões está fechado")
+                if self._idle or self._size() < self.maxconn:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        "Tempo de espera por conexão esgotado (%.1fs, %d em uso)"
+                        % (timeout, len(self._in_use))
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                elapsed = time.monotonic() - start
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += elapsed
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], elapsed)
+
+            # Reserva a vaga antes de sair do lock: validação e conexão nova
+            # acontecem fora dele para não bloquear as outras threads.
+            entry = self._idle.pop() if self._idle else None
+            placeholder = object()
+            self._in_use.add(placeholder)
+
+        try:
+            conn = None
+            while entry is not None:
+                candidate, idle_since = entry
+                if self._is_usable(candidate, idle_since):
+                    conn = candidate
+                    break
+                self._discard(candidate)
+                with self._cond:
+                    entry = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._new_connection()
+        except BaseException:
+            with self._cond:
+                self._in_use.discard(placeholder)
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._in_use.discard(placeholder)
+            self._in_use.add(conn)
+            self._stats['checkouts'] += 1
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Devolve ``conn`` ao pool, desfazendo qualquer transação em aberto."""
+        if not close and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Empresta uma conexão do pool durante o bloco ``with``."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        """Retorna um retrato das métricas do pool."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'min': self.minconn,
+                'max': self.maxconn,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+            })
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+        return stats
+
+    def closeall(self):
+        """Fecha todas as conexões ociosas e impede novos empréstimos."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+def parse_lsn(text):
+    """Converte um LSN do Postgres (``'16/B374D848'``) em inteiro comparável."""
+    high, low = text.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+# Na réplica: atraso em segundos (0 se já aplicou tudo o que recebeu; NULL se
+# nunca aplicou nada) e até onde o WAL foi aplicado. Num servidor que não está
+# em recuperação, atraso zero e a posição atual do WAL.
+REPLICA_STATUS = '''
+    SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END,
+           CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END'''
+
+
+class Replica:
+    """Uma réplica de leitura: seu pool e o último atraso medido nela."""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.lag = None             # segundos; None enquanto não medido ou desconhecido
+        self.replay_lsn = 0
+        self.checked_at = None
+        self.down_until = 0.0
+        self._stats = {'reads': 0, 'lag_exceeded': 0, 'behind_client': 0, 'errors': 0}
+
+    def stats(self):
+        stats = dict(self._stats, lag=self.lag)
+        stats.update({'pool_' + key: value for key, value in self.pool.stats().items()
+                      if key in ('in_use', 'idle', 'timeouts')})
+        return stats
+
+
+class ReadRouter:
+    """Escolhe onde executar uma leitura: numa réplica em dia ou no primário.
+
+    As réplicas são usadas em rodízio. Uma réplica só recebe a leitura se o
+    atraso medido for de no máximo ``max_lag`` segundos e, quando o cliente
+    informar ``min_lsn`` (a posição do WAL da última escrita dele), se ela
+    já tiver aplicado o WAL até ali. O atraso é medido na própria conexão
+    emprestada, no máximo a cada ``check_interval`` segundos. Uma réplica que
+    falha ao conectar fica de fora por ``retry_after`` segundos. Sem réplica
+    elegível, a leitura vai para o primário.
+
+    ``getconn`` retorna ``(conexão, pool)``; a conexão deve voltar a esse pool.
+    """
+
+    def __init__(self, primary, replicas, max_lag=5.0, check_interval=1.0, retry_after=10.0,
+                 clock=time.monotonic):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stats = {'replica_reads': 0, 'primary_reads': 0, 'fallbacks': 0}
+
+    def _rotation(self):
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+        return self.replicas[start:] + self.replicas[:start]
+
+    def _check(self, replica, conn, min_lsn):
+        """Mede a réplica se preciso; diz se ``conn`` pode atender a leitura."""
+        now = self._clock()
+        stale = replica.checked_at is None or now - replica.checked_at >= self.check_interval
+        if stale or (min_lsn is not None and replica.replay_lsn < min_lsn):
+            with conn.cursor() as cur:
+                cur.execute(REPLICA_STATUS)
+                lag, replay_lsn = cur.fetchone()
+            conn.rollback()
+            replica.lag = None if lag is None else float(lag)
+            replica.replay_lsn = parse_lsn(replay_lsn) if replay_lsn else 0
+            replica.checked_at = now
+        if replica.lag is None or replica.lag > self.max_lag:
+            replica._stats['lag_exceeded'] += 1
+            return False
+        if min_lsn is not None and replica.replay_lsn < min_lsn:
+            replica._stats['behind_client'] += 1
+            return False
+        return True
+
+    def getconn(self, min_lsn=None):
+        for replica in self._rotation():
+            if replica.down_until > self._clock():
+                continue
+            try:
+                conn = replica.pool.getconn()
+            except PoolTimeoutError:
+                continue
+            except psycopg2.Error as e:
+                replica._stats['errors'] += 1
+                replica.down_until = self._clock() + self.retry_after
+                print(f"Réplica {replica.name} indisponível por {self.retry_after:.0f}s: {e}")
+                continue
+            try:
+                usable = self._check(replica, conn, min_lsn)
+            except psycopg2.Error as e:
+                replica.pool.putconn(conn, close=True)
+                replica._stats['errors'] += 1
+                replica.down_until = self._clock() + self.retry_after
+                print(f"Réplica {replica.name} indisponível por {self.retry_after:.0f}s: {e}")
+                continue
+            if usable:
+                replica._stats['reads'] += 1
+                self._stats['replica_reads'] += 1
+                return conn, replica.pool
+            replica.pool.putconn(conn)
+
+        self._stats['primary_reads'] += 1
+        if self.replicas:
+            self._stats['fallbacks'] += 1
+        return self.primary.getconn(), self.primary
+
+    def stats(self):
+        stats = dict(self._stats)
+        now = self._clock()
+        stats['replicas'] = {replica.name: dict(replica.stats(), down=replica.down_until > now)
+                             for replica in self.replicas}
+        return stats
+
+
+def _connect(**overrides):
+    params = {
+        'host': os.environ.get('DATABASE_HOST', 'aula2003'),  # Nome do container Docker PostgreSQL
+        'database': os.environ.get('DATABASE_NAME', 'escola'),
+        'user': os.environ.get('DATABASE_USER', 'postgres'),
+        'password': os.environ.get('DATABASE_PASSWORD', 'postgres'),
+        'connect_timeout': int(os.environ.get('DATABASE_CONNECT_TIMEOUT', '5')),
+    }
+    params.update(overrides)
+    return psycopg2.connect(**params)
+
+
+def _pool_connect(**overrides):
+    # Conexões da API: nenhum comando segura uma conexão do pool por mais de
+    # DB_STATEMENT_TIMEOUT (0 desliga), e todos passam pelo registro de
+    # consultas lentas. Migrações e scripts usam _connect.
+    statement_timeout = os.environ.get('DB_STATEMENT_TIMEOUT', '5s')
+    return _connect(options=f'-c statement_timeout={statement_timeout}', cursor_factory=CursorMonitorado, **overrides)
+
+
+_pool = None
+_router = None
+_admission = None
+_pool_lock = threading.Lock()
+# Pool de origem das conexões emprestadas a leituras (réplica ou primário)
+_owners = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    """Retorna o pool do processo, criando-o na primeira chamada."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _pool_connect,
+                    minconn=int(os.environ.get('DB_POOL_MIN', '1')),
+                    maxconn=int(os.environ.get('DB_POOL_MAX', '10')),
+                    timeout=float(os.environ.get('DB_POOL_TIMEOUT', '5')),
+                    validate_after=float(os.environ.get('DB_POOL_VALIDATE_AFTER', '30')),
+                )
+    return _pool
+
+
+def _replica_pool(address):
+    host, _, port = address.strip().partition(':')
+    overrides = {'host': host, 'port': int(port)} if port else {'host': host}
+    return ConnectionPool(
+        functools.partial(_pool_connect, **overrides),
+        minconn=0,
+        maxconn=int(os.environ.get('DB_REPLICA_POOL_MAX', os.environ.get('DB_POOL_MAX', '10'))),
+        timeout=float(os.environ.get('DB_POOL_TIMEOUT', '5')),
+        validate_after=float(os.environ.get('DB_POOL_VALIDATE_AFTER', '30')),
+    )
+
+
+def get_router():
+    """Roteador de leituras do processo, ou ``None`` sem réplicas configuradas.
+
+    As réplicas vêm de ``DATABASE_REPLICAS`` (``host[:porta],...``) e usam o
+    mesmo banco, usuário e senha do primário.
+    """
+    global _router
+    if _router is None:
+        addresses = [a for a in os.environ.get('DATABASE_REPLICAS', '').split(',') if a.strip()]
+        if not addresses:
+            return None
+        primary = get_pool()
+        with _pool_lock:
+            if _router is None:
+                _router = ReadRouter(
+                    primary,
+                    [Replica(address.strip(), _replica_pool(address)) for address in addresses],
+                    max_lag=float(os.environ.get('DB_REPLICA_MAX_LAG', '5')),
+                    check_interval=float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', '1')),
+                    retry_after=float(os.environ.get('DB_REPLICA_RETRY_AFTER', '10')),
+                )
+    return _router
+
+
+def get_admission():
+    """Controle de admissão do processo, criado na primeira chamada."""
+    global _admission
+    if _admission is None:
+        with _pool_lock:
+            if _admission is None:
+                limit = int(os.environ.get('DB_ADMISSION_LIMIT', os.environ.get('DB_POOL_MAX', '10')))
+                _admission = AdmissionControl(
+                    limit=limit,
+                    max_queue=int(os.environ.get('DB_ADMISSION_QUEUE', str(2 * limit))),
+                    timeout=float(os.environ.get('DB_ADMISSION_TIMEOUT', '2')),
+                    retry_after=float(os.environ.get('DB_ADMISSION_RETRY_AFTER', '1')),
+                )
+    return _admission
+
+
+def get_db_connection(read_only=False, min_lsn=None):
+    """Empresta uma conexão do pool; retorna ``None`` se o banco estiver indisponível.
+
+    Antes passa pelo controle de admissão, que pode lançar
+    ``AdmissionRejected``; o pool esgotado também vira ``AdmissionRejected``,
+    já que o banco está no ar e basta tentar de novo. Com ``read_only=True``
+    e réplicas configuradas, a conexão pode vir de uma réplica que já tenha
+    aplicado o WAL até ``min_lsn`` (ver ``ReadRouter``).
+    """
+    admission = get_admission()
+    admission.acquire()
+    try:
+        router = get_router() if read_only else None
+        if router is None:
+            return get_pool().getconn()
+        conn, pool = router.getconn(min_lsn)
+        if pool is not router.primary:
+            _owners[conn] = pool
+        return conn
+    except PoolTimeoutError as e:
+        admission.release()
+        raise AdmissionRejected('pool de conexões esgotado', admission.retry_after) from e
+    except psycopg2.Error as e:
+        admission.release()
+        print(f"Erro ao conectar ao banco de dados: {e}")
+        return None
+    except BaseException:
+        admission.release()
+        raise
+
+
+def release_db_connection(conn):
+    """Devolve ao pool uma conexão obtida com ``get_db_connection``."""
+    if conn:
+        pool = _owners.pop(conn, None) or get_pool()
+        try:
+            pool.putconn(conn)
+        finally:
+            get_admission().release()
+
+
+def wal_lsn(conn):
+    """Posição atual do WAL vista por ``conn``, como texto; ``None`` se falhar.
+
+    Chamada logo depois do commit de uma escrita, na mesma conexão do
+    primário, inclui o registro desse commit. É a posição de inserção: a de
+    escrita pode ficar antes do registro de commit de uma transação que não
+    gravou WAL (commit assíncrono). A leitura roda fora de transação, para a
+    conexão voltar ao pool sem nada a desfazer.
+    """
+    autocommit = conn.autocommit
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute('SELECT pg_current_wal_insert_lsn()')
+            return cur.fetchone()[0]
+    except psycopg2.Error as e:
+        print(f"Erro ao ler a posição do WAL: {e}")
+        return None
+    finally:
+        if conn.autocommit != autocommit:
+            conn.autocommit = autocommit
+
+
+def close_pools():
+    """Fecha os pools do processo; o próximo empréstimo cria pools novos.
+
+    Chamado depois de um fork (ver ``gunicorn.conf.py``): conexões abertas
+    antes dele não podem ser compartilhadas entre processos.
+    """
+    global _pool, _router
+    with _pool_lock:
+        pools = [_pool] if _pool is not None else []
+        if _router is not None:
+            pools.extend(replica.pool for replica in _router.replicas)
+        _pool = _router = None
+    for pool in pools:
+        pool.closeall()
+
+
+def pool_stats():
+    """Métricas do pool do processo (vazio se ele ainda não foi criado)."""
+    return _pool.stats() if _pool is not None else {}
+
+
+def admission_stats():
+    """Métricas do controle de admissão (vazio se ele ainda não foi criado)."""
+    return _admission.stats() if _admission is not None else {}
+
+
+def replica_stats():
+    """Métricas do roteamento de leituras (vazio sem réplicas configuradas)."""
+    return _router.stats() if _router is not None else {}
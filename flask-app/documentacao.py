@@ -0,0 +1,111 @@
+"""Documentação OpenAPI da API: gerada uma vez no build e servida pronta.
+
+Dois modos, escolhidos por ``API_DOCS``:
+
+- ``swagger`` (padrão, desenvolvimento): o flasgger monta a especificação a
+  partir dos ``swag_from`` de cada rota e serve a interface em ``/docs/``.
+- ``static`` (produção): ``/apispec.json`` devolve o arquivo gerado no build
+  (``API_SPEC_FILE``, padrão ``apispec.json`` ao lado deste módulo). O
+  flasgger nem é importado e os ``swag_from`` não fazem nada, o que encurta
+  a subida dos workers e a memória de cada um. Não há ``/docs/``.
+
+Para gerar o arquivo (o dockerfile faz isso na imagem)::
+
+    python documentacao.py --saida apispec.json
+"""
+import argparse
+import json
+import os
+
+from flask import Response, request
+
+MODO = os.environ.get('API_DOCS', 'swagger')
+if MODO not in ('swagger', 'static'):
+    raise RuntimeError(f'API_DOCS inválido: {MODO!r} (use "swagger" ou "static")')
+
+ARQUIVO_SPEC = os.environ.get('API_SPEC_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'apispec.json')
+
+swagger_config = {
+    "headers": [],
+    "specs": [
+        {
+            "endpoint": "apispec",
+            "route": "/apispec.json",
+            "rule_filter": lambda rule: True,
+            "model_filter": lambda tag: True,
+        }
+    ],
+    "static_url_path": "/flasgger_static",
+    "swagger_ui": True,
+    "specs_route": "/docs/"
+}
+
+swagger_template = {
+    "info": {
+        "title": "API de Gerenciamento Escolar",
+        "description": "API para gerenciamento de alunos e recursos escolares",
+        "contact": {
+            "name": "Equipe de Desenvolvimento",
+            "email": "dev@escola.com"
+        },
+        "version": "1.0.0"
+    },
+    "schemes": ["http", "https"],
+}
+
+
+def swag_from(especificacao):
+    """``flasgger.swag_from`` no modo swagger; no modo static, devolve a rota intacta."""
+    if MODO == 'swagger':
+        from flasgger import swag_from as _swag_from
+        return _swag_from(especificacao)
+    return lambda funcao: funcao
+
+
+def registrar_documentacao(app):
+    """Liga a documentação ao ``app`` conforme o modo."""
+    if MODO == 'swagger':
+        from flasgger import Swagger
+        return Swagger(app, config=swagger_config, template=swagger_template)
+
+    try:
+        with open(ARQUIVO_SPEC, 'rb') as arquivo:
+            corpo = arquivo.read()
+    except OSError as e:
+        raise RuntimeError(f'API_DOCS=static, mas a especificação não pôde ser lida ({e}); '
+                           'gere-a com "python documentacao.py"') from e
+
+    def apispec():
+        response = Response(corpo, mimetype='application/json')
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+        response.add_etag()
+        return response.make_conditional(request)
+
+    app.add_url_rule('/apispec.json', 'apispec', apispec)
+    return None
+
+
+def gerar_especificacao():
+    """Monta a especificação com o flasgger, como ela seria servida em /apispec.json."""
+    os.environ['API_DOCS'] = 'swagger'
+    from app import app
+
+    resposta = app.test_client().get('/apispec.json')
+    if resposta.status_code != 200:
+        raise RuntimeError(f'/apispec.json respondeu {resposta.status_code}')
+    return resposta.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--saida', default=ARQUIVO_SPEC, help='arquivo JSON a escrever')
+    args = parser.parse_args()
+
+    especificacao = gerar_especificacao()
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(especificacao, arquivo, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    print(f"{len(especificacao.get('paths', {}))} caminhos em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
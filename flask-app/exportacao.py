@@ -0,0 +1,142 @@
+"""Exportação de alunos com ``COPY ... TO STDOUT`` transmitida ao cliente.
+
+O Postgres já entrega as linhas formatadas (CSV ou NDJSON); os bytes passam
+do ``copy_expert`` para a resposta HTTP sem virar objetos Python por linha,
+agrupados em blocos e, se o cliente aceitar, comprimidos em gzip no caminho.
+
+O ``copy_expert`` do psycopg2 só escreve num arquivo e bloqueia até o fim do
+COPY, então ele roda numa thread que entrega os blocos por uma fila
+limitada: se o cliente lê devagar, a fila enche e o COPY espera. A memória
+de uma exportação fica em torno de ``FILA_MAXIMA * BLOCO``, qualquer que
+seja o número de linhas.
+"""
+import os
+import queue
+import threading
+import zlib
+
+BLOCO = 64 * 1024
+FILA_MAXIMA = 16
+# Níveis baixos comprimem quase tanto quanto o 6 (padrão do gzip) pela
+# metade do tempo de CPU, que aqui é gasto durante a requisição.
+NIVEL_GZIP = int(os.environ.get('EXPORTACAO_NIVEL_GZIP', '3'))
+
+# formato -> (mimetype, extensão do arquivo)
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+_FIM = object()
+
+
+class ExportacaoInterrompida(Exception):
+    """O cliente desconectou; interrompe o COPY em andamento."""
+
+
+def comando_copy(cur, consulta, params, formato):
+    """COPY da ``consulta`` no ``formato`` pedido.
+
+    COPY não aceita parâmetros, então os valores entram já escapados pelo
+    ``mogrify``. No NDJSON cada linha é um ``row_to_json``; o formato CSV com
+    aspas e delimitador de controle (que o JSON sempre escapa) evita que o
+    COPY escape as barras invertidas do JSON, como faria no formato texto.
+    """
+    select = cur.mogrify(consulta, params)
+    if formato == 'csv':
+        return b'COPY (' + select + b') TO STDOUT WITH (FORMAT csv, HEADER)'
+    return (b'COPY (SELECT row_to_json(t) FROM (' + select + b') t) TO STDOUT '
+            b"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')")
+
+
+class _Destino:
+    """Arquivo em que o ``copy_expert`` escreve; repassa blocos à fila."""
+
+    def __init__(self, fila, comprimir):
+        self._fila = fila
+        self._buffer = bytearray()
+        self._gzip = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31) if comprimir else None
+        self.interrompida = False
+
+    def write(self, dados):
+        if self.interrompida:
+            raise ExportacaoInterrompida()
+        self._buffer += dados
+        if len(self._buffer) >= BLOCO:
+            self._enviar()
+
+    def _enviar(self, final=False):
+        bloco = bytes(self._buffer)
+        self._buffer.clear()
+        if self._gzip is not None:
+            bloco = self._gzip.compress(bloco) + (self._gzip.flush() if final else b'')
+        if bloco:
+            self._fila.put(bloco)
+
+    def fechar(self):
+        self._enviar(final=True)
+
+
+def _copiar(cur, comando, destino, fila):
+    try:
+        cur.copy_expert(comando, destino)
+        destino.fechar()
+        fila.put(_FIM)
+    except Exception as e:  # repassado ao gerador, que roda na thread da requisição
+        fila.put(e)
+
+
+def transmitir_copy(conn, comando, comprimir=False, ao_terminar=None):
+    """Gera os blocos de bytes do ``comando`` COPY executado em ``conn``.
+
+    ``ao_terminar(conn, linhas)`` é chamado no fim, com ``linhas=None`` se a
+    exportação não foi até o final, inclusive quando o cliente desconecta e
+    o gerador é fechado; nesse caso o COPY é cancelado no servidor.
+    """
+    fila = queue.Queue(FILA_MAXIMA)
+    destino = _Destino(fila, comprimir)
+    cur = conn.cursor()
+    produtor = threading.Thread(target=_copiar, args=(cur, comando, destino, fila), daemon=True)
+    produtor.start()
+    concluida = False
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM:
+                concluida = True
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if not concluida:
+            destino.interrompida = True
+            conn.cancel()
+            # Esvazia a fila para destravar o produtor caso ele esteja esperando espaço
+            while produtor.is_alive():
+                try:
+                    fila.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        produtor.join()
+        linhas = cur.rowcount if concluida else None
+        cur.close()
+        if ao_terminar is not None:
+            ao_terminar(conn, linhas)
+
+
+def iniciar(gerador):
+    """Avança ``gerador`` até o primeiro bloco.
+
+    Assim, um erro no COPY ainda pode virar uma resposta de erro antes de os
+    cabeçalhos serem enviados. Retorna um gerador com todos os blocos.
+    """
+    primeiro = next(gerador, b'')
+
+    def continuar():
+        try:
+            yield primeiro
+            yield from gerador
+        finally:
+            gerador.close()
+    return continuar()
@@ -0,0 +1,73 @@
+"""Configuração do gunicorn para servir a API em produção.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Workers e threads saem dos núcleos disponíveis para o processo e podem ser
+fixados com ``WEB_CONCURRENCY`` e ``GUNICORN_THREADS``. A aplicação é
+carregada uma vez no processo mestre (``preload_app``) e cada worker abre o
+seu próprio pool de conexões depois do fork.
+
+Recarga sem derrubar requisições:
+
+- ``kill -HUP <mestre>`` sobe workers novos com a configuração relida e só
+  então encerra os antigos, que terminam as requisições em andamento (até
+  ``graceful_timeout``). Com ``preload_app`` o código continua o mesmo.
+- Para trocar o código: ``kill -USR2 <mestre>`` inicia um mestre novo ao
+  lado do antigo; com o novo atendendo, ``kill -QUIT <mestre antigo>``.
+"""
+import os
+
+
+def _nucleos():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Um processo por núcleo, mais um para cobrir a espera do banco; dentro de
+# cada worker, threads atendem as requisições que estão esperando o Postgres
+workers = int(os.environ.get('WEB_CONCURRENCY', _nucleos() + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+# Metade das threads pode usar o banco ao mesmo tempo (o pool e o limite do
+# controle de admissão seguem DB_POOL_MAX). As outras esperam na fila de
+# admissão, de onde saem com 503 se o banco não der vazão, e continuam
+# livres para rotas que não usam o banco, como /metrics.
+os.environ.setdefault('DB_POOL_MAX', str(max(1, threads // 2)))
+
+# O cache de GET /alunos/<id> é por processo e a escrita só o invalida no
+# worker que a atendeu: com mais de um worker, os outros serviriam o aluno
+# antigo até o TTL. Nesse caso ele fica desligado; CACHE_BACKEND=memoria
+# religa, aceitando leituras velhas por até CACHE_ALUNOS_TTL segundos.
+if workers > 1:
+    os.environ.setdefault('CACHE_BACKEND', 'nenhum')
+
+preload_app = True
+
+# Recicla cada worker depois de um número de requisições; o jitter evita
+# que todos reiniciem ao mesmo tempo
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    # O mestre não atende requisições: fecha o que tiver sido aberto ao
+    # carregar a aplicação, para que nenhum socket do banco seja herdado
+    import database
+    database.close_pools()
+
+
+def post_fork(server, worker):
+    import database
+    database.close_pools()
@@ -0,0 +1,167 @@
+import csv
+import datetime
+import io
+import json
+
+from repositorio import Tabela, ValorInvalido
+
+# A tabela Aluno (flask-app/init.sql) com o tipo de cada coluna
+ALUNO = Tabela('Aluno', 'id_aluno', [
+    ('id_aluno', int),
+    ('nome_completo', str),
+    ('data_nascimento', datetime.date),
+    ('id_turma', int),
+    ('nome_responsavel', str),
+    ('telefone_responsavel', str),
+    ('email_responsavel', str),
+    ('informacoes_adicionais', str),
+], registro='Aluno')
+
+# Colunas aceitas no cadastro de alunos, na ordem do INSERT
+COLUNAS_ALUNO = ALUNO.editaveis
+
+# Colunas NOT NULL de Aluno: exigidas no cadastro individual, no PUT e no lote
+OBRIGATORIOS_ALUNO = ('nome_completo', 'data_nascimento')
+
+# Quais das turmas citadas num lote existem (as demais viram erro da linha)
+TURMAS_EXISTENTES = 'SELECT id_turma FROM Turma WHERE id_turma = ANY(%s)'
+
+FORMATOS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonlines': 'ndjson',
+    'text/csv': 'csv',
+}
+
+EXTENSOES = {
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+}
+
+
+class ErroImportacao(ValueError):
+    """O conteúdo enviado não pôde ser lido no formato informado."""
+
+
+def converter_aluno(dados):
+    """Valores de ``dados`` na ordem de ``COLUNAS_ALUNO``, já no tipo de cada coluna.
+
+    Lança ``ValorInvalido`` se faltar um campo obrigatório ou se um valor
+    não servir para a sua coluna (data fora do formato AAAA-MM-DD, turma
+    que não é número, ...).
+    """
+    if not isinstance(dados, dict):
+        raise ValorInvalido('O campo "nome_completo" é obrigatório')
+    for campo in OBRIGATORIOS_ALUNO:
+        if not dados.get(campo):
+            raise ValorInvalido(f'O campo "{campo}" é obrigatório')
+    convertidos = ALUNO.converter(dados, COLUNAS_ALUNO)
+    return tuple(convertidos.get(coluna) for coluna in COLUNAS_ALUNO)
+
+
+def validar_aluno(dados):
+    """Aplica as regras do cadastro individual; retorna a mensagem de erro ou ``None``."""
+    try:
+        converter_aluno(dados)
+    except ValorInvalido as e:
+        return str(e)
+    return None
+
+
+def validar_alteracoes(dados):
+    """Regras da atualização parcial; retorna a mensagem de erro ou ``None``."""
+    if not isinstance(dados, dict) or not dados:
+        return 'Envie ao menos um campo para atualizar'
+    desconhecidos = [campo for campo in dados if campo not in COLUNAS_ALUNO]
+    if desconhecidos:
+        return f'Campos desconhecidos: {", ".join(desconhecidos)}'
+    if 'nome_completo' in dados and not dados['nome_completo']:
+        return 'O campo "nome_completo" não pode ficar vazio'
+    if 'data_nascimento' in dados and not dados['data_nascimento']:
+        return 'O campo "data_nascimento" não pode ficar vazio'
+    return None
+
+
+def formato_do_upload(mimetype, filename=None):
+    """Descobre o formato ('json', 'ndjson' ou 'csv') pelo tipo ou pela extensão do arquivo."""
+    if filename:
+        for extensao, formato in EXTENSOES.items():
+            if filename.lower().endswith(extensao):
+                return formato
+    return FORMATOS.get(mimetype)
+
+
+def ler_registros(texto, formato):
+    """Gera pares ``(linha, registro)`` a partir do conteúdo enviado.
+
+    ``registro`` é ``None`` quando aquela linha não pôde ser interpretada; o
+    chamador reporta o erro só dela e segue com as demais.
+    """
+    if formato == 'json':
+        try:
+            registros = json.loads(texto)
+        except ValueError as e:
+            raise ErroImportacao(f'JSON inválido: {e}')
+        if not isinstance(registros, list):
+            raise ErroImportacao('O corpo deve ser um array JSON de alunos')
+        for linha, registro in enumerate(registros, start=1):
+            yield linha, registro
+    elif formato == 'ndjson':
+        for linha, conteudo in enumerate(texto.splitlines(), start=1):
+            if not conteudo.strip():
+                continue
+            try:
+                yield linha, json.loads(conteudo)
+            except ValueError:
+                yield linha, None
+    elif formato == 'csv':
+        leitor = csv.DictReader(io.StringIO(texto))
+        desconhecidas = set(leitor.fieldnames or ()) - set(COLUNAS_ALUNO)
+        if desconhecidas:
+            raise ErroImportacao(f'Colunas desconhecidas no CSV: {", ".join(sorted(desconhecidas))}')
+        for linha, registro in enumerate(leitor, start=1):
+            # No CSV, célula vazia significa ausência de valor
+            yield linha, {coluna: (valor if valor != '' else None) for coluna, valor in registro.items()}
+    else:
+        raise ErroImportacao('Formato não suportado; use JSON, NDJSON ou CSV')
+
+
+def separar_validos(registros):
+    """Divide os registros em ``(linhas, valores)`` válidos e a lista de erros por linha.
+
+    Os valores já vêm convertidos (``converter_aluno``).
+    """
+    linhas, valores, erros = [], [], []
+    for linha, registro in registros:
+        if registro is None:
+            erros.append({'linha': linha, 'error': 'Linha não é um JSON válido'})
+            continue
+        try:
+            valores.append(converter_aluno(registro))
+        except ValorInvalido as e:
+            erros.append({'linha': linha, 'error': str(e)})
+        else:
+            linhas.append(linha)
+    return linhas, valores, erros
+
+
+_TURMA = COLUNAS_ALUNO.index('id_turma')
+
+
+def turmas_do_lote(valores):
+    """Turmas citadas nos valores de ``separar_validos``."""
+    return sorted({v[_TURMA] for v in valores if v[_TURMA] is not None})
+
+
+def separar_turmas_inexistentes(linhas, valores, existentes):
+    """Tira do lote as linhas com turma fora de ``existentes``; retorna ``(linhas, valores, erros)``."""
+    mantidas, erros = [], []
+    for linha, valor in zip(linhas, valores):
+        if valor[_TURMA] is None or valor[_TURMA] in existentes:
+            mantidas.append((linha, valor))
+        else:
+            erros.append({'linha': linha, 'error': f'A turma {valor[_TURMA]} não existe'})
+    return [linha for linha, _ in mantidas], [valor for _, valor in mantidas], erros
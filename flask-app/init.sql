@@ -1,32 +1,32 @@
-CREATE TABLE Aluno (
-    id_aluno INT AUTO_INCREMENT PRIMARY KEY,
+CREATE TABLE Professor (
+    id_professor SERIAL PRIMARY KEY,
     nome_completo VARCHAR(255) NOT NULL,
-    data_nascimento DATE NOT NULL,
-    id_turma INT,
-    nome_responsavel VARCHAR(255),
-    telefone_responsavel VARCHAR(20),
-    email_responsavel VARCHAR(100),
-    informacoes_adicionais TEXT,
-    FOREIGN KEY (id_turma) REFERENCES Turma(id_turma)
+    email VARCHAR(100),
+    telefone VARCHAR(20)
 );
 
 CREATE TABLE Turma (
-    id_turma INT AUTO_INCREMENT PRIMARY KEY,
+    id_turma SERIAL PRIMARY KEY,
     nome_turma VARCHAR(50) NOT NULL,
     id_professor INT,
     horario VARCHAR(100),
     FOREIGN KEY (id_professor) REFERENCES Professor(id_professor)
 );
 
-CREATE TABLE Professor (
-    id_professor INT AUTO_INCREMENT PRIMARY KEY,
+CREATE TABLE Aluno (
+    id_aluno SERIAL PRIMARY KEY,
     nome_completo VARCHAR(255) NOT NULL,
-    email VARCHAR(100),
-    telefone VARCHAR(20)
+    data_nascimento DATE NOT NULL,
+    id_turma INT,
+    nome_responsavel VARCHAR(255),
+    telefone_responsavel VARCHAR(20),
+    email_responsavel VARCHAR(100),
+    informacoes_adicionais TEXT,
+    FOREIGN KEY (id_turma) REFERENCES Turma(id_turma)
 );
 
 CREATE TABLE Pagamento (
-    id_pagamento INT AUTO_INCREMENT PRIMARY KEY,
+    id_pagamento SERIAL PRIMARY KEY,
     id_aluno INT NOT NULL,
     data_pagamento DATE NOT NULL,
     valor_pago DECIMAL(10, 2) NOT NULL,
@@ -37,15 +37,16 @@ CREATE TABLE Pagamento (
 );
 
 CREATE TABLE Presenca (
-    id_presenca INT AUTO_INCREMENT PRIMARY KEY,
+    id_presenca SERIAL PRIMARY KEY,
     id_aluno INT NOT NULL,
     data_presenca DATE NOT NULL,
     presente BOOLEAN NOT NULL,
+    CONSTRAINT uq_presenca_aluno_data UNIQUE (id_aluno, data_presenca),
     FOREIGN KEY (id_aluno) REFERENCES Aluno(id_aluno)
 );
 
 CREATE TABLE Atividade (
-    id_atividade INT AUTO_INCREMENT PRIMARY KEY,
+    id_atividade SERIAL PRIMARY KEY,
     descricao TEXT NOT NULL,
     data_realizacao DATE NOT NULL
 );
@@ -59,10 +60,16 @@ CREATE TABLE Atividade_Aluno (
 );
 
 CREATE TABLE Usuario (
-    id_usuario INT AUTO_INCREMENT PRIMARY KEY,
+    id_usuario SERIAL PRIMARY KEY,
     login VARCHAR(50) UNIQUE NOT NULL,
     senha VARCHAR(255) NOT NULL,
     nivel_acesso VARCHAR(20),
     id_professor INT,
     FOREIGN KEY (id_professor) REFERENCES Professor(id_professor)
-);
\ No newline at end of file
+);
+
+-- Índices para os filtros e ordenações de GET /alunos. id_aluno no fim de
+-- cada um permite paginar por keyset sem ordenar em memória.
+CREATE INDEX idx_aluno_turma ON Aluno (id_turma, id_aluno);
+CREATE INDEX idx_aluno_nascimento ON Aluno (data_nascimento, id_aluno);
+CREATE INDEX idx_aluno_nome ON Aluno (nome_completo, id_aluno);
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Cronometragem por requisição e exposição no formato do Prometheus.
+
+Cada requisição acumula em ``g`` o tempo gasto em cada etapa (obter conexão,
+consulta, serialização) e a quantidade de linhas lidas. Ao final, os tempos
+vão para o cabeçalho ``Server-Timing`` e para histogramas agregados por rota,
+expostos por ``/metrics``. O custo é de algumas chamadas a
+``time.perf_counter`` e uma busca binária por observação.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request
+
+# Limites dos baldes, em segundos (etapas e total) e em linhas
+BALDES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BALDES_LINHAS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+class Histograma:
+    """Histograma cumulativo com rótulos, no estilo do cliente oficial do Prometheus."""
+
+    def __init__(self, nome, descricao, rotulos, baldes):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self.baldes = tuple(baldes)
+        self._series = {}   # valores dos rótulos -> [contagens por balde..., +Inf, soma]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores_rotulos):
+        indice = bisect_left(self.baldes, valor)
+        with self._lock:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [0] * (len(self.baldes) + 1) + [0.0]
+            serie[indice] += 1
+            serie[-1] += valor
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} histogram']
+        with self._lock:
+            series = {chave: list(valores) for chave, valores in self._series.items()}
+        for valores_rotulos, serie in sorted(series.items()):
+            rotulos = ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(self.rotulos, valores_rotulos))
+            prefixo = rotulos + ',' if rotulos else ''
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + (float('inf'),), serie):
+                acumulado += contagem
+                le = '+Inf' if limite == float('inf') else repr(limite)
+                linhas.append(f'{self.nome}_bucket{{{prefixo}le="{le}"}} {acumulado}')
+            linhas.append(f'{self.nome}_sum{{{rotulos}}} {serie[-1]}')
+            linhas.append(f'{self.nome}_count{{{rotulos}}} {acumulado}')
+        return linhas
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+duracao_requisicao = Histograma(
+    'escola_http_request_duration_seconds', 'Latência total das requisições HTTP.',
+    ('method', 'route', 'status'), BALDES_SEGUNDOS)
+duracao_etapa = Histograma(
+    'escola_request_phase_duration_seconds', 'Tempo gasto em cada etapa da requisição.',
+    ('route', 'phase'), BALDES_SEGUNDOS)
+linhas_lidas = Histograma(
+    'escola_db_rows', 'Linhas lidas do banco por requisição.',
+    ('route',), BALDES_LINHAS)
+
+HISTOGRAMAS = (duracao_requisicao, duracao_etapa, linhas_lidas)
+
+
+@contextmanager
+def medir(etapa):
+    """Soma ao tempo da ``etapa`` na requisição atual o tempo gasto no bloco."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tempos = g.medicao['tempos']
+        tempos[etapa] = tempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+
+def registrar_linhas(quantidade):
+    g.medicao['linhas'] = (g.medicao['linhas'] or 0) + quantidade
+
+
+def _rota():
+    return request.url_rule.rule if request.url_rule else 'desconhecida'
+
+
+def _iniciar():
+    # Um único dict por requisição: respostas transmitidas continuam
+    # acrescentando tempos e linhas a ele depois do after_request.
+    g.medicao = {'inicio': time.perf_counter(), 'tempos': {}, 'linhas': None}
+
+
+def _finalizar(response):
+    medicao = g.medicao
+    tempos = medicao['tempos']
+    total = time.perf_counter() - medicao['inicio']
+    partes = [f'{etapa};dur={segundos * 1000:.2f}' for etapa, segundos in tempos.items()]
+    partes.append(f'total;dur={total * 1000:.2f}')
+    response.headers['Server-Timing'] = ', '.join(partes)
+
+    rota, metodo, status = _rota(), request.method, str(response.status_code)
+
+    def registrar():
+        # Respostas transmitidas só terminam depois do after_request; os
+        # histogramas são alimentados quando o corpo inteiro foi enviado.
+        duracao_requisicao.observar(time.perf_counter() - medicao['inicio'], metodo, rota, status)
+        for etapa, segundos in tempos.items():
+            duracao_etapa.observar(segundos, rota, etapa)
+        if medicao['linhas'] is not None:
+            linhas_lidas.observar(medicao['linhas'], rota)
+
+    response.call_on_close(registrar)
+    return response
+
+
+def instrumentar(app):
+    """Registra a cronometragem em todas as rotas de ``app``."""
+    app.before_request(_iniciar)
+    app.after_request(_finalizar)
+
+
+def exportar(medidores=()):
+    """Texto no formato de exposição do Prometheus.
+
+    ``medidores`` é uma sequência de ``(nome, descrição, valores)``, em que
+    ``valores`` é um dict ``{sufixo: número}`` exportado como gauges
+    ``nome_sufixo``.
+    """
+    linhas = []
+    for histograma in HISTOGRAMAS:
+        linhas.extend(histograma.exportar())
+    for nome, descricao, valores in medidores:
+        for sufixo, valor in sorted(valores.items()):
+            if isinstance(valor, (int, float)):
+                linhas.append(f'# HELP {nome}_{sufixo} {descricao}')
+                linhas.append(f'# TYPE {nome}_{sufixo} gauge')
+                linhas.append(f'{nome}_{sufixo} {int(valor) if isinstance(valor, bool) else valor}')
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,11 @@
+-- migrar: sem-transacao
+-- Índices para as chaves estrangeiras. Sem eles, cada consulta por aluno e
+-- cada DELETE FROM Aluno (que verifica as tabelas filhas) varre Presenca,
+-- Pagamento e Atividade_Aluno inteiras. CONCURRENTLY não bloqueia escritas
+-- nas tabelas enquanto o índice é construído.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_presenca_aluno ON Presenca (id_aluno, data_presenca);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pagamento_aluno ON Pagamento (id_aluno, data_pagamento);
+-- A chave primária (id_atividade, id_aluno) não serve para buscas só por id_aluno
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_atividade_aluno_aluno ON Atividade_Aluno (id_aluno);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_turma_professor ON Turma (id_professor);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usuario_professor ON Usuario (id_professor);
@@ -0,0 +1,6 @@
+-- migrar: sem-transacao
+-- Os mesmos índices de GET /alunos que init.sql cria, para bancos criados
+-- antes deles. Em bancos novos não fazem nada.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aluno_turma ON Aluno (id_turma, id_aluno);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aluno_nascimento ON Aluno (data_nascimento, id_aluno);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aluno_nome ON Aluno (nome_completo, id_aluno);
@@ -0,0 +1,15 @@
+-- migrar: sem-transacao
+-- Uma presença por aluno por dia: a chamada de POST/PUT grava com
+-- ON CONFLICT (id_aluno, data_presenca), então reenviar a chamada sobrescreve.
+-- Duplicatas antigas são resolvidas mantendo o registro mais recente.
+DELETE FROM Presenca p USING Presenca q
+WHERE p.id_aluno = q.id_aluno AND p.data_presenca = q.data_presenca AND p.id_presenca < q.id_presenca;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_presenca_aluno_data ON Presenca (id_aluno, data_presenca);
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'presenca'::regclass AND conname = 'uq_presenca_aluno_data') THEN
+        ALTER TABLE Presenca ADD CONSTRAINT uq_presenca_aluno_data UNIQUE USING INDEX uq_presenca_aluno_data;
+    END IF;
+END $$;
+-- O índice único cobre as buscas por aluno que idx_presenca_aluno atendia
+DROP INDEX CONCURRENTLY IF EXISTS idx_presenca_aluno;
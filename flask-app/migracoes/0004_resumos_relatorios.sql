@@ -0,0 +1,129 @@
+-- Relatórios de frequência por turma e de pagamentos por aluno, servidos de
+-- tabelas de resumo por mês em vez de varrer Presenca e Pagamento inteiras.
+--
+-- Triggers por comando (com tabelas de transição) marcam em Periodo_Pendente
+-- cada (turma, mês) ou (aluno, mês) afetado; relatorios.py recalcula só
+-- esses períodos. O ON CONFLICT ... DO UPDATE (em vez de DO NOTHING) trava a
+-- marcação até o fim da transação de quem escreveu, para que uma
+-- atualização em andamento não a consuma antes de enxergar os dados novos.
+
+CREATE TABLE Resumo_Presenca_Turma (
+    mes DATE NOT NULL,
+    id_turma INT NOT NULL,
+    dias_letivos INT NOT NULL,
+    registros INT NOT NULL,
+    presencas INT NOT NULL,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (mes, id_turma)
+);
+
+CREATE TABLE Resumo_Pagamento_Aluno (
+    mes DATE NOT NULL,
+    id_aluno INT NOT NULL,
+    pagamentos INT NOT NULL,
+    valor_total DECIMAL(12, 2) NOT NULL,
+    valor_pendente DECIMAL(12, 2) NOT NULL,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (mes, id_aluno)
+);
+
+-- chave é id_turma para 'presenca' e id_aluno para 'pagamento'
+CREATE TABLE Periodo_Pendente (
+    relatorio VARCHAR(20) NOT NULL,
+    chave INT NOT NULL,
+    mes DATE NOT NULL,
+    marcado_em TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (relatorio, chave, mes)
+);
+
+CREATE TABLE Relatorio_Atualizacao (
+    relatorio VARCHAR(20) PRIMARY KEY,
+    executado_em TIMESTAMP NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION marcar_presenca_pendente() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO Periodo_Pendente (relatorio, chave, mes)
+        SELECT DISTINCT 'presenca', a.id_turma, date_trunc('month', m.data_presenca)::date
+        FROM (SELECT id_aluno, data_presenca FROM alteradas
+              UNION SELECT id_aluno, data_presenca FROM anteriores) m
+        JOIN Aluno a ON a.id_aluno = m.id_aluno
+        WHERE a.id_turma IS NOT NULL
+        ORDER BY 2, 3
+        ON CONFLICT (relatorio, chave, mes) DO UPDATE SET marcado_em = now();
+    ELSE
+        INSERT INTO Periodo_Pendente (relatorio, chave, mes)
+        SELECT DISTINCT 'presenca', a.id_turma, date_trunc('month', m.data_presenca)::date
+        FROM alteradas m
+        JOIN Aluno a ON a.id_aluno = m.id_aluno
+        WHERE a.id_turma IS NOT NULL
+        ORDER BY 2, 3
+        ON CONFLICT (relatorio, chave, mes) DO UPDATE SET marcado_em = now();
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION marcar_pagamento_pendente() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO Periodo_Pendente (relatorio, chave, mes)
+        SELECT DISTINCT 'pagamento', m.id_aluno, date_trunc('month', m.data_pagamento)::date
+        FROM (SELECT id_aluno, data_pagamento FROM alteradas
+              UNION SELECT id_aluno, data_pagamento FROM anteriores) m
+        ORDER BY 2, 3
+        ON CONFLICT (relatorio, chave, mes) DO UPDATE SET marcado_em = now();
+    ELSE
+        INSERT INTO Periodo_Pendente (relatorio, chave, mes)
+        SELECT DISTINCT 'pagamento', m.id_aluno, date_trunc('month', m.data_pagamento)::date
+        FROM alteradas m
+        ORDER BY 2, 3
+        ON CONFLICT (relatorio, chave, mes) DO UPDATE SET marcado_em = now();
+    END IF;
+    RETURN NULL;
+END $$;
+
+-- A frequência é agrupada pela turma atual do aluno: trocar de turma suja os
+-- meses com presença dele na turma antiga e na nova.
+CREATE OR REPLACE FUNCTION marcar_troca_de_turma() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO Periodo_Pendente (relatorio, chave, mes)
+    SELECT DISTINCT 'presenca', t.id_turma, date_trunc('month', p.data_presenca)::date
+    FROM anteriores o
+    JOIN alteradas n ON n.id_aluno = o.id_aluno AND n.id_turma IS DISTINCT FROM o.id_turma
+    CROSS JOIN LATERAL (VALUES (o.id_turma), (n.id_turma)) t(id_turma)
+    JOIN Presenca p ON p.id_aluno = n.id_aluno
+    WHERE t.id_turma IS NOT NULL
+    ORDER BY 2, 3
+    ON CONFLICT (relatorio, chave, mes) DO UPDATE SET marcado_em = now();
+    RETURN NULL;
+END $$;
+
+-- Tabelas de transição não podem ser usadas em triggers de vários eventos
+CREATE TRIGGER presenca_inserida AFTER INSERT ON Presenca
+    REFERENCING NEW TABLE AS alteradas FOR EACH STATEMENT EXECUTE FUNCTION marcar_presenca_pendente();
+CREATE TRIGGER presenca_alterada AFTER UPDATE ON Presenca
+    REFERENCING OLD TABLE AS anteriores NEW TABLE AS alteradas FOR EACH STATEMENT EXECUTE FUNCTION marcar_presenca_pendente();
+CREATE TRIGGER presenca_removida AFTER DELETE ON Presenca
+    REFERENCING OLD TABLE AS alteradas FOR EACH STATEMENT EXECUTE FUNCTION marcar_presenca_pendente();
+
+CREATE TRIGGER pagamento_inserido AFTER INSERT ON Pagamento
+    REFERENCING NEW TABLE AS alteradas FOR EACH STATEMENT EXECUTE FUNCTION marcar_pagamento_pendente();
+CREATE TRIGGER pagamento_alterado AFTER UPDATE ON Pagamento
+    REFERENCING OLD TABLE AS anteriores NEW TABLE AS alteradas FOR EACH STATEMENT EXECUTE FUNCTION marcar_pagamento_pendente();
+CREATE TRIGGER pagamento_removido AFTER DELETE ON Pagamento
+    REFERENCING OLD TABLE AS alteradas FOR EACH STATEMENT EXECUTE FUNCTION marcar_pagamento_pendente();
+
+CREATE TRIGGER aluno_trocou_de_turma AFTER UPDATE ON Aluno
+    REFERENCING OLD TABLE AS anteriores NEW TABLE AS alteradas FOR EACH STATEMENT EXECUTE FUNCTION marcar_troca_de_turma();
+
+-- Todo o histórico existente entra como pendente; a primeira execução de
+-- relatorios.py calcula os resumos.
+INSERT INTO Periodo_Pendente (relatorio, chave, mes)
+SELECT DISTINCT 'presenca', a.id_turma, date_trunc('month', p.data_presenca)::date
+FROM Presenca p JOIN Aluno a ON a.id_aluno = p.id_aluno
+WHERE a.id_turma IS NOT NULL;
+
+INSERT INTO Periodo_Pendente (relatorio, chave, mes)
+SELECT DISTINCT 'pagamento', id_aluno, date_trunc('month', data_pagamento)::date
+FROM Pagamento;
@@ -0,0 +1,29 @@
+-- migrar: sem-transacao
+-- Busca de alunos por nome (GET /alunos/search), sem acentos e sem
+-- diferenciar maiúsculas.
+--
+-- normalizar_nome usa translate em vez da extensão unaccent: é IMMUTABLE,
+-- então pode ser usada em índices, e existe em qualquer Postgres. O corpo
+-- no padrão SQL (RETURN) é resolvido na criação, não pelo search_path de
+-- quem avalia o índice (o autovacuum roda com um search_path restrito).
+CREATE OR REPLACE FUNCTION normalizar_nome(texto TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+RETURN translate(lower(texto), 'áàâãäåéèêëíìîïóòôõöúùûüçñýÿ', 'aaaaaaeeeeiiiiooooouuuucnyy');
+
+-- Nome do aluno com peso A e do responsável com peso B
+CREATE OR REPLACE FUNCTION vetor_busca_aluno(nome TEXT, responsavel TEXT) RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+RETURN setweight(to_tsvector('simple', normalizar_nome(nome)), 'A')
+    || setweight(to_tsvector('simple', normalizar_nome(coalesce(responsavel, ''))), 'B');
+
+-- Autocompletar: nome começando com o texto digitado, em ordem de nome.
+-- COLLATE "C" faz a comparação byte a byte, o que permite buscar o prefixo
+-- por intervalo mesmo com parâmetros (comandos preparados).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aluno_nome_normalizado
+    ON Aluno ((normalizar_nome(nome_completo) COLLATE "C"), id_aluno);
+
+-- Palavras começando com cada termo, em qualquer posição do nome
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aluno_busca
+    ON Aluno USING gin (vetor_busca_aluno(nome_completo, nome_responsavel));
+
+-- A tolerância a erros de digitação (pg_trgm) fica na migração 0006
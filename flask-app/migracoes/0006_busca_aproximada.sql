@@ -0,0 +1,13 @@
+-- migrar: sem-transacao
+-- migrar: requer pg_trgm
+-- Tolerância a erros de digitação na busca de alunos (nível "aproximada"
+-- de GET /alunos/search). A imagem oficial do Postgres inclui o pg_trgm;
+-- onde ele não existir, esta migração fica pendente e a busca segue sem
+-- o nível aproximado.
+--
+-- A extensão é criada no schema padrão, que precisa estar no search_path
+-- para a classe de operadores gin_trgm_ops ser encontrada.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_aluno_nome_trigramas
+    ON Aluno USING gin (normalizar_nome(nome_completo) gin_trgm_ops);
@@ -0,0 +1,300 @@
+"""Aplica as migrações versionadas de flask-app/migracoes.
+
+Cada arquivo ``NNNN_descricao.sql`` é aplicado uma única vez, em ordem de
+versão, e registrado em ``schema_migracoes`` com o checksum do conteúdo. Se
+um arquivo já aplicado for alterado, nada é executado até que a divergência
+seja resolvida. Uma trava consultiva impede dois processos de migrarem o
+mesmo banco ao mesmo tempo.
+
+Migrações que começam com ``-- migrar: sem-transacao`` rodam comando a
+comando fora de transação, como exige ``CREATE INDEX CONCURRENTLY``; elas
+devem ser idempotentes (``IF NOT EXISTS``), porque uma falha no meio deixa
+os comandos anteriores aplicados. Índices inválidos deixados por uma
+tentativa anterior são removidos antes de serem recriados.
+
+Uma linha ``-- migrar: requer <extensão>`` no cabeçalho deixa a migração
+pendente, sem erro, enquanto a extensão não estiver disponível no servidor
+(``pg_available_extensions``); ela é aplicada na primeira execução depois
+que a extensão for instalada.
+
+O esquema base vem de init.sql; as migrações partem dele::
+
+    python migrar.py                      # aplica as pendentes
+    python migrar.py --status
+    python migrar.py --verificar-planos   # EXPLAIN nas consultas quentes
+"""
+import argparse
+import collections
+import hashlib
+import os
+import re
+import sys
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+DIRETORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migracoes')
+SEM_TRANSACAO = '-- migrar: sem-transacao'
+REQUER = re.compile(r'^-- migrar: requer (\w+)[ \t]*$', re.MULTILINE)
+CHAVE_TRAVA = 20030011  # pg_advisory_lock, exclusiva deste migrador
+
+CRIAR_HISTORICO = '''
+    CREATE TABLE IF NOT EXISTS schema_migracoes (
+        versao INT PRIMARY KEY,
+        nome VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        aplicada_em TIMESTAMP NOT NULL DEFAULT now(),
+        duracao_ms INT NOT NULL
+    )'''
+
+Migracao = collections.namedtuple('Migracao', 'versao nome checksum texto transacional requer')
+
+# Consultas quentes: buscas por aluno/professor e as verificações que o
+# Postgres faz nas tabelas filhas a cada DELETE FROM Aluno.
+CONSULTAS_QUENTES = [
+    ('aluno por id', 'SELECT * FROM Aluno WHERE id_aluno = %s', 'Aluno'),
+    ('alunos da turma', 'SELECT id_aluno, nome_completo FROM Aluno WHERE id_turma = %s', 'Aluno'),
+    ('presenças do aluno', 'SELECT data_presenca, presente FROM Presenca WHERE id_aluno = %s ORDER BY data_presenca', 'Presenca'),
+    ('pagamentos do aluno', 'SELECT data_pagamento, valor_pago, status FROM Pagamento WHERE id_aluno = %s ORDER BY data_pagamento', 'Pagamento'),
+    ('atividades do aluno', 'SELECT id_atividade FROM Atividade_Aluno WHERE id_aluno = %s', 'Atividade_Aluno'),
+    ('turmas do professor', 'SELECT id_turma, nome_turma FROM Turma WHERE id_professor = %s', 'Turma'),
+    ('exclusão de aluno: Presenca', 'SELECT 1 FROM ONLY Presenca x WHERE id_aluno = %s FOR KEY SHARE OF x', 'Presenca'),
+    ('exclusão de aluno: Pagamento', 'SELECT 1 FROM ONLY Pagamento x WHERE id_aluno = %s FOR KEY SHARE OF x', 'Pagamento'),
+    ('exclusão de aluno: Atividade_Aluno', 'SELECT 1 FROM ONLY Atividade_Aluno x WHERE id_aluno = %s FOR KEY SHARE OF x', 'Atividade_Aluno'),
+]
+
+
+class ErroMigracao(Exception):
+    """Migração inválida, divergente do histórico ou que falhou ao ser aplicada."""
+
+
+def carregar_migracoes(diretorio=DIRETORIO):
+    """Migrações do diretório, em ordem de versão."""
+    migracoes = {}
+    for arquivo in os.listdir(diretorio):
+        encontrado = re.fullmatch(r'(\d+)_(\w+)\.sql', arquivo)
+        if not encontrado:
+            continue
+        versao = int(encontrado.group(1))
+        if versao in migracoes:
+            raise ErroMigracao(f'Versão {versao} duplicada em {diretorio}')
+        with open(os.path.join(diretorio, arquivo), encoding='utf-8', newline='') as f:
+            # O checksum não depende do fim de linha do checkout
+            texto = f.read().replace('\r\n', '\n')
+        migracoes[versao] = Migracao(
+            versao=versao,
+            nome=encontrado.group(2),
+            checksum=hashlib.sha256(texto.encode('utf-8')).hexdigest(),
+            texto=texto,
+            transacional=not texto.lstrip().startswith(SEM_TRANSACAO),
+            requer=tuple(REQUER.findall(texto)),
+        )
+    return [migracoes[versao] for versao in sorted(migracoes)]
+
+
+def comandos(texto):
+    """Divide o texto de uma migração em comandos.
+
+    Um comando termina num ``;`` no fim da linha, exceto dentro de blocos
+    ``$$ ... $$`` (corpo de ``DO`` ou de funções).
+    """
+    resultado, atual, em_bloco = [], [], False
+    for linha in texto.split('\n'):
+        if not em_bloco and linha.lstrip().startswith('--'):
+            continue
+        atual.append(linha)
+        if linha.count('$$') % 2:
+            em_bloco = not em_bloco
+        if not em_bloco and re.search(r';[ \t]*$', linha):
+            resultado.append('\n'.join(atual).strip().rstrip(';').strip())
+            atual = []
+    if '\n'.join(atual).strip():
+        resultado.append('\n'.join(atual).strip())
+    return [comando for comando in resultado if comando]
+
+
+def historico(cur):
+    cur.execute('SELECT versao, nome, checksum, aplicada_em, duracao_ms FROM schema_migracoes ORDER BY versao')
+    return {linha[0]: linha for linha in cur.fetchall()}
+
+
+def extensoes_disponiveis(cur):
+    """Extensões que o servidor pode criar (instaladas ou não)."""
+    cur.execute('SELECT name FROM pg_available_extensions')
+    return {linha[0] for linha in cur.fetchall()}
+
+
+def _remover_indice_invalido(cur, comando):
+    encontrado = re.match(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)', comando, re.I)
+    if not encontrado:
+        return
+    cur.execute(
+        'SELECT indexrelid::regclass::text FROM pg_index WHERE indexrelid = to_regclass(%s) AND NOT indisvalid',
+        (encontrado.group(1),),
+    )
+    linha = cur.fetchone()
+    if linha:
+        cur.execute(sql.SQL('DROP INDEX CONCURRENTLY {}').format(sql.SQL(linha[0])))
+
+
+def _aplicar(conn, migracao):
+    inicio = time.perf_counter()
+    try:
+        if migracao.transacional:
+            conn.autocommit = False
+            with conn.cursor() as cur:
+                cur.execute(migracao.texto)
+        else:
+            with conn.cursor() as cur:
+                for comando in comandos(migracao.texto):
+                    _remover_indice_invalido(cur, comando)
+                    cur.execute(comando)
+        duracao_ms = int((time.perf_counter() - inicio) * 1000)
+        with conn.cursor() as cur:
+            cur.execute(
+                'INSERT INTO schema_migracoes (versao, nome, checksum, duracao_ms) VALUES (%s, %s, %s, %s)',
+                (migracao.versao, migracao.nome, migracao.checksum, duracao_ms),
+            )
+        if migracao.transacional:
+            conn.commit()
+    except psycopg2.Error as e:
+        if migracao.transacional:
+            conn.rollback()
+        raise ErroMigracao(f'Falha ao aplicar {migracao.versao:04d}_{migracao.nome}: {e}') from e
+    finally:
+        conn.autocommit = True
+    return duracao_ms
+
+
+def migrar(conn, diretorio=DIRETORIO, lock_timeout='5s', saida=print):
+    """Aplica as migrações pendentes e retorna as versões aplicadas.
+
+    ``lock_timeout`` limita quanto tempo cada comando espera por uma trava
+    de tabela, para que uma migração não fique enfileirada atrás de uma
+    transação longa segurando todas as requisições que chegarem depois.
+    """
+    migracoes = carregar_migracoes(diretorio)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute('SELECT pg_advisory_lock(%s)', (CHAVE_TRAVA,))
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SET lock_timeout = %s', (lock_timeout,))
+            cur.execute(CRIAR_HISTORICO)
+            aplicadas = historico(cur)
+            disponiveis = extensoes_disponiveis(cur)
+
+        divergentes = [
+            f'{m.versao:04d}_{m.nome}' for m in migracoes
+            if m.versao in aplicadas and aplicadas[m.versao][2] != m.checksum
+        ]
+        if divergentes:
+            raise ErroMigracao(f'Migrações alteradas depois de aplicadas: {", ".join(divergentes)}')
+
+        novas = []
+        for migracao in migracoes:
+            if migracao.versao in aplicadas:
+                continue
+            faltando = [extensao for extensao in migracao.requer if extensao not in disponiveis]
+            if faltando:
+                saida(f'{migracao.versao:04d}_{migracao.nome} pendente: requer {", ".join(faltando)}, indisponível no servidor')
+                continue
+            duracao_ms = _aplicar(conn, migracao)
+            saida(f'{migracao.versao:04d}_{migracao.nome} aplicada em {duracao_ms} ms')
+            novas.append(migracao.versao)
+        return novas
+    finally:
+        with conn.cursor() as cur:
+            cur.execute('SELECT pg_advisory_unlock(%s)', (CHAVE_TRAVA,))
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get('Plans', []):
+        yield from _nos(filho)
+
+
+def verificar_planos(conn, consultas=CONSULTAS_QUENTES, minimo_linhas=10000, parametro=1):
+    """Roda EXPLAIN em cada consulta quente.
+
+    Retorna uma lista de ``(nome, varreduras, conclusivo)``: ``varreduras`` são
+    as tabelas lidas por Seq Scan e ``conclusivo`` é falso quando a tabela
+    tem menos de ``minimo_linhas`` (estimadas), caso em que o planejador
+    prefere Seq Scan mesmo com índice e o resultado não indica problema.
+    """
+    resultado = []
+    with conn.cursor() as cur:
+        for nome, consulta, tabela in consultas:
+            cur.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', (tabela,))
+            linhas = cur.fetchone()[0]
+            cur.execute('EXPLAIN (FORMAT JSON) ' + consulta, (parametro,))
+            plano = cur.fetchone()[0][0]['Plan']
+            varreduras = [no['Relation Name'] for no in _nos(plano) if no['Node Type'] == 'Seq Scan']
+            resultado.append((nome, varreduras, linhas >= minimo_linhas))
+    conn.rollback()
+    return resultado
+
+
+def _conectar(dsn):
+    if dsn:
+        return psycopg2.connect(dsn)
+    from database import _connect
+    return _connect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='padrão: as variáveis DATABASE_* usadas pela API')
+    parser.add_argument('--status', action='store_true', help='lista aplicadas e pendentes, sem aplicar')
+    parser.add_argument('--verificar-planos', action='store_true',
+                        help='falha se alguma consulta quente usar Seq Scan')
+    parser.add_argument('--minimo-linhas', type=int, default=10000,
+                        help='tabelas menores que isso não reprovam a verificação de planos')
+    parser.add_argument('--lock-timeout', default=os.environ.get('MIGRAR_LOCK_TIMEOUT', '5s'))
+    args = parser.parse_args()
+
+    conn = _conectar(args.dsn)
+    try:
+        if args.status:
+            with conn.cursor() as cur:
+                cur.execute(CRIAR_HISTORICO)
+                aplicadas = historico(cur)
+                disponiveis = extensoes_disponiveis(cur)
+            conn.commit()
+            for migracao in carregar_migracoes():
+                linha = aplicadas.get(migracao.versao)
+                faltando = [extensao for extensao in migracao.requer if extensao not in disponiveis]
+                if linha is None:
+                    situacao = f'pendente (requer {", ".join(faltando)})' if faltando else 'pendente'
+                elif linha[2] != migracao.checksum:
+                    situacao = 'ALTERADA depois de aplicada'
+                else:
+                    situacao = f'aplicada em {linha[3]:%Y-%m-%d %H:%M} ({linha[4]} ms)'
+                print(f'{migracao.versao:04d}_{migracao.nome:<40} {situacao}')
+        elif args.verificar_planos:
+            falhou = False
+            for nome, varreduras, conclusivo in verificar_planos(conn, minimo_linhas=args.minimo_linhas):
+                if not varreduras:
+                    situacao = 'ok'
+                elif conclusivo:
+                    situacao = f'SEQ SCAN em {", ".join(varreduras)}'
+                    falhou = True
+                else:
+                    situacao = f'seq scan em {", ".join(varreduras)} (tabela pequena, inconclusivo)'
+                print(f'{nome:<40} {situacao}')
+            if falhou:
+                sys.exit(1)
+        else:
+            aplicadas = migrar(conn, lock_timeout=args.lock_timeout)
+            if not aplicadas:
+                print('Nenhuma migração aplicada.')
+    except ErroMigracao as e:
+        sys.exit(str(e))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Prepared statements do lado do servidor para as consultas quentes.
+
+Cada comando registrado é preparado (``PREPARE``) na primeira vez em que é
+usado numa conexão e daí em diante executado pelo nome (``EXECUTE``), sem
+que o Postgres precise analisar e planejar o SQL de novo a cada requisição.
+O registro de quais comandos já foram preparados é mantido por conexão;
+conexões novas do pool (inclusive as abertas depois de uma queda) começam
+vazias e preparam de novo.
+
+Com ``DB_PREPARED_STATEMENTS=0`` os comandos são executados como SQL comum,
+o que permite comparar as duas formas no benchmark.
+"""
+import os
+import re
+import threading
+import weakref
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+
+ATIVO = os.environ.get('DB_PREPARED_STATEMENTS', '1') != '0'
+
+
+class ComandosPreparados:
+    """Registro de comandos SQL preparados uma vez por conexão."""
+
+    def __init__(self, ativo=ATIVO):
+        self.ativo = ativo
+        self._comandos = {}                             # nome -> (sql original, sql do PREPARE)
+        self._nomes = {}                                # sql original -> nome
+        self._preparados = weakref.WeakKeyDictionary()  # conexão -> nomes já preparados nela
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def registrar(self, nome, consulta):
+        """Registra ``consulta`` (com marcadores ``%s``) sob ``nome`` e o devolve."""
+        if not re.fullmatch(r'[a-z_][a-z0-9_]*', nome):
+            raise ValueError(f'Nome de comando inválido: {nome!r}')
+        contador = iter(range(1, consulta.count('%s') + 1))
+        preparo = f'PREPARE {nome} AS ' + re.sub(r'%s', lambda _: f'${next(contador)}', consulta)
+        self._comandos[nome] = (consulta, preparo)
+        self._nomes[consulta] = nome
+        self._stats[nome] = {'executions': 0, 'prepares': 0, 'reprepares': 0}
+        return nome
+
+    def _marcar(self, nome, chave, quantidade=1):
+        with self._lock:
+            self._stats[nome][chave] += quantidade
+
+    def _preparar(self, cur, nome):
+        cur.execute(self._comandos[nome][1])
+        with self._lock:
+            self._preparados.setdefault(cur.connection, set()).add(nome)
+            self._stats[nome]['prepares'] += 1
+
+    def executar(self, cur, nome, params=()):
+        """Executa o comando ``nome`` em ``cur``, preparando-o se preciso."""
+        if not self.ativo:
+            cur.execute(self._comandos[nome][0], params)
+            self._marcar(nome, 'executions')
+            return
+
+        conn = cur.connection
+        with self._lock:
+            preparado = nome in self._preparados.get(conn, ())
+        if not preparado:
+            self._preparar(cur, nome)
+
+        comando = f'EXECUTE {nome}' + (' (' + ', '.join(['%s'] * len(params)) + ')' if params else '')
+        inicio_da_transacao = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            cur.execute(comando, params)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # A sessão perdeu os comandos preparados (DISCARD ALL de um pooler,
+            # por exemplo). Só dá para repetir se nada mais rodou na transação.
+            with self._lock:
+                self._preparados.pop(conn, None)
+            if not inicio_da_transacao:
+                raise
+            conn.rollback()
+            self._preparar(cur, nome)
+            self._marcar(nome, 'reprepares')
+            cur.execute(comando, params)
+        self._marcar(nome, 'executions')
+
+    def executar_sql(self, cur, consulta, params=None):
+        """Como ``cur.execute``; se ``consulta`` for o SQL de um comando registrado, executa o preparado.
+
+        É o ``executar`` do ``Repositorio`` do flask-app.
+        """
+        nome = self._nomes.get(consulta) if isinstance(consulta, str) else None
+        if nome is None:
+            cur.execute(consulta, params)
+        else:
+            self.executar(cur, nome, params or ())
+
+    def sql(self, nome):
+        """SQL original (com ``%s``) do comando ``nome``."""
+        return self._comandos[nome][0]
+
+    def esquecer(self, conn):
+        """Descarta o registro de ``conn`` (por exemplo, depois de um ``DEALLOCATE ALL``)."""
+        with self._lock:
+            self._preparados.pop(conn, None)
+
+    def stats(self):
+        """Contadores por comando: execuções, preparos e re-preparos."""
+        with self._lock:
+            return {nome: dict(valores) for nome, valores in self._stats.items()}
+
+
+comandos = ComandosPreparados()
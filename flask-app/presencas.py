@@ -0,0 +1,65 @@
+"""Chamada diária de uma turma: leitura do corpo e o upsert em um comando.
+
+A chamada inteira vira dois arrays (alunos e presenças) passados a
+``unnest``; um único ``INSERT ... ON CONFLICT`` grava todas as linhas,
+então reenviar a mesma chamada sobrescreve em vez de duplicar.
+"""
+import datetime
+
+# Maior turma aceita numa chamada
+CHAMADA_MAXIMA = 1000
+
+# Parâmetros: ids dos alunos, presenças, id da turma, data, id da turma.
+# Alunos fora da turma são ignorados e devolvidos em "fora_da_turma";
+# presenças iguais às gravadas não são reescritas.
+GRAVAR_CHAMADA = '''
+    WITH chamada AS (
+        SELECT * FROM unnest(%s::int[], %s::boolean[]) AS c(id_aluno, presente)
+    ), da_turma AS (
+        SELECT c.id_aluno, c.presente
+        FROM chamada c JOIN Aluno a ON a.id_aluno = c.id_aluno AND a.id_turma = %s
+    ), gravadas AS (
+        INSERT INTO Presenca (id_aluno, data_presenca, presente)
+        SELECT id_aluno, %s::date, presente FROM da_turma ORDER BY id_aluno
+        ON CONFLICT (id_aluno, data_presenca) DO UPDATE SET presente = EXCLUDED.presente
+        WHERE Presenca.presente IS DISTINCT FROM EXCLUDED.presente
+        RETURNING xmax = 0 AS inserida
+    )
+    SELECT EXISTS (SELECT 1 FROM Turma WHERE id_turma = %s),
+           (SELECT count(*) FROM gravadas WHERE inserida),
+           (SELECT count(*) FROM gravadas WHERE NOT inserida),
+           (SELECT count(*) FROM da_turma),
+           ARRAY(SELECT id_aluno FROM chamada EXCEPT SELECT id_aluno FROM da_turma ORDER BY 1)'''
+
+
+class ErroChamada(ValueError):
+    """Corpo da chamada inválido."""
+
+
+def ler_data(texto):
+    try:
+        return datetime.date.fromisoformat(texto)
+    except ValueError:
+        raise ErroChamada('A data deve estar no formato AAAA-MM-DD')
+
+
+def ler_chamada(dados):
+    """Converte ``{"presencas": {"<id_aluno>": true|false}}`` em ``(ids, presencas)``.
+
+    Os ids saem em ordem crescente, para que chamadas simultâneas travem as
+    linhas sempre na mesma ordem.
+    """
+    presencas = dados.get('presencas') if isinstance(dados, dict) else None
+    if not isinstance(presencas, dict) or not presencas:
+        raise ErroChamada('O campo "presencas" deve mapear o id de cada aluno para true (presente) ou false (ausente)')
+    if len(presencas) > CHAMADA_MAXIMA:
+        raise ErroChamada(f'A chamada aceita no máximo {CHAMADA_MAXIMA} alunos')
+    chamada = {}
+    for chave, presente in presencas.items():
+        if not str(chave).isdigit():
+            raise ErroChamada(f'Id de aluno inválido: {chave}')
+        if not isinstance(presente, bool):
+            raise ErroChamada(f'A presença do aluno {chave} deve ser true ou false')
+        chamada[int(chave)] = presente
+    ids = sorted(chamada)
+    return ids, [chamada[id_aluno] for id_aluno in ids]
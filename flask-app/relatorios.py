@@ -0,0 +1,162 @@
+"""Atualização incremental dos resumos de frequência e de pagamentos.
+
+Os triggers da migração 0004 marcam em ``Periodo_Pendente`` cada período
+afetado por escritas em Presenca, Pagamento ou na turma de um aluno. Aqui
+esses períodos são consumidos em lotes e só eles são recalculados; o resto
+dos resumos não é tocado, então o custo depende do que mudou e não do
+tamanho do histórico.
+
+Para rodar continuamente (por exemplo, ao lado da API)::
+
+    python relatorios.py --intervalo 30
+"""
+import argparse
+import datetime
+import time
+
+from consultas import ParametroInvalido
+
+# Por relatório: remove os resumos dos períodos pendentes e recalcula-os.
+# Parâmetros de ambos: arrays de chaves e de meses.
+RECALCULO = {
+    'presenca': (
+        '''DELETE FROM Resumo_Presenca_Turma r
+           USING unnest(%s::int[], %s::date[]) p(chave, mes)
+           WHERE r.mes = p.mes AND r.id_turma = p.chave''',
+        '''INSERT INTO Resumo_Presenca_Turma (mes, id_turma, dias_letivos, registros, presencas)
+           SELECT p.mes, p.chave, count(DISTINCT pr.data_presenca), count(*), count(*) FILTER (WHERE pr.presente)
+           FROM unnest(%s::int[], %s::date[]) p(chave, mes)
+           JOIN Aluno a ON a.id_turma = p.chave
+           JOIN Presenca pr ON pr.id_aluno = a.id_aluno
+                           AND pr.data_presenca >= p.mes AND pr.data_presenca < p.mes + interval '1 month'
+           GROUP BY p.mes, p.chave''',
+    ),
+    'pagamento': (
+        '''DELETE FROM Resumo_Pagamento_Aluno r
+           USING unnest(%s::int[], %s::date[]) p(chave, mes)
+           WHERE r.mes = p.mes AND r.id_aluno = p.chave''',
+        '''INSERT INTO Resumo_Pagamento_Aluno (mes, id_aluno, pagamentos, valor_total, valor_pendente)
+           SELECT p.mes, p.chave, count(*), sum(pg.valor_pago),
+                  coalesce(sum(pg.valor_pago) FILTER (WHERE pg.status = 'pendente'), 0)
+           FROM unnest(%s::int[], %s::date[]) p(chave, mes)
+           JOIN Pagamento pg ON pg.id_aluno = p.chave
+                            AND pg.data_pagamento >= p.mes AND pg.data_pagamento < p.mes + interval '1 month'
+           GROUP BY p.mes, p.chave''',
+    ),
+}
+
+# Marcações travadas por uma escrita ainda não confirmada ficam para a
+# próxima rodada (SKIP LOCKED) em vez de bloquear a atualização.
+CONSUMIR_PENDENTES = '''
+    DELETE FROM Periodo_Pendente
+    WHERE (relatorio, chave, mes) IN (
+        SELECT relatorio, chave, mes FROM Periodo_Pendente
+        WHERE relatorio = %s
+        ORDER BY mes, chave
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING chave, mes'''
+
+REGISTRAR_EXECUCAO = '''
+    INSERT INTO Relatorio_Atualizacao (relatorio, executado_em) VALUES (%s, now())
+    ON CONFLICT (relatorio) DO UPDATE SET executado_em = EXCLUDED.executado_em'''
+
+# Leitura dos relatórios: só as tabelas de resumo, nunca Presenca/Pagamento.
+FREQUENCIA_TURMAS = '''
+    SELECT r.id_turma, t.nome_turma, r.dias_letivos, r.registros, r.presencas,
+           round(r.presencas::numeric / nullif(r.registros, 0), 4) AS taxa_presenca
+    FROM Resumo_Presenca_Turma r JOIN Turma t ON t.id_turma = r.id_turma
+    WHERE r.mes = %(mes)s AND (%(id_turma)s::int IS NULL OR r.id_turma = %(id_turma)s)
+    ORDER BY r.id_turma'''
+
+# Keyset por id_aluno; pede um registro a mais para saber se há próxima página.
+PAGAMENTOS_ALUNOS = '''
+    SELECT r.id_aluno, a.nome_completo, a.id_turma, r.pagamentos, r.valor_total, r.valor_pendente
+    FROM Resumo_Pagamento_Aluno r JOIN Aluno a ON a.id_aluno = r.id_aluno
+    WHERE r.mes = %(mes)s AND r.id_aluno > %(after)s
+      AND (%(id_aluno)s::int IS NULL OR r.id_aluno = %(id_aluno)s)
+      AND (%(id_turma)s::int IS NULL OR a.id_turma = %(id_turma)s)
+    ORDER BY r.id_aluno
+    LIMIT %(limit)s'''
+
+FRESCOR = '''
+    SELECT (SELECT executado_em FROM Relatorio_Atualizacao WHERE relatorio = %(relatorio)s),
+           (SELECT count(*) FROM Periodo_Pendente
+            WHERE relatorio = %(relatorio)s AND mes = %(mes)s
+              AND (%(chave)s::int IS NULL OR chave = %(chave)s))'''
+
+
+def atualizar_resumos(conn, lote=500, relatorios=tuple(RECALCULO)):
+    """Recalcula os períodos pendentes, ``lote`` por transação.
+
+    Retorna ``{relatorio: períodos recalculados}``.
+    """
+    processados = {}
+    for relatorio in relatorios:
+        remover, inserir = RECALCULO[relatorio]
+        processados[relatorio] = 0
+        while True:
+            with conn.cursor() as cur:
+                cur.execute(CONSUMIR_PENDENTES, (relatorio, lote))
+                pendentes = cur.fetchall()
+                if pendentes:
+                    chaves = [chave for chave, _ in pendentes]
+                    meses = [mes for _, mes in pendentes]
+                    cur.execute(remover, (chaves, meses))
+                    cur.execute(inserir, (chaves, meses))
+                cur.execute(REGISTRAR_EXECUCAO, (relatorio,))
+            conn.commit()
+            processados[relatorio] += len(pendentes)
+            if len(pendentes) < lote:
+                break
+    return processados
+
+
+def frescor(cur, relatorio, mes, chave=None):
+    """Metadados de atualização para a resposta de um relatório."""
+    cur.execute(FRESCOR, {'relatorio': relatorio, 'mes': mes, 'chave': chave})
+    executado_em, pendentes = cur.fetchone()
+    return {
+        'ultima_atualizacao': executado_em,
+        'periodos_pendentes': pendentes,
+        'atualizado': executado_em is not None and pendentes == 0,
+    }
+
+
+def ler_mes(texto):
+    """``AAAA-MM`` para o primeiro dia do mês; vazio é o mês atual."""
+    if not texto:
+        return datetime.date.today().replace(day=1)
+    try:
+        return datetime.datetime.strptime(texto, '%Y-%m').date()
+    except ValueError:
+        raise ParametroInvalido('O parâmetro "mes" deve estar no formato AAAA-MM')
+
+
+def main():
+    from database import _connect
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--intervalo', type=float, default=0,
+                        help='segundos entre rodadas (0: roda uma vez e sai)')
+    parser.add_argument('--lote', type=int, default=500, help='períodos recalculados por transação')
+    args = parser.parse_args()
+
+    conn = _connect()
+    try:
+        while True:
+            inicio = time.perf_counter()
+            processados = atualizar_resumos(conn, args.lote)
+            print(f"{datetime.datetime.now():%H:%M:%S} "
+                  + ', '.join(f'{relatorio}: {n} períodos' for relatorio, n in processados.items())
+                  + f' em {time.perf_counter() - inicio:.2f}s', flush=True)
+            if not args.intervalo:
+                break
+            time.sleep(args.intervalo)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Caminho rápido de linhas do banco para JSON.
+
+Os handlers de leitura montam o JSON direto das tuplas do cursor e dos nomes
+em ``cursor.description``, sem ``DictCursor`` nem ``jsonify`` e sem um
+``dict`` por linha: cada valor é serializado sozinho e encaixado num molde
+de bytes com as chaves já prontas. Datas saem em
+ISO 8601 (``2010-05-15``) e ``DECIMAL`` como número. Se o ``orjson`` estiver
+instalado ele é usado; caso contrário, cai no ``json`` da biblioteca padrão.
+
+Com ``SERIALIZACAO_JSON=banco`` o próprio Postgres monta o JSON
+(``row_to_json``) e a aplicação só repassa o texto. A listagem completa de
+alunos, transmitida em blocos, faz isso sempre.
+"""
+import datetime
+import decimal
+import functools
+import json
+import os
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # backend opcional
+    orjson = None
+
+NO_BANCO = os.environ.get('SERIALIZACAO_JSON', 'app') == 'banco'
+
+
+def _padrao(valor):
+    if isinstance(valor, (datetime.date, datetime.datetime, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, decimal.Decimal):
+        return float(valor)
+    raise TypeError(f'Tipo não serializável em JSON: {type(valor).__name__}')
+
+
+if orjson is not None:
+    def dumps(obj):
+        """Serializa ``obj`` em bytes UTF-8."""
+        return orjson.dumps(obj, default=_padrao)
+else:
+    _encoder = json.JSONEncoder(default=_padrao, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(obj):
+        """Serializa ``obj`` em bytes UTF-8."""
+        return _encoder.encode(obj).encode('utf-8')
+
+
+def colunas(cursor):
+    """Nomes das colunas do último resultado de ``cursor``."""
+    return [coluna[0] for coluna in cursor.description]
+
+
+@functools.lru_cache(maxsize=256)
+def _molde(nomes):
+    # b'{"id":%b,"nome":%b}': uma linha é um único "molde % valores"
+    return b'{' + b','.join(dumps(nome).replace(b'%', b'%%') + b':%b' for nome in nomes) + b'}'
+
+
+def linhas_json(nomes, linhas):
+    """Array JSON de objetos ``{nome: valor}`` a partir das tuplas ``linhas``."""
+    molde = _molde(tuple(nomes))
+    return b'[' + b','.join([molde % tuple(map(dumps, linha)) for linha in linhas]) + b']'
+
+
+def linha_json(nomes, linha):
+    return _molde(tuple(nomes)) % tuple(map(dumps, linha))
+
+
+def objeto_json(campos, **serializados):
+    """Objeto JSON com ``campos`` e membros já serializados (de ``linhas_json``, ``linha_json``)."""
+    membros = [dumps(nome) + b':' + dumps(valor) for nome, valor in campos.items()]
+    membros += [dumps(nome) + b':' + corpo for nome, corpo in serializados.items()]
+    return b'{' + b','.join(membros) + b'}'
+
+
+def resposta_json(corpo, status=200):
+    return Response(corpo, status=status, mimetype='application/json')
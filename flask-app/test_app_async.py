@@ -0,0 +1,18 @@
+import pytest
+
+from consultas import ConsultaAlunos, codificar_cursor
+
+app_async = pytest.importorskip('app_async')   # só com requirements-async.txt
+
+
+def test_listagem_com_cursor_e_marcadores_do_asyncpg():
+    consulta = ConsultaAlunos({'order_by': '-data_nascimento', 'fields': 'nome_completo',
+                               'cursor': codificar_cursor('-data_nascimento', '2015-03-01', 42)})
+    texto, params = app_async._sql_listagem(consulta, 11)
+    assert texto == ('SELECT id_aluno, data_nascimento, nome_completo FROM Aluno '
+                     'WHERE (data_nascimento, id_aluno) < ($1::text::date, $2) '
+                     'ORDER BY data_nascimento DESC, id_aluno DESC LIMIT $3')
+    assert params == ['2015-03-01', 42, 11]
+
+    texto, params = app_async._sql_listagem(ConsultaAlunos({'after': '7'}))
+    assert texto.endswith('FROM Aluno WHERE id_aluno > $1 ORDER BY id_aluno') and params == [7]
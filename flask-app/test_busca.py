@@ -0,0 +1,51 @@
+import pytest
+
+from busca import BUSCAR_ALUNOS, TEXTO_MAXIMO, ler_busca, parametros_busca
+from consultas import ParametroInvalido
+
+# Dados do schema temporário de "banco" (conftest.py), já com as migrações
+DADOS_TESTE = '''
+    INSERT INTO Aluno (nome_completo, data_nascimento, nome_responsavel)
+        SELECT md5(g::text), date '2019-01-01', md5((-g)::text) FROM generate_series(1, 50000) g;
+    INSERT INTO Aluno (nome_completo, data_nascimento, nome_responsavel) VALUES
+        ('Joana Conceição', '2019-01-01', 'Márcia Conceição'),
+        ('João Araújo', '2019-01-01', 'Pedro Araújo'),
+        ('Ana Joaquina Souza', '2019-01-01', NULL),
+        ('Lucas Pereira', '2019-01-01', 'Joana Pereira');'''
+MIGRAR_TESTE = True
+
+
+def test_termos_viram_prefixos():
+    assert ler_busca('  João   da  Sil ') == ('João da Sil', 'João:* & da:* & Sil:*')
+
+
+@pytest.mark.parametrize('texto', [None, '', '   ', "'&|!:*", 'x' * (TEXTO_MAXIMO + 1)])
+def test_busca_invalida(texto):
+    with pytest.raises(ParametroInvalido):
+        ler_busca(texto)
+
+
+def _buscar(banco, texto, limit=10):
+    with banco.cursor() as cur:
+        cur.execute(BUSCAR_ALUNOS, parametros_busca(*ler_busca(texto), limit))
+        return [(nome, correspondencia) for _, nome, _, _, correspondencia in cur.fetchall()]
+
+
+def test_prefixo_antes_das_palavras_e_sem_acentos(banco):
+    assert _buscar(banco, 'JOA') == [
+        ('Joana Conceição', 'prefixo'),
+        ('João Araújo', 'prefixo'),
+        ('Ana Joaquina Souza', 'palavras'),   # nome do aluno pesa mais que o do responsável
+        ('Lucas Pereira', 'palavras'),
+    ]
+    assert _buscar(banco, 'conceicao') == [('Joana Conceição', 'palavras')]
+    assert _buscar(banco, 'araujo jo') == [('João Araújo', 'palavras')]
+    assert _buscar(banco, 'joa', limit=2) == [('Joana Conceição', 'prefixo'), ('João Araújo', 'prefixo')]
+
+
+def test_busca_usa_indices(banco):
+    with banco.cursor() as cur:
+        cur.execute('EXPLAIN ' + BUSCAR_ALUNOS, parametros_busca(*ler_busca('jo'), 10))
+        plano = '\n'.join(linha for linha, in cur.fetchall())
+    assert 'idx_aluno_nome_normalizado' in plano and 'idx_aluno_busca' in plano
+    assert 'Seq Scan' not in plano
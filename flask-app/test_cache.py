@@ -0,0 +1,64 @@
+import time
+
+from cache import LRUCache, ReadThroughCache, SemCache, criar_backend
+
+
+def test_descarta_o_menos_usado_recentemente():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_item_expira_depois_do_ttl():
+    cache = LRUCache(maxsize=10, ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1
+    assert stats['size'] == 0
+
+
+def test_read_through_carrega_uma_vez():
+    chamadas = []
+    cache = ReadThroughCache(LRUCache(), prefixo='aluno:')
+
+    def carregar():
+        chamadas.append(1)
+        return {'id_aluno': 1}
+
+    assert cache.obter(1, carregar) == ({'id_aluno': 1}, False)
+    assert cache.obter(1, carregar) == ({'id_aluno': 1}, True)
+    assert len(chamadas) == 1
+
+
+def test_nao_guarda_registro_inexistente():
+    cache = ReadThroughCache(LRUCache())
+    assert cache.obter(1, lambda: None) == (None, False)
+    assert cache.stats()['size'] == 0
+
+
+def test_invalidacao_durante_a_leitura_nao_recoloca_valor_velho():
+    cache = ReadThroughCache(LRUCache())
+
+    def carregar_e_sofrer_escrita():
+        cache.invalidar(1)  # uma escrita concorrente termina enquanto lemos
+        return {'versao': 'antiga'}
+
+    cache.obter(1, carregar_e_sofrer_escrita)
+    assert cache.obter(1, lambda: {'versao': 'nova'}) == ({'versao': 'nova'}, False)
+
+
+def test_sem_cache_sempre_vai_ao_carregador(monkeypatch):
+    monkeypatch.setenv('CACHE_BACKEND', 'nenhum')
+    backend = criar_backend()
+    assert isinstance(backend, SemCache)
+    cache = ReadThroughCache(backend)
+    assert cache.obter(1, lambda: {'id_aluno': 1}) == ({'id_aluno': 1}, False)
+    assert cache.obter(1, lambda: {'id_aluno': 1}) == ({'id_aluno': 1}, False)
+    assert cache.stats()['misses'] == 2 and cache.stats()['size'] == 0
@@ -0,0 +1,89 @@
+import psycopg2
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from consultas import ConsultaAlunos, ParametroInvalido, atualizacao_parcial, codificar_cursor, decodificar_cursor
+
+# Dados do schema temporário de "banco" (conftest.py)
+DADOS_TESTE = '''
+    INSERT INTO Turma (nome_turma) SELECT 'Turma ' || g FROM generate_series(1, 2000) g;
+    INSERT INTO Aluno (nome_completo, data_nascimento, id_turma)
+        SELECT md5(g::text), date '2017-01-01' + (g % 2190), 1 + (g % 2000) FROM generate_series(1, 50000) g;'''
+
+
+def consulta(**args):
+    return ConsultaAlunos(MultiDict(args))
+
+
+def test_campos_obrigatorios_vem_primeiro():
+    c = consulta(fields='email_responsavel,data_nascimento', order_by='data_nascimento')
+    assert c.campos == ['id_aluno', 'data_nascimento', 'email_responsavel']
+
+
+@pytest.mark.parametrize('args', [
+    {'fields': 'id_aluno,senha'},
+    {'order_by': 'id_turma'},
+    {'order_by': 'nome_completo', 'after': '10'},
+    {'id_turma': '1,x'},
+    {'data_nascimento_min': '15/05/2010'},
+    {'cursor': 'nao-e-um-cursor'},
+    {'order_by': 'nome_completo', 'cursor': codificar_cursor('-nome_completo', 'Maria', 5000)},
+    {'order_by': 'data_nascimento', 'cursor': codificar_cursor('nome_completo', 'Maria', 5000)},
+])
+def test_parametros_invalidos(args):
+    with pytest.raises(ParametroInvalido):
+        consulta(**args)
+
+
+def test_cursor_ida_e_volta():
+    import datetime
+    token = codificar_cursor('-data_nascimento', datetime.date(2019, 3, 1), 42)
+    assert decodificar_cursor(token, '-data_nascimento') == ('2019-03-01', 42)
+    with pytest.raises(ParametroInvalido, match='order_by=-data_nascimento'):
+        decodificar_cursor(token, 'data_nascimento')
+
+
+def test_proxima_pagina_por_ordem():
+    assert consulta().proxima_pagina((7, 'Ana')) == {'after': 7}
+    c = consulta(order_by='-nome_completo')
+    assert decodificar_cursor(c.proxima_pagina((7, 'Ana', None))['cursor'], '-nome_completo') == ('Ana', 7)
+
+
+def test_atualizacao_parcial_so_das_colunas_enviadas():
+    consulta, params = atualizacao_parcial(7, {'id_turma': 3, 'nome_completo': 'Ana'})
+    # Colunas na ordem de COLUNAS_ALUNO: valores do SET, id, valores da comparação, id
+    assert params == ['Ana', 3, 7, 'Ana', 3, 7]
+    assert atualizacao_parcial(8, {'nome_completo': 'Bia', 'id_turma': 1})[0] is consulta
+
+
+# As verificações de plano abaixo usam o Postgres de teste (ver conftest.py).
+
+COMBINACOES = [
+    {},
+    {'after': '25000'},
+    {'id_turma': '17'},
+    {'id_turma': '17,42', 'after': '1000'},
+    {'data_nascimento_min': '2019-03-01', 'data_nascimento_max': '2019-03-07'},
+    {'id_turma': '17', 'data_nascimento_min': '2019-01-01', 'data_nascimento_max': '2019-12-31'},
+    {'order_by': 'data_nascimento'},
+    {'order_by': '-data_nascimento', 'data_nascimento_max': '2019-06-30'},
+    {'order_by': 'nome_completo', 'fields': 'nome_completo'},
+    {'order_by': '-nome_completo', 'cursor': codificar_cursor('-nome_completo', 'Maria', 5000)},
+]
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get('Plans', []):
+        yield from _nos(filho)
+
+
+@pytest.mark.parametrize('json_no_banco', [False, True])
+@pytest.mark.parametrize('args', COMBINACOES, ids=lambda args: '&'.join(f'{k}={v}' for k, v in args.items()) or 'padrao')
+def test_paginas_usam_indice(banco, args, json_no_banco):
+    query, params = consulta(**args).sql(limit=101, json_no_banco=json_no_banco)
+    with banco.cursor() as cur:
+        cur.execute(psycopg2.sql.SQL('EXPLAIN (FORMAT JSON) ') + query, params)
+        plano = cur.fetchone()[0][0]['Plan']
+    varreduras = [no['Node Type'] for no in _nos(plano) if no.get('Relation Name') == 'aluno']
+    assert varreduras and 'Seq Scan' not in varreduras, varreduras
@@ -0,0 +1,112 @@
+import datetime
+import json
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+import consultas_lentas
+import database
+from consultas_lentas import CursorMonitorado, MonitorConsultas, impressao, redigir_parametros, redigir_sql
+
+
+def test_redige_parametros_e_literais():
+    assert redigir_parametros(('Ana Souza', 7, None, [1, 2, 3], datetime.date(2024, 3, 1))) == \
+        ['str(9)', 'int', None, 'list(3)', 'date']
+    assert redigir_parametros({'mes': datetime.date(2024, 3, 1)}) == {'mes': 'date'}
+    assert redigir_sql("WHERE nome = 'D''Ávila' AND id = 3") == "WHERE nome = '?' AND id = 3"
+
+
+def test_impressao_ignora_literais_e_espacos():
+    assert impressao("SELECT * FROM Aluno WHERE id_aluno = 1") == impressao("SELECT *  FROM Aluno\n WHERE id_aluno = 2")
+    assert impressao("SELECT 1 FROM Aluno") != impressao("SELECT 1 FROM Turma")
+
+
+def test_registra_lentas_e_amostra_o_resto():
+    registros, sorteios = [], iter([0.5, 0.05])
+    monitor = MonitorConsultas(limite_ms=100, amostra=0.1, explain_ms=10_000,
+                               sorteio=lambda: next(sorteios), registrar=registros.append)
+    monitor.observar('SELECT * FROM Aluno WHERE nome_completo = %s', ('Ana',), 0.25, 1)
+    monitor.observar('SELECT 1', None, 0.001, 1)     # sorteio 0.5: fora da amostra
+    monitor.observar('SELECT 2', None, 0.001, 1)     # sorteio 0.05: amostrado
+    eventos = [json.loads(registro) for registro in registros]
+    assert [evento['evento'] for evento in eventos] == ['consulta_lenta', 'consulta_amostrada']
+    assert eventos[0]['parametros'] == ['str(3)'] and eventos[0]['duracao_ms'] == 250.0
+    assert monitor.stats()['slow'] == 1 and monitor.stats()['sampled'] == 1
+
+
+def test_so_explica_consultas_sem_escrita():
+    monitor = MonitorConsultas(registrar=lambda _: None)
+    monitor._thread = False     # nada de thread: só olha a fila
+    monitor._agendar_explain('a', '(SELECT 1) UNION ALL (SELECT 2)', None)
+    monitor._agendar_explain('b', 'WITH x AS (DELETE FROM Aluno RETURNING *) SELECT * FROM x', None)
+    monitor._agendar_explain('c', 'UPDATE Aluno SET nome_completo = %s', ('x',))
+    monitor._agendar_explain('a', '(SELECT 1) UNION ALL (SELECT 2)', None)     # dentro do intervalo
+    assert monitor._fila.qsize() == 1
+
+
+# Os testes abaixo usam o Postgres de teste ("dsn", ver conftest.py)
+
+def test_captura_plano_da_consulta_lenta_em_segundo_plano(dsn, monkeypatch):
+    registros = []
+    monitor = MonitorConsultas(limite_ms=20, explain_ms=20, registrar=registros.append)
+    monkeypatch.setattr(consultas_lentas, 'monitor', monitor)
+    monkeypatch.setattr(database, '_connect', lambda **opcoes: psycopg2.connect(dsn, **opcoes))
+
+    conn = psycopg2.connect(dsn, cursor_factory=CursorMonitorado)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT pg_sleep(0.05), %s::text AS responsavel', ('Maria Segredo',))
+            cur.execute('SELECT 1')
+    finally:
+        conn.close()
+
+    limite = time.monotonic() + 10
+    while not monitor.recentes()['planos'] and time.monotonic() < limite:
+        time.sleep(0.05)
+    (plano,) = monitor.recentes()['planos'].values()
+    assert 'actual time' in plano
+    assert monitor.stats()['slow'] == 1
+    assert not any('Segredo' in registro for registro in registros)
+
+
+def test_cursor_com_nome_mede_as_buscas(dsn, monkeypatch):
+    registros = []
+    monitor = MonitorConsultas(limite_ms=20, explain_ms=10_000, registrar=registros.append)
+    monkeypatch.setattr(consultas_lentas, 'monitor', monitor)
+
+    conn = psycopg2.connect(dsn, cursor_factory=CursorMonitorado)
+    try:
+        with conn.cursor(name='lento') as cur:
+            cur.itersize = 2
+            # O DECLARE volta na hora; o pg_sleep roda a cada linha buscada
+            cur.execute('SELECT g, pg_sleep(0.01) FROM generate_series(1, 5) g')
+            assert not registros
+            assert [linha[0] for linha in cur] == [1, 2, 3, 4, 5]
+    finally:
+        conn.close()
+
+    (evento,) = [json.loads(registro) for registro in registros]
+    assert evento['linhas'] == 5 and evento['duracao_ms'] >= 50
+
+
+def test_consulta_composta_e_amostrada_como_texto(dsn, monkeypatch):
+    registros = []
+    monitor = MonitorConsultas(limite_ms=10_000, amostra=1.0, registrar=registros.append)
+    monkeypatch.setattr(consultas_lentas, 'monitor', monitor)
+
+    consulta = sql.SQL('SELECT {} FROM generate_series(1, %s) g').format(sql.Identifier('g'))
+    conn = psycopg2.connect(dsn, cursor_factory=CursorMonitorado)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(consulta, (3,))
+            assert len(cur.fetchall()) == 3
+        with conn.cursor(name='composta') as cur:
+            cur.execute(consulta, (2,))
+            assert len(cur.fetchall()) == 2
+    finally:
+        conn.close()
+
+    eventos = [json.loads(registro) for registro in registros]
+    assert [evento['sql'] for evento in eventos] == ['SELECT "g" FROM generate_series(1, %s) g'] * 2
+    assert monitor.stats()['sampled'] == 2
@@ -0,0 +1,346 @@
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+import database
+from database import AdmissionControl, AdmissionRejected, ConnectionPool, PoolTimeoutError, ReadRouter, Replica, parse_lsn
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        self.conn.queries += 1
+
+    def fetchone(self):
+        return self.conn.server.status
+
+
+class FakeServer:
+    """Servidor de mentira: ``status`` é a linha de ``REPLICA_STATUS`` (atraso, LSN aplicado)."""
+
+    def __init__(self, lag=0, replay_lsn='0/100'):
+        self.status = (lag, replay_lsn)
+        self.down = False
+
+    def connect(self):
+        if self.down:
+            raise psycopg2.OperationalError('connection refused')
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, server=None):
+        self.server = server
+        self.queries = 0
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def test_reutiliza_conexao_devolvida():
+    pool = ConnectionPool(FakeConnection, minconn=1, maxconn=2)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()['created'] == 1
+
+
+def test_desfaz_transacao_pendente_ao_devolver():
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=1)
+    conn = pool.getconn()
+    conn.status = psycopg2.extensions.TRANSACTION_STATUS_INERROR
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+
+def test_timeout_quando_pool_esgotado():
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=1, timeout=0.05)
+    pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_espera_conexao_liberada_por_outra_thread():
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=1, timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    assert pool.getconn() is conn
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['wait_time_max'] > 0
+
+
+def test_descarta_conexao_que_falha_na_validacao():
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=1, validate_after=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+    nova = pool.getconn()
+    assert nova is not conn
+    assert conn.closed
+    assert pool.stats()['discarded'] == 1
+
+
+def test_nunca_excede_o_tamanho_maximo():
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=3, timeout=0.05)
+    conns = [pool.getconn() for _ in range(3)]
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    assert pool.stats()['in_use'] == 3
+    for conn in conns:
+        pool.putconn(conn)
+    assert pool.stats()['idle'] == 3
+
+
+def test_contadores_exatos_com_varias_threads():
+    pool = ConnectionPool(FakeConnection, minconn=0, maxconn=4, timeout=5, validate_after=0)
+
+    def usar():
+        for _ in range(200):
+            conn = pool.getconn()
+            conn.broken = True      # falha na validação: a próxima retirada cria outra
+            pool.putconn(conn)
+
+    threads = [threading.Thread(target=usar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = pool.stats()
+    assert stats['checkouts'] == 1600
+    assert stats['created'] == stats['discarded'] + stats['idle']
+
+
+def test_admissao_enfileira_e_recusa_com_fila_cheia():
+    admissao = AdmissionControl(limit=1, max_queue=1, timeout=2, retry_after=3)
+    admissao.acquire()
+    na_fila = threading.Thread(target=admissao.acquire)
+    na_fila.start()
+    while admissao.stats()['waiting'] < 1:
+        time.sleep(0.001)
+    with pytest.raises(AdmissionRejected) as recusa:
+        admissao.acquire()
+    assert recusa.value.retry_after == 3
+
+    admissao.release()
+    na_fila.join(1)
+    stats = admissao.stats()
+    assert stats['in_flight'] == 1 and stats['queued'] == 1 and stats['shed_queue_full'] == 1
+
+
+def test_admissao_recusa_quando_a_espera_esgota():
+    admissao = AdmissionControl(limit=1, max_queue=5, timeout=0.05)
+    admissao.acquire()
+    inicio = time.monotonic()
+    with pytest.raises(AdmissionRejected):
+        admissao.acquire()
+    assert time.monotonic() - inicio < 1
+    admissao.release()
+    admissao.acquire()
+    assert admissao.stats()['shed_timeout'] == 1 and admissao.stats()['admitted'] == 2
+
+
+def test_conexao_que_falha_libera_a_vaga(monkeypatch):
+    def recusar(**_):
+        raise psycopg2.OperationalError('connection refused')
+
+    monkeypatch.setattr(database, '_connect', recusar)
+    monkeypatch.setattr(database, '_pool', None)
+    monkeypatch.setattr(database, '_admission', AdmissionControl(limit=1, max_queue=0))
+    assert database.get_db_connection() is None
+    assert database.get_db_connection() is None
+    assert database.admission_stats()['in_flight'] == 0
+
+
+def test_pool_esgotado_recusa_como_sobrecarga(monkeypatch):
+    monkeypatch.setattr(database, '_pool', ConnectionPool(FakeConnection, minconn=0, maxconn=1, timeout=0.05))
+    monkeypatch.setattr(database, '_admission', AdmissionControl(limit=5, retry_after=2))
+    ocupada = database.get_db_connection()
+    with pytest.raises(AdmissionRejected) as recusa:
+        database.get_db_connection()
+    assert recusa.value.retry_after == 2 and 'pool' in str(recusa.value)
+    assert database.admission_stats()['in_flight'] == 1
+    database.release_db_connection(ocupada)
+
+
+def test_close_pools_faz_o_processo_abrir_um_pool_novo(monkeypatch):
+    monkeypatch.setattr(database, '_connect', lambda **_: FakeConnection())
+    monkeypatch.setattr(database, '_pool', None)
+    monkeypatch.setattr(database, '_router', None)
+    herdado = database.get_pool()
+    conn = herdado.getconn()
+    herdado.putconn(conn)
+
+    database.close_pools()
+    assert conn.closed
+    assert database.get_pool() is not herdado
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def _roteador(*servidores, relogio=None, **opcoes):
+    primario = ConnectionPool(FakeConnection, minconn=0, maxconn=2)
+    replicas = [Replica(f'replica{i}', ConnectionPool(servidor.connect, minconn=0, maxconn=2))
+                for i, servidor in enumerate(servidores)]
+    return ReadRouter(primario, replicas, clock=relogio or Relogio(), **opcoes)
+
+
+def test_parse_lsn_ordena_pela_posicao():
+    assert parse_lsn('0/A9000000') == 0xA9000000
+    assert parse_lsn('1/0') > parse_lsn('0/FFFFFFFF')
+
+
+def test_leitura_vai_para_replica_em_dia_e_mede_com_intervalo():
+    relogio = Relogio()
+    router = _roteador(FakeServer(lag=0.2), relogio=relogio, check_interval=1.0)
+    conn, pool = router.getconn()
+    assert pool is router.replicas[0].pool and conn.queries == 1
+    pool.putconn(conn)
+
+    conn, pool = router.getconn()
+    assert conn.queries == 1          # medida recente: não consulta de novo
+    pool.putconn(conn)
+    relogio.agora = 1.0
+    conn, pool = router.getconn()
+    assert conn.queries == 2
+    assert router.stats()['replica_reads'] == 3
+
+
+def test_volta_ao_primario_com_atraso_acima_do_limite():
+    servidor = FakeServer(lag=12.5)
+    router = _roteador(servidor, max_lag=5.0)
+    _, pool = router.getconn()
+    assert pool is router.primary
+    stats = router.stats()
+    assert stats['fallbacks'] == 1 and stats['replicas']['replica0']['lag_exceeded'] == 1
+
+    servidor.status = (None, '0/100')   # réplica que ainda não aplicou nada
+    router.replicas[0].checked_at = None
+    assert router.getconn()[1] is router.primary
+
+
+def test_leitura_das_proprias_escritas_espera_a_replica_alcancar():
+    servidor = FakeServer(lag=0, replay_lsn='0/100')
+    router = _roteador(servidor, check_interval=60.0)
+    router.getconn()
+    _, pool = router.getconn(min_lsn=parse_lsn('0/200'))
+    assert pool is router.primary
+    assert router.stats()['replicas']['replica0']['behind_client'] == 1
+
+    # Mesmo sem vencer o intervalo, a réplica é medida de novo para esse LSN
+    servidor.status = (0, '0/300')
+    _, pool = router.getconn(min_lsn=parse_lsn('0/200'))
+    assert pool is router.replicas[0].pool
+
+
+def test_replica_fora_do_ar_sai_do_rodizio_por_um_tempo():
+    relogio = Relogio()
+    fora, em_dia = FakeServer(), FakeServer()
+    fora.down = True
+    router = _roteador(fora, em_dia, relogio=relogio, retry_after=10.0)
+
+    def ler():
+        conn, pool = router.getconn()
+        pool.putconn(conn)
+        return pool
+
+    assert all(ler() is router.replicas[1].pool for _ in range(4))
+    stats = router.stats()['replicas']['replica0']
+    assert stats['errors'] == 1 and stats['down']
+
+    fora.down = False
+    relogio.agora = 10.0
+    assert {id(ler()) for _ in range(2)} == {id(replica.pool) for replica in router.replicas}
+
+
+# O teste abaixo usa "conn", a conexão com o Postgres de teste (ver conftest.py)
+
+def test_wal_lsn_depois_do_commit_nao_deixa_transacao_aberta(conn):
+    with conn.cursor() as cur:
+        cur.execute('SELECT txid_current()')
+        cur.execute('SELECT pg_current_wal_insert_lsn()')
+        antes = parse_lsn(cur.fetchone()[0])
+    conn.commit()
+    assert parse_lsn(database.wal_lsn(conn)) >= antes
+    assert conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    assert not conn.autocommit
+
+
+# O teste abaixo precisa de um primário (TEST_DATABASE_URL) e de uma réplica
+# dele por streaming (TEST_REPLICA_DATABASE_URL), por exemplo:
+#   pg_basebackup -h localhost -p 5432 -U postgres -D /tmp/replica -R -X stream
+#   pg_ctl -D /tmp/replica -o '-p 5434' start
+
+def test_replica_real_atende_depois_de_aplicar_a_escrita():
+    dsn, dsn_replica = os.environ.get('TEST_DATABASE_URL'), os.environ.get('TEST_REPLICA_DATABASE_URL')
+    if not (dsn and dsn_replica):
+        pytest.skip('TEST_DATABASE_URL e TEST_REPLICA_DATABASE_URL não definidos')
+    router = ReadRouter(ConnectionPool(lambda: psycopg2.connect(dsn), minconn=0, maxconn=2),
+                        [Replica('replica', ConnectionPool(lambda: psycopg2.connect(dsn_replica), minconn=0, maxconn=2))],
+                        max_lag=3600)
+    replica = psycopg2.connect(dsn_replica)
+    replica.autocommit = True
+    try:
+        with replica.cursor() as cur:
+            cur.execute('SELECT pg_wal_replay_pause()')
+        with router.primary.connection() as conn, conn.cursor() as cur:
+            cur.execute('SELECT txid_current()')
+            conn.commit()
+            cur.execute('SELECT pg_current_wal_insert_lsn()')
+            lsn = parse_lsn(cur.fetchone()[0])
+
+        conn, pool = router.getconn(min_lsn=lsn)
+        pool.putconn(conn)
+        assert pool is router.primary
+
+        with replica.cursor() as cur:
+            cur.execute('SELECT pg_wal_replay_resume()')
+        limite = time.monotonic() + 10
+        while True:
+            conn, pool = router.getconn(min_lsn=lsn)
+            pool.putconn(conn)
+            if pool is not router.primary or time.monotonic() > limite:
+                break
+            time.sleep(0.05)
+        assert pool is router.replicas[0].pool
+    finally:
+        with replica.cursor() as cur:
+            cur.execute('SELECT pg_wal_replay_resume()')
+        replica.close()
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+# O modo é lido na importação, então cada caso roda num processo próprio
+SERVIR = r'''
+import json, sys
+import app
+cliente = app.app.test_client()
+resposta = cliente.get('/apispec.json')
+repetida = cliente.get('/apispec.json', headers={'If-None-Match': resposta.headers.get('ETag', '')})
+print(json.dumps({'flasgger': 'flasgger' in sys.modules, 'status': resposta.status_code,
+                  'spec': resposta.get_json(), 'repetida': repetida.status_code,
+                  'docs': cliente.get('/docs/').status_code}))
+'''
+
+
+def _servir(modo, arquivo_spec):
+    ambiente = dict(os.environ, API_DOCS=modo, API_SPEC_FILE=str(arquivo_spec))
+    saida = subprocess.run([sys.executable, '-c', SERVIR], cwd=PASTA, env=ambiente,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.splitlines()[-1])
+
+
+@pytest.fixture(scope='module')
+def arquivo_spec(tmp_path_factory):
+    arquivo = tmp_path_factory.mktemp('spec') / 'apispec.json'
+    subprocess.run([sys.executable, 'documentacao.py', '--saida', str(arquivo)], cwd=PASTA,
+                   check=True, stdout=subprocess.DEVNULL)
+    return arquivo
+
+
+def test_modo_static_serve_o_arquivo_sem_importar_flasgger(arquivo_spec):
+    servido = _servir('static', arquivo_spec)
+    assert not servido['flasgger']
+    assert servido['status'] == 200 and servido['repetida'] == 304 and servido['docs'] == 404
+    assert servido['spec'] == json.loads(arquivo_spec.read_text(encoding='utf-8'))
+
+
+def test_arquivo_gerado_igual_ao_do_flasgger(arquivo_spec):
+    servido = _servir('swagger', arquivo_spec)
+    assert servido['flasgger'] and servido['docs'] == 200
+    assert servido['spec'] == json.loads(arquivo_spec.read_text(encoding='utf-8'))
+    assert '/alunos/{id}' in servido['spec']['paths']
+
+
+def test_modo_static_sem_arquivo_falha_na_partida(tmp_path):
+    with pytest.raises(subprocess.CalledProcessError) as erro:
+        _servir('static', tmp_path / 'nao_existe.json')
+    assert 'python documentacao.py' in erro.value.stderr
@@ -0,0 +1,66 @@
+import gzip
+import json
+import queue
+
+import psycopg2
+import pytest
+
+from exportacao import BLOCO, _Destino, comando_copy, iniciar, transmitir_copy
+
+
+def test_destino_agrupa_em_blocos_e_comprime():
+    fila = queue.Queue()
+    destino = _Destino(fila, comprimir=True)
+    linha = b'1,Ana Souza\n'
+    for _ in range(2 * BLOCO // len(linha)):
+        destino.write(linha)
+    destino.fechar()
+    blocos = list(fila.queue)
+    assert len(blocos) == 2
+    assert gzip.decompress(b''.join(blocos)) == linha * (2 * BLOCO // len(linha))
+
+
+# Os testes abaixo usam "conn", a conexão com o Postgres de teste (ver conftest.py)
+
+def _exportar(conn, consulta, params, formato, comprimir=False):
+    with conn.cursor() as cur:
+        comando = comando_copy(cur, consulta, params, formato)
+    fim = []
+    corpo = b''.join(iniciar(transmitir_copy(conn, comando, comprimir, lambda _, linhas: fim.append(linhas))))
+    return corpo, fim
+
+
+def test_ndjson_preserva_o_texto(conn):
+    texto = 'barra \\ "aspas"\nquebra\ttab \x01 ção'
+    corpo, fim = _exportar(conn, 'SELECT g AS id, %s AS texto FROM generate_series(1, 3) g', [texto], 'ndjson', comprimir=True)
+    linhas = gzip.decompress(corpo).decode('utf-8').splitlines()
+    assert [json.loads(linha) for linha in linhas] == [{'id': i, 'texto': texto} for i in (1, 2, 3)]
+    assert fim == [3]
+
+
+def test_csv_com_cabecalho(conn):
+    corpo, _ = _exportar(conn, "SELECT 1 AS id_aluno, %s AS nome_completo", ['Silva, Ana'], 'csv')
+    assert corpo.decode('utf-8') == 'id_aluno,nome_completo\n1,"Silva, Ana"\n'
+
+
+def test_cliente_desconectado_cancela_o_copy(conn):
+    with conn.cursor() as cur:
+        comando = comando_copy(cur, 'SELECT generate_series(1, 50000000)', [], 'csv')
+    fim = []
+    blocos = iniciar(transmitir_copy(conn, comando, ao_terminar=lambda _, linhas: fim.append(linhas)))
+    next(blocos)
+    blocos.close()
+    assert fim == [None]
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute('SELECT 1')
+        assert cur.fetchone() == (1,)
+
+
+def test_erro_no_copy_antes_do_primeiro_bloco(conn):
+    with conn.cursor() as cur:
+        comando = comando_copy(cur, 'SELECT * FROM tabela_inexistente', [], 'csv')
+    fim = []
+    with pytest.raises(psycopg2.errors.UndefinedTable):
+        iniciar(transmitir_copy(conn, comando, ao_terminar=lambda _, linhas: fim.append(linhas)))
+    assert fim == [None]
@@ -0,0 +1,95 @@
+import datetime
+import json
+
+import pytest
+
+from importacao import (ErroImportacao, formato_do_upload, ler_registros, separar_turmas_inexistentes, separar_validos,
+                        turmas_do_lote, validar_alteracoes)
+
+
+def test_json_separa_linhas_invalidas():
+    texto = '[{"nome_completo": "Ana", "data_nascimento": "2019-03-01", "id_turma": 2}, {"id_turma": 2}]'
+    linhas, valores, erros = separar_validos(ler_registros(texto, 'json'))
+    assert linhas == [1]
+    assert valores == [('Ana', datetime.date(2019, 3, 1), 2, None, None, None, None)]
+    assert erros == [{'linha': 2, 'error': 'O campo "nome_completo" é obrigatório'}]
+
+
+def test_obrigatorios_e_tipos_viram_erro_da_linha():
+    texto = '\n'.join([
+        '{"nome_completo": "Ana"}',
+        '{"nome_completo": "Bia", "data_nascimento": "01/03/2019"}',
+        '{"nome_completo": "Caio", "data_nascimento": "2019-03-01", "id_turma": "A"}',
+        '{"nome_completo": "Duda", "data_nascimento": "2019-03-01", "id_turma": "3"}',
+    ])
+    linhas, valores, erros = separar_validos(ler_registros(texto, 'ndjson'))
+    assert linhas == [4] and valores[0][2] == 3
+    assert erros == [
+        {'linha': 1, 'error': 'O campo "data_nascimento" é obrigatório'},
+        {'linha': 2, 'error': 'O campo "data_nascimento" deve ser do tipo date'},
+        {'linha': 3, 'error': 'O campo "id_turma" deve ser do tipo int'},
+    ]
+
+
+def test_linhas_com_turma_inexistente_saem_do_lote():
+    texto = '[{"nome_completo": "Ana", "data_nascimento": "2019-03-01", "id_turma": 2},' \
+            ' {"nome_completo": "Bia", "data_nascimento": "2019-03-01", "id_turma": 9},' \
+            ' {"nome_completo": "Caio", "data_nascimento": "2019-03-01"}]'
+    linhas, valores, _ = separar_validos(ler_registros(texto, 'json'))
+    assert turmas_do_lote(valores) == [2, 9]
+    linhas, valores, erros = separar_turmas_inexistentes(linhas, valores, {2})
+    assert linhas == [1, 3] and [v[0] for v in valores] == ['Ana', 'Caio']
+    assert erros == [{'linha': 2, 'error': 'A turma 9 não existe'}]
+
+
+def test_ndjson_reporta_linha_ilegivel_e_segue():
+    texto = '{"nome_completo": "Ana", "data_nascimento": "2019-03-01"}\n\nnão é json\n' \
+            '{"nome_completo": "Bia", "data_nascimento": "2019-03-02"}\n'
+    linhas, valores, erros = separar_validos(ler_registros(texto, 'ndjson'))
+    assert linhas == [1, 4]
+    assert [v[0] for v in valores] == ['Ana', 'Bia']
+    assert erros == [{'linha': 3, 'error': 'Linha não é um JSON válido'}]
+
+
+def test_csv_celula_vazia_vira_nulo():
+    texto = 'nome_completo,data_nascimento,id_turma\nAna,2019-03-01,\n,2019-04-01,1\n'
+    linhas, valores, erros = separar_validos(ler_registros(texto, 'csv'))
+    assert valores == [('Ana', datetime.date(2019, 3, 1), None, None, None, None, None)]
+    assert [e['linha'] for e in erros] == [2]
+
+
+def test_csv_rejeita_coluna_desconhecida():
+    with pytest.raises(ErroImportacao):
+        list(ler_registros('nome_completo,idade\nAna,5\n', 'csv'))
+
+
+def test_json_precisa_ser_array():
+    with pytest.raises(ErroImportacao):
+        list(ler_registros('{"nome_completo": "Ana"}', 'json'))
+
+
+def test_formato_pela_extensao_ou_tipo():
+    assert formato_do_upload('application/octet-stream', 'matriculas.CSV') == 'csv'
+    assert formato_do_upload('application/x-ndjson') == 'ndjson'
+    assert formato_do_upload('text/plain') is None
+
+
+def test_alteracoes_parciais():
+    assert validar_alteracoes({'id_turma': None}) is None
+    assert validar_alteracoes({}) == 'Envie ao menos um campo para atualizar'
+    assert validar_alteracoes({'idade': 5}) == 'Campos desconhecidos: idade'
+    assert validar_alteracoes({'data_nascimento': None}) is not None
+
+
+def test_lote_grande_recusado_antes_da_conversao(monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'separar_validos', lambda registros: pytest.fail('converteu o lote'))
+    cliente = app.app.test_client()
+
+    lote = json.dumps([{'nome_completo': 'Ana'}] * (app.LOTE_MAXIMO + 1))
+    resposta = cliente.post('/alunos/bulk', data=lote, content_type='application/json')
+    assert resposta.status_code == 413 and str(app.LOTE_MAXIMO) in resposta.get_json()['error']
+
+    monkeypatch.setattr(app, 'LOTE_BYTES_MAXIMO', 10)
+    resposta = cliente.post('/alunos/bulk', data='[{"nome_completo": "Ana"}]', content_type='application/json')
+    assert resposta.status_code == 413
@@ -0,0 +1,30 @@
+from flask import Flask
+
+from metricas import Histograma, instrumentar, medir, registrar_linhas
+
+
+def test_histograma_acumula_baldes():
+    histograma = Histograma('teste_segundos', 'Teste.', ('route',), (0.1, 1.0))
+    histograma.observar(0.05, '/a')
+    histograma.observar(0.1, '/a')
+    histograma.observar(5.0, '/a')
+    linhas = histograma.exportar()
+    assert 'teste_segundos_bucket{route="/a",le="0.1"} 2' in linhas
+    assert 'teste_segundos_bucket{route="/a",le="1.0"} 2' in linhas
+    assert 'teste_segundos_bucket{route="/a",le="+Inf"} 3' in linhas
+    assert 'teste_segundos_count{route="/a"} 3' in linhas
+
+
+def test_server_timing_com_as_etapas_medidas():
+    app = Flask(__name__)
+    instrumentar(app)
+
+    @app.route('/x')
+    def x():
+        with medir('consulta'):
+            registrar_linhas(3)
+        return 'ok'
+
+    response = app.test_client().get('/x')
+    etapas = [parte.split(';')[0] for parte in response.headers['Server-Timing'].split(', ')]
+    assert etapas == ['consulta', 'total']
@@ -0,0 +1,95 @@
+import pytest
+
+from migrar import ErroMigracao, carregar_migracoes, comandos, extensoes_disponiveis, migrar, verificar_planos
+
+# Dados do schema temporário de "banco" (conftest.py); as migrações são o que
+# os testes aplicam
+DADOS_TESTE = '''
+    INSERT INTO Professor (nome_completo) SELECT 'Professor ' || g FROM generate_series(1, 2000) g;
+    INSERT INTO Turma (nome_turma, id_professor) SELECT 'Turma ' || g, 1 + g % 2000 FROM generate_series(1, 4000) g;
+    INSERT INTO Aluno (nome_completo, data_nascimento, id_turma)
+        SELECT 'Aluno ' || g, date '2017-01-01' + g % 2190, 1 + g % 4000 FROM generate_series(1, 20000) g;
+    INSERT INTO Presenca (id_aluno, data_presenca, presente)
+        SELECT a, date '2024-03-01' + d, true FROM generate_series(1, 20000) a, generate_series(1, 15) d;
+    INSERT INTO Pagamento (id_aluno, data_pagamento, valor_pago)
+        SELECT a, date '2024-01-05' + 30 * m, 950 FROM generate_series(1, 20000) a, generate_series(0, 5) m;
+    INSERT INTO Atividade (descricao, data_realizacao) SELECT 'Atividade ' || g, date '2024-03-01' FROM generate_series(1, 50) g;
+    INSERT INTO Atividade_Aluno (id_atividade, id_aluno) SELECT 1 + (a + k) % 50, a FROM generate_series(1, 20000) a, generate_series(0, 1) k;'''
+
+
+def test_comandos_ignora_comentarios():
+    texto = '-- migrar: sem-transacao\n-- comentário; com ponto e vírgula\nCREATE INDEX a ON t (x);\n\nCREATE INDEX b\n  ON t (y);\n'
+    assert comandos(texto) == ['CREATE INDEX a ON t (x)', 'CREATE INDEX b\n  ON t (y)']
+
+
+def test_comandos_preserva_blocos_do():
+    texto = 'DO $$\nBEGIN\n    PERFORM 1;\nEND $$;\nSELECT 2;\n'
+    assert comandos(texto) == ['DO $$\nBEGIN\n    PERFORM 1;\nEND $$', 'SELECT 2']
+
+
+def test_checksum_independe_do_fim_de_linha(tmp_path):
+    (tmp_path / '0002_b.sql').write_bytes(b'-- migrar: sem-transacao\r\nSELECT 2;\r\n')
+    (tmp_path / '0001_a.sql').write_bytes(b'SELECT 1;\n')
+    (tmp_path / 'leiame.txt').write_text('ignorado')
+    primeira, segunda = carregar_migracoes(str(tmp_path))
+    assert (primeira.versao, primeira.transacional) == (1, True)
+    assert (segunda.versao, segunda.transacional) == (2, False)
+    assert primeira.requer == segunda.requer == ()
+    (tmp_path / '0002_b.sql').write_bytes(b'-- migrar: sem-transacao\nSELECT 2;\n')
+    assert carregar_migracoes(str(tmp_path))[1].checksum == segunda.checksum
+
+
+def _aplicaveis(banco, migracoes):
+    with banco.cursor() as cur:
+        disponiveis = extensoes_disponiveis(cur)
+    return [migracao.versao for migracao in migracoes if set(migracao.requer) <= disponiveis]
+
+
+def test_indices_eliminam_seq_scan(banco):
+    sem_indices = verificar_planos(banco, minimo_linhas=0)
+    assert any(varreduras for _, varreduras, _ in sem_indices)
+
+    assert migrar(banco, saida=lambda _: None) == _aplicaveis(banco, carregar_migracoes())
+    with banco.cursor() as cur:
+        cur.execute('ANALYZE')
+    assert [(nome, varreduras) for nome, varreduras, _ in verificar_planos(banco, minimo_linhas=0) if varreduras] == []
+
+    # Já aplicadas: nada a fazer
+    assert migrar(banco, saida=lambda _: None) == []
+
+
+def test_migracao_alterada_depois_de_aplicada(banco, tmp_path):
+    migrar(banco, saida=lambda _: None)
+    for migracao in carregar_migracoes():
+        (tmp_path / f'{migracao.versao:04d}_{migracao.nome}.sql').write_text(migracao.texto + '\n-- editada\n')
+    with pytest.raises(ErroMigracao, match='alteradas'):
+        migrar(banco, diretorio=str(tmp_path), saida=lambda _: None)
+
+
+def test_falha_desfaz_migracao_transacional(banco, tmp_path):
+    migrar(banco, saida=lambda _: None)
+    migracoes = carregar_migracoes()
+    for migracao in migracoes:
+        (tmp_path / f'{migracao.versao:04d}_{migracao.nome}.sql').write_text(migracao.texto)
+    ultima = _aplicaveis(banco, migracoes)[-1]
+    (tmp_path / f'{migracoes[-1].versao + 1:04d}_quebrada.sql').write_text('CREATE TABLE Rascunho (x INT);\nSELECT * FROM tabela_inexistente;\n')
+    with pytest.raises(ErroMigracao, match='_quebrada'):
+        migrar(banco, diretorio=str(tmp_path), saida=lambda _: None)
+    with banco.cursor() as cur:
+        cur.execute("SELECT to_regclass('rascunho'), max(versao) FROM schema_migracoes")
+        assert cur.fetchone() == (None, ultima)
+
+
+def test_migracao_com_extensao_indisponivel_fica_pendente(banco, tmp_path):
+    migrar(banco, saida=lambda _: None)
+    migracoes = carregar_migracoes()
+    for migracao in migracoes:
+        (tmp_path / f'{migracao.versao:04d}_{migracao.nome}.sql').write_text(migracao.texto)
+    versao = migracoes[-1].versao + 1
+    (tmp_path / f'{versao:04d}_opcional.sql').write_text('-- migrar: requer extensao_que_nao_existe\nCREATE TABLE Opcional (x INT);\n')
+    mensagens = []
+    assert migrar(banco, diretorio=str(tmp_path), saida=mensagens.append) == []
+    assert 'requer extensao_que_nao_existe' in mensagens[-1]
+    with banco.cursor() as cur:
+        cur.execute("SELECT to_regclass('opcional'), count(*) FILTER (WHERE versao = %s) FROM schema_migracoes", (versao,))
+        assert cur.fetchone() == (None, 0)
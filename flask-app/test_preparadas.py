@@ -0,0 +1,91 @@
+import psycopg2.errors
+import psycopg2.extensions
+import pytest
+
+from preparadas import ComandosPreparados
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def execute(self, query, params=None):
+        if query.startswith('EXECUTE') and query.split()[1] not in self.connection.preparados:
+            self.connection.status = psycopg2.extensions.TRANSACTION_STATUS_INERROR
+            raise psycopg2.errors.InvalidSqlStatementName('prepared statement does not exist')
+        if query.startswith('PREPARE'):
+            self.connection.preparados.add(query.split()[1])
+        self.connection.executados.append((query, params))
+        self.connection.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+
+class FakeConnection:
+    def __init__(self):
+        self.preparados = set()
+        self.executados = []
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+def test_prepara_uma_vez_por_conexao():
+    comandos = ComandosPreparados(ativo=True)
+    nome = comandos.registrar('por_id', 'SELECT * FROM Aluno WHERE id_aluno = %s AND id_turma = %s')
+    conn = FakeConnection()
+    comandos.executar(conn.cursor(), nome, (1, 2))
+    comandos.executar(conn.cursor(), nome, (3, 4))
+    assert conn.executados == [
+        ('PREPARE por_id AS SELECT * FROM Aluno WHERE id_aluno = $1 AND id_turma = $2', None),
+        ('EXECUTE por_id (%s, %s)', (1, 2)),
+        ('EXECUTE por_id (%s, %s)', (3, 4)),
+    ]
+
+    # Uma conexão nova (reconexão) prepara de novo
+    outra = FakeConnection()
+    comandos.executar(outra.cursor(), nome, (5, 6))
+    assert outra.executados[0][0].startswith('PREPARE por_id')
+    assert comandos.stats()['por_id'] == {'executions': 3, 'prepares': 2, 'reprepares': 0}
+
+
+def test_prepara_de_novo_se_a_sessao_perdeu_os_comandos():
+    comandos = ComandosPreparados(ativo=True)
+    nome = comandos.registrar('por_id', 'SELECT * FROM Aluno WHERE id_aluno = %s')
+    conn = FakeConnection()
+    comandos.executar(conn.cursor(), nome, (1,))
+    conn.preparados.clear()  # DISCARD ALL
+    conn.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    comandos.executar(conn.cursor(), nome, (2,))
+    assert conn.executados[-1] == ('EXECUTE por_id (%s)', (2,))
+    assert comandos.stats()['por_id']['reprepares'] == 1
+
+    # No meio de uma transação não dá para repetir sem perder o que já rodou
+    conn.preparados.clear()
+    with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+        comandos.executar(conn.cursor(), nome, (3,))
+
+
+def test_desativado_executa_sql_comum():
+    comandos = ComandosPreparados(ativo=False)
+    nome = comandos.registrar('por_id', 'SELECT * FROM Aluno WHERE id_aluno = %s')
+    conn = FakeConnection()
+    comandos.executar(conn.cursor(), nome, (1,))
+    assert conn.executados == [('SELECT * FROM Aluno WHERE id_aluno = %s', (1,))]
+
+
+def test_executar_sql_usa_o_comando_registrado_com_o_mesmo_texto():
+    comandos = ComandosPreparados(ativo=True)
+    comandos.registrar('por_id', 'SELECT * FROM Aluno WHERE id_aluno = %s')
+    conn = FakeConnection()
+    comandos.executar_sql(conn.cursor(), 'SELECT * FROM Aluno WHERE id_aluno = %s', (1,))
+    comandos.executar_sql(conn.cursor(), 'SELECT * FROM Turma WHERE id_turma = %s', (2,))
+    assert conn.executados[1:] == [
+        ('EXECUTE por_id (%s)', (1,)),
+        ('SELECT * FROM Turma WHERE id_turma = %s', (2,)),
+    ]
@@ -0,0 +1,26 @@
+import pytest
+
+from presencas import CHAMADA_MAXIMA, ErroChamada, ler_chamada, ler_data
+
+
+def test_chamada_ordenada_por_aluno():
+    assert ler_chamada({'presencas': {'12': True, '3': False, '7': True}}) == ([3, 7, 12], [False, True, True])
+
+
+@pytest.mark.parametrize('dados', [
+    None,
+    {},
+    {'presencas': {}},
+    {'presencas': {'abc': True}},
+    {'presencas': {'1': 'sim'}},
+    {'presencas': {str(i): True for i in range(CHAMADA_MAXIMA + 1)}},
+])
+def test_chamada_invalida(dados):
+    with pytest.raises(ErroChamada):
+        ler_chamada(dados)
+
+
+def test_data_iso():
+    assert ler_data('2024-03-01').day == 1
+    with pytest.raises(ErroChamada):
+        ler_data('01/03/2024')
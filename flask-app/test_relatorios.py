@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+
+from consultas import ParametroInvalido
+from relatorios import atualizar_resumos, frescor, ler_mes
+
+# Dados do schema temporário de "banco" (conftest.py), já com as migrações
+DADOS_TESTE = '''
+    INSERT INTO Turma (nome_turma) VALUES ('Turma A'), ('Turma B');
+    INSERT INTO Aluno (nome_completo, data_nascimento, id_turma)
+        SELECT 'Aluno ' || g, date '2019-01-01', 1 + g % 2 FROM generate_series(1, 10) g;
+    INSERT INTO Presenca (id_aluno, data_presenca, presente)
+        SELECT a, date '2024-03-01' + d, d % 5 <> 0 FROM generate_series(1, 10) a, generate_series(0, 9) d;
+    INSERT INTO Pagamento (id_aluno, data_pagamento, valor_pago, status)
+        SELECT a, date '2024-03-05', 500, CASE WHEN a % 3 = 0 THEN 'pendente' ELSE 'pago' END
+        FROM generate_series(1, 10) a;'''
+MIGRAR_TESTE = True
+
+
+def test_ler_mes():
+    assert ler_mes('2024-03') == datetime.date(2024, 3, 1)
+    assert ler_mes(None) == datetime.date.today().replace(day=1)
+    for invalido in ('2024-13', '03/2024', '2024-03-01'):
+        with pytest.raises(ParametroInvalido):
+            ler_mes(invalido)
+
+
+def _frequencia(conn):
+    with conn.cursor() as cur:
+        cur.execute('SELECT id_turma, dias_letivos, registros, presencas FROM Resumo_Presenca_Turma '
+                    "WHERE mes = '2024-03-01' ORDER BY id_turma")
+        return cur.fetchall()
+
+
+def test_resumos_recalculam_so_o_que_mudou(banco):
+    banco.autocommit = False    # as alterações abaixo são confirmadas uma a uma
+    # A migração marca todo o histórico já existente como pendente
+    assert atualizar_resumos(banco) == {'presenca': 2, 'pagamento': 10}
+    assert _frequencia(banco) == [(1, 10, 50, 40), (2, 10, 50, 40)]
+    with banco.cursor() as cur:
+        cur.execute("SELECT valor_total, valor_pendente FROM Resumo_Pagamento_Aluno WHERE id_aluno = 3")
+        assert cur.fetchone() == (500, 500)
+        assert frescor(cur, 'presenca', datetime.date(2024, 3, 1))['atualizado'] is True
+    assert atualizar_resumos(banco) == {'presenca': 0, 'pagamento': 0}
+
+    # Uma falta corrigida marca só a turma e o mês do aluno
+    with banco.cursor() as cur:
+        cur.execute("UPDATE Presenca SET presente = true WHERE id_aluno = 2 AND data_presenca = '2024-03-01'")
+        atualizacao = frescor(cur, 'presenca', datetime.date(2024, 3, 1))
+        assert (atualizacao['periodos_pendentes'], atualizacao['atualizado']) == (1, False)
+    banco.commit()
+    assert atualizar_resumos(banco) == {'presenca': 1, 'pagamento': 0}
+    assert _frequencia(banco) == [(1, 10, 50, 41), (2, 10, 50, 40)]
+
+    # Trocar o aluno de turma refaz as duas turmas
+    with banco.cursor() as cur:
+        cur.execute('UPDATE Aluno SET id_turma = 2 WHERE id_aluno = 2')
+    banco.commit()
+    assert atualizar_resumos(banco) == {'presenca': 2, 'pagamento': 0}
+    assert _frequencia(banco) == [(1, 10, 40, 32), (2, 10, 60, 49)]
@@ -0,0 +1,99 @@
+import datetime
+import json
+import sys
+
+import pytest
+
+from importacao import ALUNO
+from repositorio import Repositorio, Tabela, ValorInvalido, iterar_registros, registros
+
+# Dados do schema temporário de "banco" (conftest.py)
+DADOS_TESTE = '''
+    INSERT INTO Aluno (nome_completo, data_nascimento)
+    SELECT 'Aluno ' || g, date '2015-01-01' + g FROM generate_series(1, 250) g'''
+
+
+class CursorFalso:
+    def __init__(self, linhas):
+        self.linhas = list(linhas)
+
+    def fetchall(self):
+        linhas, self.linhas = self.linhas, []
+        return linhas
+
+    def fetchmany(self, tamanho):
+        linhas, self.linhas = self.linhas[:tamanho], self.linhas[tamanho:]
+        return linhas
+
+
+def test_sql_derivado_das_colunas():
+    assert ALUNO.sql_obter.startswith('SELECT id_aluno, nome_completo, data_nascimento, id_turma,')
+    assert ALUNO.sql_inserir(('nome_completo', 'id_turma')) == \
+        'INSERT INTO Aluno (nome_completo, id_turma) VALUES (%s, %s) RETURNING id_aluno'
+    assert ALUNO.sql_atualizar(('id_turma',)) == \
+        'UPDATE Aluno SET id_turma = %s WHERE id_aluno = %s AND (id_turma IS DISTINCT FROM %s) RETURNING id_aluno'
+    with pytest.raises(ValueError):
+        Tabela('alunos; DROP TABLE x', 'id', [('id', int)])
+
+
+def test_converte_pelo_tipo_da_coluna():
+    assert ALUNO.converter({'data_nascimento': '2015-03-01', 'id_turma': '7', 'nome_completo': 'Ana', 'outro': 1}) == \
+        {'nome_completo': 'Ana', 'data_nascimento': datetime.date(2015, 3, 1), 'id_turma': 7}
+    assert ALUNO.converter({'id_turma': None}) == {'id_turma': None}
+    with pytest.raises(ValorInvalido, match='data_nascimento'):
+        ALUNO.converter({'data_nascimento': '01/03/2015'})
+    with pytest.raises(ValorInvalido, match='id_turma'):
+        ALUNO.converter({'id_turma': 7.5})
+    with pytest.raises(ValorInvalido, match='nome_completo'):
+        ALUNO.converter({'nome_completo': {'primeiro': 'Ana'}})
+
+
+def test_registros_compactos_e_compativeis_com_tuplas():
+    linha = (1, 'Ana', datetime.date(2015, 3, 1), None, None, None, None, None)
+    aluno, = registros(CursorFalso([linha]), ALUNO.Registro)
+    assert aluno == linha and aluno[0] == aluno.id_aluno == 1
+    assert aluno._asdict()['nome_completo'] == 'Ana'
+    assert not hasattr(aluno, '__dict__')
+    assert sys.getsizeof(aluno) == sys.getsizeof(linha)
+
+    lidos = iterar_registros(CursorFalso([(n,) + linha[1:] for n in range(5)]), ALUNO.Registro, tamanho=2)
+    assert [aluno.id_aluno for aluno in lidos] == [0, 1, 2, 3, 4]
+
+
+# O teste abaixo usa o Postgres de teste (ver conftest.py)
+
+@pytest.mark.parametrize('autocommit', [False, True])
+def test_crud_e_leitura_em_lista_e_em_lotes(banco, autocommit):
+    conn = banco
+    try:
+        conn.autocommit = autocommit
+        alunos = Repositorio(ALUNO, tamanho_lote=100)
+
+        id_aluno = alunos.inserir(conn, {'nome_completo': 'Ana', 'data_nascimento': '2015-03-01'})
+        assert alunos.obter(conn, id_aluno).data_nascimento == datetime.date(2015, 3, 1)
+        assert alunos.atualizar(conn, id_aluno, {'nome_completo': 'Ana Souza'})
+        assert not alunos.atualizar(conn, id_aluno, {'nome_completo': 'Ana Souza'})
+
+        pagina = alunos.listar(conn, depois=10, limite=5)
+        assert [aluno.id_aluno for aluno in pagina] == [11, 12, 13, 14, 15]
+        todos = alunos.listar(conn)
+        assert len(todos) == 251
+        assert [aluno.id_aluno for aluno in alunos.iterar(conn)] == [aluno.id_aluno for aluno in todos]
+
+        assert alunos.excluir(conn, id_aluno) and not alunos.excluir(conn, id_aluno)
+        assert alunos.obter(conn, id_aluno) is None
+    finally:
+        conn.rollback()
+        conn.autocommit = True
+
+
+def test_consultas_livres_em_lista_e_em_lotes(banco):
+    alunos = Repositorio(ALUNO)
+    pares = alunos.consultar(banco, 'SELECT id_aluno, id_aluno %% 2 = 0 AS par FROM Aluno WHERE id_aluno <= %s', (4,))
+    assert [(aluno.id_aluno, aluno.par) for aluno in pares] == [(1, False), (2, True), (3, False), (4, True)]
+    assert json.loads(alunos.obter_json(banco, 3))['nome_completo'] == 'Aluno 3'
+    assert alunos.obter_json(banco, 0) is None
+
+    lotes = list(alunos.lotes(banco, 'SELECT id_aluno FROM Aluno WHERE id_aluno <= %s ORDER BY id_aluno', (5,), tamanho=2))
+    assert [[aluno.id_aluno for aluno in lote] for lote in lotes] == [[1, 2], [3, 4], [5]]
+    assert list(alunos.lotes(banco, 'SELECT id_aluno FROM Aluno WHERE false')) == []
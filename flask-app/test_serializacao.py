@@ -0,0 +1,41 @@
+import datetime
+import decimal
+import importlib
+import json
+import sys
+
+import pytest
+
+import serializacao
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def modulo(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setitem(sys.modules, 'orjson', None)
+    elif serializacao.orjson is None:
+        pytest.skip('orjson não instalado')
+    yield importlib.reload(serializacao)
+    monkeypatch.undo()
+    importlib.reload(serializacao)
+
+
+def test_datas_em_iso_e_decimal_como_numero(modulo):
+    corpo = modulo.linhas_json(
+        ['id', 'data', 'valor', 'nome'],
+        [(1, datetime.date(2010, 5, 15), decimal.Decimal('1234.50'), 'João')],
+    )
+    assert json.loads(corpo) == [{'id': 1, 'data': '2010-05-15', 'valor': 1234.5, 'nome': 'João'}]
+
+
+def test_linhas_montadas_das_tuplas_sem_perder_caracteres(modulo):
+    linhas = [(1, 'vírgula, "aspas"\ne quebra', None, [1, 2]), (2, '', 0.5, {'a': [3]})]
+    nomes = ['id', 'nome%s', 'nota', 'extra']
+    assert json.loads(modulo.linhas_json(nomes, linhas)) == [dict(zip(nomes, linha)) for linha in linhas]
+    assert json.loads(modulo.linha_json(nomes, linhas[0])) == dict(zip(nomes, linhas[0]))
+    assert modulo.linhas_json(nomes, []) == b'[]'
+
+
+def test_objeto_com_membros_ja_serializados(modulo):
+    corpo = modulo.objeto_json({'mes': datetime.date(2024, 3, 1)}, alunos=modulo.linhas_json(['id'], [(1,)]))
+    assert json.loads(corpo) == {'mes': '2024-03-01', 'alunos': [{'id': 1}]}
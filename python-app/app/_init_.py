@@ -1,40 +1,53 @@
 from flask import Flask, jsonify, request
-import psycopg2
+
+from database import close_db_connection, get_db_connection
+from repositorio import Repositorio, Tabela, ValorInvalido
 
 app = Flask(__name__)
 
-def get_db_connection():
-    conn = psycopg2.connect(
-        host="postgres",
-        database="escola",
-        user="postgres",
-        password="postgres"
-    )
-    return conn
+# Este app sempre usou o banco escola; o padrão de database.py é o do main.py
+BANCO = 'escola'
+
+# A tabela alunos deste app; as linhas saem como registros Aluno (tuplas).
+# aluno_id é um código de até 5 caracteres (VARCHAR(5), ex.: 'A001')
+ALUNOS = Tabela('alunos', 'aluno_id', [
+    ('aluno_id', str),
+    ('nome', str),
+    ('endereco', str),
+    ('cidade', str),
+    ('estado', str),
+    ('cep', str),
+    ('pais', str),
+    ('telefone', str),
+], registro='Aluno')
+repositorio = Repositorio(ALUNOS)
 
 @app.route('/alunos', methods=['GET'])
 def listar_alunos():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM alunos;')
-    alunos = cur.fetchall()
-    cur.close()
-    conn.close()
+    conn = get_db_connection(default_database=BANCO)
+    try:
+        alunos = repositorio.listar(conn)
+    finally:
+        close_db_connection(conn)
     return jsonify(alunos)
 
 @app.route('/alunos', methods=['POST'])
 def cadastrar_aluno():
     novo_aluno = request.json
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        'INSERT INTO alunos (aluno_id, nome, endereco, cidade, estado, cep, pais, telefone) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
-        (novo_aluno['aluno_id'], novo_aluno['nome'], novo_aluno.get('endereco'), novo_aluno.get('cidade'),
-         novo_aluno.get('estado'), novo_aluno.get('cep'), novo_aluno.get('pais'), novo_aluno.get('telefone'))
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    if not isinstance(novo_aluno, dict) or not novo_aluno.get('aluno_id') or not novo_aluno.get('nome'):
+        return jsonify({'error': 'Os campos "aluno_id" e "nome" são obrigatórios'}), 400
+    try:
+        valores = ALUNOS.converter(novo_aluno)
+    except ValorInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    if not 1 <= len(valores['aluno_id']) <= 5:
+        return jsonify({'error': 'O campo "aluno_id" deve ter de 1 a 5 caracteres'}), 400
+    conn = get_db_connection(default_database=BANCO)
+    try:
+        repositorio.inserir(conn, valores)
+        conn.commit()
+    finally:
+        close_db_connection(conn)
     return jsonify({'message': 'Aluno cadastrado com sucesso!'}), 201
 
 # Similar para rotas de UPDATE e DELETE
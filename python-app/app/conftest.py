@@ -0,0 +1,16 @@
+"""Fixtures dos testes que precisam de um Postgres.
+
+Como no flask-app, esses testes só rodam com ``TEST_DATABASE_URL``
+apontando para um banco descartável; sem ela, são pulados.
+"""
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def dsn():
+    dsn = os.environ.get('TEST_DATABASE_URL')
+    if not dsn:
+        pytest.skip('TEST_DATABASE_URL não definido')
+    return dsn
@@ -1,17 +1,29 @@
-import logging
+import time
+from contextlib import contextmanager
+
 import psycopg2
 from psycopg2 import sql, Error
+from psycopg2.extras import execute_values
+
+from registro import configurar, operacao
+from repositorio import Repositorio, Tabela, ValorInvalido
+
+# Logs em JSON gravados por uma thread de fundo (ver registro.py)
+logger = configurar()
+
+# A tabela alunos do escola_infantil; as linhas saem como registros Aluno
+ALUNOS = Tabela('alunos', 'id', [
+    ('id', int),
+    ('nome', str),
+    ('idade', int),
+    ('turma', str),
+], registro='Aluno')
+repositorio = Repositorio(ALUNOS)
 
-# Configuração do sistema de logs
-logging.basicConfig(
-    filename='escola_infantil.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
 # Função para conectar ao banco de dados
 def conectar():
+    inicio = time.perf_counter()
     try:
         conn = psycopg2.connect(
             dbname="escola_infantil",
@@ -22,95 +34,201 @@ def conectar():
         )
         return conn
     except Error as e:
-        logging.critical(f"Erro ao conectar ao banco de dados: {e}")
+        logger.critical("Erro ao conectar ao banco de dados: %s", e, extra=operacao("CONNECT", inicio))
         raise
 
+
+class Sessao:
+    """Unidade de trabalho: várias operações de CRUD numa única conexão.
+
+    Uso::
+
+        with Sessao() as sessao:
+            aluno_id = sessao.criar_aluno("João", 10, "5A")
+            sessao.atualizar_aluno(aluno_id, idade=11)
+
+    Tudo é confirmado com um único commit ao sair do bloco; se ocorrer uma
+    exceção, tudo é desfeito. ``confirmar()`` faz um commit intermediário e
+    ``ponto_de_salvamento()`` isola um trecho que pode falhar sem desfazer o
+    restante da sessão.
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn
+        self._savepoints = 0
+
+    def __enter__(self):
+        if self.conn is None:
+            self.conn = conectar()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+        return False
+
+    def confirmar(self):
+        """Confirma o que foi feito até aqui sem encerrar a sessão."""
+        self.conn.commit()
+
+    @contextmanager
+    def ponto_de_salvamento(self):
+        """Desfaz apenas o trecho do bloco ``with`` se ele lançar uma exceção."""
+        self._savepoints += 1
+        nome = sql.Identifier(f"sp_{self._savepoints}")
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql.SQL("SAVEPOINT {};").format(nome))
+        try:
+            yield self
+        except Exception:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql.SQL("ROLLBACK TO SAVEPOINT {};").format(nome))
+            raise
+        else:
+            with self.conn.cursor() as cursor:
+                cursor.execute(sql.SQL("RELEASE SAVEPOINT {};").format(nome))
+
+    def criar_aluno(self, nome, idade, turma):
+        inicio = time.perf_counter()
+        try:
+            aluno_id = repositorio.inserir(self.conn, {'nome': nome, 'idade': idade, 'turma': turma})
+            logger.info("Aluno %r inserido com sucesso (idade=%s, turma=%r). ID gerado: %s",
+                        nome, idade, turma, aluno_id, extra=operacao("CREATE", inicio))
+            return aluno_id
+        except (Error, ValorInvalido) as e:
+            logger.error("Erro ao inserir novo aluno - %s", e, extra=operacao("CREATE", inicio))
+            raise
+
+    def criar_alunos_em_lote(self, alunos, tamanho_pagina=1000):
+        """Insere vários alunos de uma vez.
+
+        Cada item é um dict com ``nome``, ``idade`` e ``turma``; itens sem ``nome``
+        são rejeitados como no cadastro individual. Retorna ``(ids, erros)``, em
+        que ``erros`` lista ``(posição, mensagem)`` dos itens rejeitados.
+        """
+        inicio = time.perf_counter()
+        valores = []
+        erros = []
+        for posicao, aluno in enumerate(alunos, start=1):
+            if not isinstance(aluno, dict) or not aluno.get('nome'):
+                erros.append((posicao, "O campo 'nome' é obrigatório"))
+                continue
+            valores.append((aluno['nome'], aluno.get('idade'), aluno.get('turma')))
+        if not valores:
+            logger.warning("Nenhum aluno válido entre os %s recebidos.", len(erros), extra=operacao("CREATE LOTE", inicio))
+            return [], erros
+
+        try:
+            with self.conn.cursor() as cursor:
+                query = "INSERT INTO alunos (nome, idade, turma) VALUES %s RETURNING id;"
+                ids = [linha[0] for linha in execute_values(cursor, query, valores, page_size=tamanho_pagina, fetch=True)]
+            logger.info("%s alunos inseridos com sucesso, %s rejeitados.", len(ids), len(erros),
+                        extra=operacao("CREATE LOTE", inicio))
+            return ids, erros
+        except Error as e:
+            logger.error("Erro ao inserir alunos em lote - %s", e, extra=operacao("CREATE LOTE", inicio))
+            raise
+
+    def listar_alunos(self):
+        """Todos os alunos, em ordem de ID, numa lista de registros ``Aluno``."""
+        inicio = time.perf_counter()
+        try:
+            lista = repositorio.listar(self.conn)
+            logger.info("Listagem de todos os alunos solicitada: %s alunos.", len(lista), extra=operacao("READ", inicio))
+            return lista
+        except Error as e:
+            logger.error("Erro ao listar alunos - %s", e, extra=operacao("READ", inicio))
+            raise
+
+    def iterar_alunos(self, tamanho=2000):
+        """Percorre os alunos em ordem de ID sem carregar a tabela inteira na memória."""
+        inicio = time.perf_counter()
+        total = 0
+        try:
+            for aluno in repositorio.iterar(self.conn, tamanho):
+                total += 1
+                yield aluno
+        except Error as e:
+            logger.error("Erro ao percorrer alunos - %s", e, extra=operacao("READ", inicio))
+            raise
+        logger.info("Alunos percorridos: %s.", total, extra=operacao("READ", inicio))
+
+    def atualizar_aluno(self, aluno_id, nome=None, idade=None, turma=None):
+        """Altera só os campos informados (diferentes de ``None``).
+
+        Retorna ``True`` se alguma coluna mudou; ``False`` se o aluno não
+        existe ou se os valores já eram esses, caso em que nada é escrito.
+        """
+        inicio = time.perf_counter()
+        alteracoes = {coluna: valor for coluna, valor in (('nome', nome), ('idade', idade), ('turma', turma))
+                      if valor is not None}
+        if not alteracoes:
+            logger.warning("Nenhum campo informado para atualizar o aluno com ID %s.", aluno_id,
+                           extra=operacao("UPDATE", inicio))
+            return False
+        try:
+            alterado = repositorio.atualizar(self.conn, aluno_id, alteracoes)
+            if alterado:
+                logger.info("Aluno com ID %s atualizado: nome=%r, idade=%s, turma=%r.",
+                            aluno_id, nome, idade, turma, extra=operacao("UPDATE", inicio))
+            else:
+                logger.info("Aluno com ID %s sem alterações (inexistente ou com os mesmos valores).",
+                            aluno_id, extra=operacao("UPDATE", inicio))
+            return alterado
+        except (Error, ValorInvalido) as e:
+            logger.error("Erro ao atualizar aluno com ID %s - %s", aluno_id, e, extra=operacao("UPDATE", inicio))
+            raise
+
+    def deletar_aluno(self, aluno_id):
+        """Remove o aluno; retorna ``False`` se ele não existir."""
+        inicio = time.perf_counter()
+        try:
+            removido = repositorio.excluir(self.conn, aluno_id)
+            if not removido:
+                logger.error("Falha ao deletar aluno com ID %s - Aluno não encontrado no banco de dados.",
+                             aluno_id, extra=operacao("DELETE", inicio))
+            else:
+                logger.info("Aluno com ID %s removido com sucesso.", aluno_id, extra=operacao("DELETE", inicio))
+            return removido
+        except Error as e:
+            logger.error("Erro ao deletar aluno com ID %s - %s", aluno_id, e, extra=operacao("DELETE", inicio))
+            raise
+
+
+# As funções abaixo abrem uma sessão própria por chamada (uma conexão e um
+# commit cada). Para encadear operações, prefira usar Sessao diretamente.
+
 # Função CREATE
 def criar_aluno(nome, idade, turma):
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        query = "INSERT INTO alunos (nome, idade, turma) VALUES (%s, %s, %s) RETURNING id;"
-        cursor.execute(query, (nome, idade, turma))
-        aluno_id = cursor.fetchone()[0]
-        conn.commit()
-        logging.info(f"CREATE: Aluno {{'nome': '{nome}', 'idade': {idade}, 'turma': '{turma}'}} inserido com sucesso. ID gerado: {aluno_id}")
-        return aluno_id
-    except Error as e:
-        logging.error(f"CREATE: Erro ao inserir novo aluno - {e}")
-        raise
-    finally:
-        if 'cursor' in locals() and cursor:
-            cursor.close()
-        if 'conn' in locals() and conn:
-            conn.close()
+    with Sessao() as sessao:
+        return sessao.criar_aluno(nome, idade, turma)
+
+# Função CREATE em lote
+def criar_alunos_em_lote(alunos, tamanho_pagina=1000):
+    with Sessao() as sessao:
+        return sessao.criar_alunos_em_lote(alunos, tamanho_pagina)
 
 # Função READ
 def listar_alunos():
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        query = "SELECT * FROM alunos;"
-        cursor.execute(query)
-        alunos = cursor.fetchall()
-        logging.info("READ: Listagem de todos os alunos solicitada.")
-        return alunos
-    except Error as e:
-        logging.error(f"READ: Erro ao listar alunos - {e}")
-        raise
-    finally:
-        if 'cursor' in locals() and cursor:
-            cursor.close()
-        if 'conn' in locals() and conn:
-            conn.close()
+    with Sessao() as sessao:
+        return sessao.listar_alunos()
+
+# Função READ em lotes, para tabelas grandes
+def iterar_alunos(tamanho=2000):
+    with Sessao() as sessao:
+        yield from sessao.iterar_alunos(tamanho)
 
 # Função UPDATE
 def atualizar_aluno(aluno_id, nome=None, idade=None, turma=None):
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        campos = []
-        valores = []
-        if nome:
-            campos.append("nome = %s")
-            valores.append(nome)
-        if idade:
-            campos.append("idade = %s")
-            valores.append(idade)
-        if turma:
-            campos.append("turma = %s")
-            valores.append(turma)
-        valores.append(aluno_id)
-        query = sql.SQL(f"UPDATE alunos SET {', '.join(campos)} WHERE id = %s;")
-        cursor.execute(query, valores)
-        conn.commit()
-        logging.info(f"UPDATE: Aluno com ID '{aluno_id}' atualizado: {{'nome': '{nome}', 'idade': {idade}, 'turma': '{turma}'}}.")
-    except Error as e:
-        logging.error(f"UPDATE: Erro ao atualizar aluno com ID '{aluno_id}' - {e}")
-        raise
-    finally:
-        if 'cursor' in locals() and cursor:
-            cursor.close()
-        if 'conn' in locals() and conn:
-            conn.close()
+    with Sessao() as sessao:
+        return sessao.atualizar_aluno(aluno_id, nome=nome, idade=idade, turma=turma)
 
 # Função DELETE
 def deletar_aluno(aluno_id):
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        query = "DELETE FROM alunos WHERE id = %s;"
-        cursor.execute(query, (aluno_id,))
-        if cursor.rowcount == 0:
-            logging.error(f"DELETE: Falha ao deletar aluno com ID '{aluno_id}' - Aluno não encontrado no banco de dados.")
-        else:
-            conn.commit()
-            logging.info(f"DELETE: Aluno com ID '{aluno_id}' removido com sucesso.")
-    except Error as e:
-        logging.error(f"DELETE: Erro ao deletar aluno com ID '{aluno_id}' - {e}")
-        raise
-    finally:
-        if 'cursor' in locals() and cursor:
-            cursor.close()
-        if 'conn' in locals() and conn:
-            conn.close()
\ No newline at end of file
+    with Sessao() as sessao:
+        return sessao.deletar_aluno(aluno_id)
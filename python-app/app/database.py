@@ -1,34 +1,177 @@
 import os
+import random
+import threading
 import time
 import psycopg2
 
-def get_db_connection():
-    """Estabelece conexão com o banco de dados PostgreSQL."""
-    max_attempts = 10
-    attempts = 0
 
-    while attempts < max_attempts:
+class DatabaseUnavailable(Exception):
+    """O banco não respondeu depois de todas as tentativas de conexão."""
+
+
+class CircuitOpenError(DatabaseUnavailable):
+    """O circuito está aberto: a conexão foi recusada sem tentar o banco."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Banco de dados indisponível; nova tentativa em {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Disjuntor para as conexões com o banco.
+
+    Fechado, deixa tudo passar e conta falhas seguidas. Com ``failure_threshold``
+    falhas ele abre e recusa conexões imediatamente por ``reset_timeout``
+    segundos. Depois disso fica meio-aberto: uma única chamada é liberada
+    como sonda; se ela conectar, o circuito fecha, senão abre de novo.
+    """
+
+    CLOSED = 'fechado'
+    OPEN = 'aberto'
+    HALF_OPEN = 'meio-aberto'
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_after(self):
+        """Segundos até o circuito aceitar uma sonda (0 se não estiver aberto)."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def before_call(self):
+        """Lança ``CircuitOpenError`` se a chamada não puder tentar o banco agora."""
+        with self._lock:
+            if self._state == self.OPEN:
+                restante = self.reset_timeout - (self._clock() - self._opened_at)
+                if restante > 0:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpenError(restante)
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpenError(0.0)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats['opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def stats(self):
+        estado = self.state
+        with self._lock:
+            return dict(self._stats, state=estado, consecutive_failures=self._failures)
+
+
+def backoff_delay(attempt, base=0.1, maximum=2.0):
+    """Espera antes da tentativa ``attempt + 1``: exponencial, limitada e com jitter total."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get('DB_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.environ.get('DB_BREAKER_RESET_TIMEOUT', '10')),
+)
+
+
+def _connect(default_database):
+    return psycopg2.connect(
+        host=os.environ.get('DATABASE_HOST', 'postgres'),
+        database=os.environ.get('DATABASE_NAME', default_database),
+        user=os.environ.get('DATABASE_USER', 'postgres'),
+        password=os.environ.get('DATABASE_PASSWORD', 'postgres'),
+        connect_timeout=int(os.environ.get('DATABASE_CONNECT_TIMEOUT', '3'))
+    )
+
+
+def get_db_connection(max_attempts=None, default_database='app_database'):
+    """Estabelece conexão com o banco de dados PostgreSQL.
+
+    Repete com backoff exponencial e jitter enquanto o circuito permitir;
+    com o banco fora do ar, as chamadas falham logo com ``CircuitOpenError``
+    em vez de prender a thread da requisição. ``DATABASE_NAME`` tem
+    precedência sobre ``default_database``.
+    """
+    if max_attempts is None:
+        max_attempts = int(os.environ.get('DB_RETRY_MAX_ATTEMPTS', '4'))
+    base = float(os.environ.get('DB_RETRY_BASE_DELAY', '0.1'))
+    maximum = float(os.environ.get('DB_RETRY_MAX_DELAY', '2'))
+
+    for attempt in range(max_attempts):
+        breaker.before_call()
         try:
-            conn = psycopg2.connect(
-                host=os.environ.get('DATABASE_HOST', 'postgres'),
-                database=os.environ.get('DATABASE_NAME', 'app_database'),
-                user=os.environ.get('DATABASE_USER', 'postgres'),
-                password=os.environ.get('DATABASE_PASSWORD', 'postgres')
-            )
-            print("Conexão com o banco de dados estabelecida com sucesso!")
+            conn = _connect(default_database)
+        except psycopg2.Error as e:
+            breaker.record_failure()
+            if attempt == max_attempts - 1:
+                raise DatabaseUnavailable(
+                    f"Não foi possível conectar ao banco de dados após {max_attempts} tentativas: {e}"
+                ) from e
+            delay = backoff_delay(attempt, base, maximum)
+            print(f"Tentativa {attempt + 1} de conexão com o banco de dados falhou. "
+                  f"Tentando novamente em {delay:.2f} segundos...")
+            time.sleep(delay)
+        except BaseException:
+            # Qualquer outra falha também conta; senão a sonda do meio-aberto
+            # ficaria marcada para sempre e o circuito nunca mais fecharia
+            breaker.record_failure()
+            raise
+        else:
+            breaker.record_success()
             return conn
-        except psycopg2.OperationalError:
-            attempts += 1
-            print(
-                f"Tentativa {attempts} de conexão com o banco de dados falhou. "
-                "Tentando novamente em 5 segundos..."
-            )
-            time.sleep(5)
 
-    raise Exception("Não foi possível conectar ao banco de dados após várias tentativas.")
+
+def check_database():
+    """Verifica se o banco responde agora, com uma única tentativa.
+
+    Retorna ``(pronto, detalhe)``. Com o circuito aberto não toca no banco.
+    """
+    try:
+        conn = get_db_connection(max_attempts=1)
+    except DatabaseUnavailable as e:
+        return False, str(e)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True, 'ok'
+    except psycopg2.Error as e:
+        return False, f"Banco de dados não respondeu: {e}"
+    finally:
+        conn.close()
+
 
 def close_db_connection(conn):
     """Fecha a conexão com o banco de dados."""
     if conn:
         conn.close()
-        print("Conexão com o banco de dados foi fechada.")
\ No newline at end of file
+        print("Conexão com o banco de dados foi fechada.")
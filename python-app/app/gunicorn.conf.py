@@ -0,0 +1,29 @@
+"""Configuração do gunicorn para servir a aplicação em produção.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Mesmos critérios do ``flask-app/gunicorn.conf.py``: um worker por núcleo
+mais um (``WEB_CONCURRENCY``), threads por worker (``GUNICORN_THREADS``),
+aplicação pré-carregada e workers reciclados. Aqui cada requisição abre a
+própria conexão, então não há pool a refazer depois do fork.
+"""
+import os
+
+
+def _nucleos():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', _nucleos() + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+preload_app = True
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+errorlog = '-'
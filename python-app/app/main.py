@@ -1,7 +1,13 @@
 import os
 from flask import Flask, jsonify
-from database import get_db_connection, close_db_connection
+from database import DatabaseUnavailable, breaker, check_database, get_db_connection, close_db_connection
 app = Flask(__name__)
+@app.errorhandler(DatabaseUnavailable)
+def database_unavailable(e):
+ # 503 com Retry-After: o cliente (ou o balanceador) tenta de novo depois
+ response = jsonify({"error": str(e)})
+ response.headers['Retry-After'] = str(max(1, round(breaker.retry_after())))
+ return response, 503
 @app.route('/')
 def home():
  return jsonify({"message": "Aplicação Python com PostgreSQL no Docker"})
@@ -18,8 +24,22 @@ def get_users():
  {"id": user[0], "username": user[1], "email": user[2]}
  for user in users
  ])
+# Liveness: o processo está de pé e atendendo; não depende do banco,
+# para que o orquestrador não reinicie a aplicação quando só o banco caiu
 @app.route('/healthcheck')
+@app.route('/health/live')
 def healthcheck():
  return jsonify({"status": "healthy"})
+# Readiness: só pronto se o banco responde agora; com 503 o orquestrador
+# para de enviar tráfego em vez de enfileirá-lo aqui
+@app.route('/health/ready')
+def readiness():
+ ready, detail = check_database()
+ body = {"status": "ready" if ready else "unavailable", "database": detail, "circuit": breaker.stats()}
+ if ready:
+  return jsonify(body)
+ response = jsonify(body)
+ response.headers['Retry-After'] = str(max(1, round(breaker.retry_after())))
+ return response, 503
 if __name__ == '__main__':
  app.run(host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""Logs estruturados do CRUD de alunos, gravados fora do caminho da requisição.
+
+As chamadas de log só colocam o registro numa fila em memória; uma thread
+de fundo (``QueueListener``) formata cada registro como uma linha JSON em
+UTF-8 e escreve no arquivo, que é rotacionado por tamanho. Assim a
+latência do CRUD não depende da velocidade do disco. Na saída do processo
+a fila é esvaziada antes de o arquivo ser fechado.
+
+Use sempre o estilo preguiçoso do ``logging``::
+
+    logger.info("Aluno %s inserido", aluno_id, extra=operacao("CREATE", inicio))
+
+A mensagem só é montada se o nível estiver habilitado. ``operacao`` gera os
+campos estruturados ``operacao`` e ``duracao_ms``.
+
+Configuração por ambiente: ``LOG_ARQUIVO`` (padrão ``escola_infantil.log``),
+``LOG_NIVEL`` (``INFO``), ``LOG_TAMANHO_MAXIMO`` em bytes (10 MB) e
+``LOG_BACKUPS`` (5).
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+NOME = 'escola_infantil'
+
+_listener = None
+_lock = threading.Lock()
+
+
+class FormatoJSON(logging.Formatter):
+    """Um objeto JSON por linha, sem escapar acentos."""
+
+    def format(self, record):
+        dados = {
+            'ts': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'operacao': getattr(record, 'operacao', None),
+            'duracao_ms': getattr(record, 'duracao_ms', None),
+            'mensagem': record.getMessage(),
+        }
+        if record.exc_info:
+            dados['excecao'] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class _HandlerFila(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # O QueueHandler padrão formata o registro inteiro na thread que
+        # chamou o log; aqui só a mensagem é resolvida (barato e seguro caso
+        # os argumentos mudem depois) e o JSON fica para o listener.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configurar(arquivo=None, nivel=None, tamanho_maximo=None, backups=None):
+    """Liga o logger ``escola_infantil`` à fila e inicia o listener (uma vez por processo)."""
+    global _listener
+    logger = logging.getLogger(NOME)
+    with _lock:
+        if _listener is not None:
+            return logger
+        arquivo_handler = logging.handlers.RotatingFileHandler(
+            arquivo or os.environ.get('LOG_ARQUIVO', 'escola_infantil.log'),
+            maxBytes=tamanho_maximo or int(os.environ.get('LOG_TAMANHO_MAXIMO', str(10 * 1024 * 1024))),
+            backupCount=backups if backups is not None else int(os.environ.get('LOG_BACKUPS', '5')),
+            encoding='utf-8',
+            delay=True,
+        )
+        arquivo_handler.setFormatter(FormatoJSON())
+
+        fila = queue.Queue(-1)
+        logger.handlers = [_HandlerFila(fila)]
+        logger.setLevel(nivel or os.environ.get('LOG_NIVEL', 'INFO'))
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(fila, arquivo_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(parar)
+    return logger
+
+
+def parar():
+    """Esvazia a fila, espera o listener gravar tudo e fecha o arquivo."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def operacao(nome, inicio=None):
+    """Campos estruturados para ``extra=``: nome da operação e duração desde ``inicio``."""
+    campos = {'operacao': nome}
+    if inicio is not None:
+        campos['duracao_ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+    return campos
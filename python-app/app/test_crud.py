@@ -1,27 +1,67 @@
-from crud_alunos import criar_aluno, listar_alunos, atualizar_aluno, deletar_aluno
-
-def testar_crud():
-    # Teste CREATE
-    print("Testando CREATE...")
-    aluno_id = criar_aluno("João", 10, "5A")
-    print(f"Aluno criado com ID: {aluno_id}")
-
-    # Teste READ
-    print("\nTestando READ...")
-    alunos = listar_alunos()
-    print("Lista de alunos:")
-    for aluno in alunos:
-        print(aluno)
-
-    # Teste UPDATE
-    print("\nTestando UPDATE...")
-    atualizar_aluno(aluno_id, nome="João Silva", idade=11)
-    print(f"Aluno com ID {aluno_id} atualizado.")
-
-    # Teste DELETE
-    print("\nTestando DELETE...")
-    deletar_aluno(aluno_id)
-    print(f"Aluno com ID {aluno_id} deletado.")
+import os
+
+import psycopg2
+import pytest
+
+from crud_alunos import ALUNOS, Sessao
+from repositorio import ValorInvalido
+
+
+def test_tabela_de_alunos():
+    assert ALUNOS.sql_inserir(('nome', 'idade', 'turma')) == \
+        'INSERT INTO alunos (nome, idade, turma) VALUES (%s, %s, %s) RETURNING id'
+    assert ALUNOS.Registro._make((1, 'João', 10, '5A')).turma == '5A'
+    with pytest.raises(ValorInvalido, match='idade'):
+        ALUNOS.converter({'idade': 'dez'})
+
+
+# O teste abaixo usa o Postgres de teste ("dsn", ver conftest.py)
+
+def test_crud_numa_sessao(dsn):
+    schema = f'teste_crud_{os.getpid()}'
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA {schema}; CREATE TABLE {schema}.alunos '
+                    '(id SERIAL PRIMARY KEY, nome VARCHAR(100) NOT NULL, idade INT, turma VARCHAR(10))')
+    try:
+        with Sessao(psycopg2.connect(dsn, options=f'-c search_path={schema}')) as sessao:
+            aluno_id = sessao.criar_aluno("João", 10, "5A")
+            assert sessao.atualizar_aluno(aluno_id, nome="João Silva", idade=11)
+            assert [tuple(aluno) for aluno in sessao.listar_alunos()] == [(aluno_id, "João Silva", 11, "5A")]
+            assert sessao.deletar_aluno(aluno_id)
+            assert sessao.listar_alunos() == []
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f'DROP SCHEMA {schema} CASCADE')
+        admin.close()
+
+
+def executar_crud():
+    """Roteiro manual contra o escola_infantil (``python test_crud.py``); o pytest não o coleta."""
+    # Todas as operações usam a mesma conexão e são confirmadas num único commit
+    with Sessao() as sessao:
+        # Teste CREATE
+        print("Testando CREATE...")
+        aluno_id = sessao.criar_aluno("João", 10, "5A")
+        print(f"Aluno criado com ID: {aluno_id}")
+
+        # Teste READ
+        print("\nTestando READ...")
+        alunos = sessao.listar_alunos()
+        print("Lista de alunos:")
+        for aluno in alunos:
+            print(aluno)
+
+        # Teste UPDATE
+        print("\nTestando UPDATE...")
+        sessao.atualizar_aluno(aluno_id, nome="João Silva", idade=11)
+        print(f"Aluno com ID {aluno_id} atualizado.")
+
+        # Teste DELETE
+        print("\nTestando DELETE...")
+        sessao.deletar_aluno(aluno_id)
+        print(f"Aluno com ID {aluno_id} deletado.")
 
 if __name__ == "__main__":
-    testar_crud()
\ No newline at end of file
+    executar_crud()
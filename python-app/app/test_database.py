@@ -0,0 +1,98 @@
+import psycopg2
+import pytest
+
+import database
+from database import CircuitBreaker, CircuitOpenError, DatabaseUnavailable, backoff_delay
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_backoff_exponencial_limitado():
+    for tentativa, teto in [(0, 0.1), (1, 0.2), (3, 0.8), (10, 2.0)]:
+        assert all(0 <= backoff_delay(tentativa, 0.1, 2.0) <= teto for _ in range(50))
+
+
+def test_circuito_abre_e_libera_uma_sonda():
+    relogio = Relogio()
+    disjuntor = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=relogio)
+    for _ in range(2):
+        disjuntor.before_call()
+        disjuntor.record_failure()
+    with pytest.raises(CircuitOpenError):
+        disjuntor.before_call()
+
+    relogio.agora = 10.0
+    assert disjuntor.state == CircuitBreaker.HALF_OPEN
+    disjuntor.before_call()              # a sonda passa
+    with pytest.raises(CircuitOpenError):
+        disjuntor.before_call()          # as demais esperam o resultado dela
+    disjuntor.record_failure()
+    assert disjuntor.state == CircuitBreaker.OPEN and disjuntor.retry_after() == 10
+
+    relogio.agora = 20.0
+    disjuntor.before_call()
+    disjuntor.record_success()
+    assert disjuntor.stats()['state'] == CircuitBreaker.CLOSED
+
+
+def test_falha_rapido_com_o_banco_fora(monkeypatch):
+    tentativas = []
+
+    def connect(**kwargs):
+        tentativas.append(kwargs)
+        raise psycopg2.OperationalError('connection refused')
+
+    monkeypatch.setattr(database.psycopg2, 'connect', connect)
+    monkeypatch.setattr(database.time, 'sleep', lambda _: None)
+    monkeypatch.setattr(database, 'breaker', CircuitBreaker(failure_threshold=3, reset_timeout=30))
+
+    with pytest.raises(CircuitOpenError):
+        database.get_db_connection(max_attempts=10)
+    assert len(tentativas) == 3
+
+    # Com o circuito aberto, nenhuma tentativa chega ao banco
+    with pytest.raises(DatabaseUnavailable):
+        database.get_db_connection()
+    assert len(tentativas) == 3
+    assert database.check_database()[0] is False
+
+
+def test_sonda_que_falha_com_outro_erro_reabre_o_circuito(monkeypatch):
+    relogio = Relogio()
+    disjuntor = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=relogio)
+    monkeypatch.setattr(database, 'breaker', disjuntor)
+    disjuntor.before_call()
+    disjuntor.record_failure()
+
+    def connect(**kwargs):
+        raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'senha com byte inválido')
+
+    monkeypatch.setattr(database.psycopg2, 'connect', connect)
+    relogio.agora = 10.0
+    with pytest.raises(UnicodeDecodeError):
+        database.get_db_connection(max_attempts=1)
+    assert disjuntor.state == CircuitBreaker.OPEN
+
+    # Passado o tempo, uma nova sonda é liberada
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **kwargs: 'conexão')
+    relogio.agora = 20.0
+    assert database.get_db_connection(max_attempts=1) == 'conexão'
+    assert disjuntor.state == CircuitBreaker.CLOSED
+
+
+def test_banco_padrao_por_app_e_database_name_prevalece(monkeypatch):
+    bancos = []
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **kwargs: bancos.append(kwargs['database']))
+    monkeypatch.setattr(database, 'breaker', CircuitBreaker(failure_threshold=3, reset_timeout=30))
+    monkeypatch.delenv('DATABASE_NAME', raising=False)
+    database.get_db_connection()
+    database.get_db_connection(default_database='escola')
+    monkeypatch.setenv('DATABASE_NAME', 'outro')
+    database.get_db_connection(default_database='escola')
+    assert bancos == ['app_database', 'escola', 'outro']
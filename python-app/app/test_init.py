@@ -0,0 +1,51 @@
+import os
+
+import psycopg2
+import pytest
+
+import _init_
+
+# Tabela alunos de postgres/init.sql
+ALUNOS_SQL = '''
+    CREATE TABLE alunos (
+        aluno_id VARCHAR(5) NOT NULL PRIMARY KEY,
+        nome VARCHAR(40) NOT NULL,
+        endereco VARCHAR(60),
+        cidade VARCHAR(15),
+        estado VARCHAR(15),
+        cep VARCHAR(10),
+        pais VARCHAR(15),
+        telefone VARCHAR(24)
+    )'''
+
+
+def test_aluno_id_fora_do_tamanho_recusado_sem_ir_ao_banco(monkeypatch):
+    monkeypatch.setattr(_init_, 'get_db_connection', lambda **_: pytest.fail('não devia conectar'))
+    resposta = _init_.app.test_client().post('/alunos', json={'aluno_id': 'ABCDEF', 'nome': 'Ana'})
+    assert resposta.status_code == 400 and 'aluno_id' in resposta.json['error']
+
+
+# O teste abaixo usa o Postgres de teste ("dsn", ver conftest.py)
+
+@pytest.fixture
+def schema(dsn):
+    nome = f'teste_init_{os.getpid()}'
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA {nome}; SET search_path TO {nome};' + ALUNOS_SQL)
+    try:
+        yield nome
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f'DROP SCHEMA {nome} CASCADE')
+        conn.close()
+
+
+def test_cadastra_e_lista_aluno_com_codigo_de_texto(dsn, schema, monkeypatch):
+    monkeypatch.setattr(_init_, 'get_db_connection',
+                        lambda **_: psycopg2.connect(dsn, options=f'-c search_path={schema}'))
+    cliente = _init_.app.test_client()
+    resposta = cliente.post('/alunos', json={'aluno_id': 'ALFKI', 'nome': 'Ana Souza', 'cidade': 'Santos'})
+    assert resposta.status_code == 201
+    assert cliente.get('/alunos').json == [['ALFKI', 'Ana Souza', None, 'Santos', None, None, None, None]]
@@ -0,0 +1,44 @@
+import json
+import logging
+
+import registro
+
+
+class Caro:
+    formatado = False
+
+    def __str__(self):
+        Caro.formatado = True
+        return 'caro'
+
+
+def test_registros_em_json_utf8_gravados_ao_parar(tmp_path):
+    arquivo = tmp_path / 'crud.log'
+    registro.parar()
+    logger = registro.configurar(arquivo=str(arquivo), nivel='INFO')
+    try:
+        logger.info("Aluno %r inserido", 'João', extra=registro.operacao('CREATE', 0.0))
+        logger.debug("Nunca montada: %s", Caro())
+    finally:
+        registro.parar()
+
+    linhas = arquivo.read_text(encoding='utf-8').splitlines()
+    assert len(linhas) == 1
+    dados = json.loads(linhas[0])
+    assert dados['mensagem'] == "Aluno 'João' inserido"
+    assert dados['operacao'] == 'CREATE' and dados['duracao_ms'] > 0
+    assert 'João' in linhas[0]
+    assert not Caro.formatado
+
+
+def test_rotaciona_por_tamanho(tmp_path):
+    arquivo = tmp_path / 'crud.log'
+    registro.parar()
+    logger = registro.configurar(arquivo=str(arquivo), nivel=logging.INFO, tamanho_maximo=500, backups=2)
+    try:
+        for i in range(50):
+            logger.info("Registro %s", i, extra=registro.operacao('READ'))
+    finally:
+        registro.parar()
+    assert (tmp_path / 'crud.log.1').exists() and (tmp_path / 'crud.log.2').exists()
+    assert not (tmp_path / 'crud.log.3').exists()